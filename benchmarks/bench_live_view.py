@@ -0,0 +1,82 @@
+"""
+Benchmark frames of LiveView fed by LSL outlet.
+
+Every frame pushes 1/30 s of synthetic EEG to outlet, then LiveView pulls
+it, filters bands and updates curves, and the plot is rendered offscreen.
+Plots 4 electrodes with and without 5 band overlays.
+
+Usage: python -m benchmarks.bench_live_view [--frames 300]
+"""
+import argparse
+import os
+import time
+import tracemalloc
+
+import numpy as np
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import pyqtgraph as pg  # noqa: E402
+from muselsl.constants import MUSE_SAMPLING_EEG_RATE  # noqa: E402
+
+from src.frequency import Frequency  # noqa: E402
+from src.live_view import FRAME_RATE, LiveView  # noqa: E402
+from src.stream_worker import create_outlet  # noqa: E402
+
+ELECTRODES = ['TP9', 'AF7', 'AF8', 'TP10']
+COLOURS = {'TP9': '#2E2EFE', 'AF7': '#00FF00', 'AF8': '#FFFF00',
+           'TP10': '#FF0000', 'GAMMA': '#2E2EFE', 'BETA': '#00FF00',
+           'ALPHA': '#FFFF00', 'THETA': '#FF0000', 'DELTA': '#962A51'}
+
+
+def measure(bands, frames: int) -> None:
+    """
+    Print time of update and render per frame and memory allocated.
+    """
+    outlet = create_outlet('EEG', f'benchmark{len(bands)}')
+    widget = pg.PlotWidget()
+    widget.resize(1000, 600)
+    view = LiveView(widget.getPlotItem(), ELECTRODES, COLOURS, bands)
+    while not view._connect():
+        time.sleep(0.05)
+    # wait until inlet is connected to outlet
+    view.stream.inlet.open_stream(timeout=5)
+
+    random = np.random.default_rng(0)
+    samples = int(MUSE_SAMPLING_EEG_RATE / FRAME_RATE)
+    updates, renders = [], []
+    for frame in range(frames + 10):
+        outlet.push_chunk(random.normal(0, 30, (samples, 5)).astype(
+            np.float32).tolist())
+        time.sleep(0.005)
+        if frame == 10:
+            tracemalloc.start()
+        start = time.perf_counter()
+        view.update()
+        updated = time.perf_counter()
+        widget.grab()
+        rendered = time.perf_counter()
+        if frame >= 10:
+            updates.append(updated - start)
+            renders.append(rendered - updated)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    update, render = np.median(updates) * 1e3, np.median(renders) * 1e3
+    print(f"{len(bands)} bands: update {update:6.2f} ms, render "
+          f"{render:6.2f} ms, {1e3 / (update + render):5.0f} FPS possible, "
+          f"peak traced {peak / 1024:.0f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frames', type=int, default=300)
+    args = parser.parse_args()
+
+    app = pg.mkQApp()  # noqa: F841
+    measure([], args.frames)
+    measure(list(Frequency), args.frames)
+
+
+if __name__ == '__main__':
+    main()
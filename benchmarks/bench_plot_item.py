@@ -0,0 +1,117 @@
+"""
+Benchmark data path of MainWindow._add_series.
+
+Compares the former list based preparation of curve data with the array
+based one used by MainWindow._get_plot_item. Both variants get the same
+series, raw readings for 4 electrodes in time domain and readings of 4
+electrodes x 5 bands filtered once in advance, so only the path from
+series to points of curve is timed. Pyramids are built for every series,
+nothing is cached between variants.
+
+Usage: python -m benchmarks.bench_plot_item [--minutes 60]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.frequency import Frequency
+from src.DecimatedCurveItem import INITIAL_WIDTH
+from src.recording import Recording
+from src.transformer import Transformer
+
+ELECTRODES = ['TP9', 'AF7', 'AF8', 'TP10']
+SAMPLING = 256
+
+
+def write_recording(path: str, minutes: int) -> None:
+    """
+    Write synthetic recording in format of Muse csv files.
+
+    Parameters
+    ----------
+    path: str
+    minutes: int
+
+    Returns
+    -------
+    None
+    """
+    size = minutes * 60 * SAMPLING
+    random = np.random.default_rng(0)
+    data = {'timestamps': 1605290410.539 + np.arange(size) / SAMPLING}
+    for electrode in ELECTRODES + ['Right AUX']:
+        data[electrode] = random.normal(0, 30, size).round(3)
+    pd.DataFrame(data).to_csv(path, index=False)
+
+
+def legacy_series(x: np.array, y: np.array) -> Tuple[np.array, np.array]:
+    """
+    Prepare curve data the way _get_plot_item did before.
+
+    PlotCurveItem converts lists back to arrays, which is included here.
+    """
+    return np.array(list(x)), np.array(list(y))
+
+
+def current_series(data: Recording,
+                   y: np.array) -> Tuple[np.array, np.array]:
+    """
+    Prepare curve data the way _get_plot_item does now.
+    """
+    pyramid = data.derived_pyramid(y)
+    selection = pyramid.locate(pyramid.x[0], pyramid.x[-1], INITIAL_WIDTH)
+    return pyramid.render(*selection)
+
+
+def measure(series: Callable, inputs: List[tuple]) -> Tuple[float, int]:
+    """
+    Measure time and peak of allocated memory of _add_series data path.
+
+    Returns
+    -------
+    Tuple[float, int]
+        Seconds per series and peak allocation in bytes.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    for arguments in inputs:
+        series(*arguments)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed / len(inputs), peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--minutes', type=int, default=60)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'EEG_recording.csv')
+        write_recording(path, args.minutes)
+        recording = Recording(path)
+        series = {'time': [recording[electrode] for electrode in ELECTRODES],
+                  'bands': [band.astype(np.float32) for electrode in ELECTRODES
+                            for band in Transformer.filter_bank(
+                                recording[electrode], list(Frequency))[0]]}
+
+        for mode, values in series.items():
+            old_time, old_peak = measure(
+                legacy_series, [(recording.timestamps, y) for y in values])
+            new_time, new_peak = measure(
+                current_series, [(recording, y) for y in values])
+            print(f"{mode:>5}: lists {old_time * 1000:8.1f} ms "
+                  f"{old_peak / 2 ** 20:8.1f} MiB | "
+                  f"arrays {new_time * 1000:8.1f} ms "
+                  f"{new_peak / 2 ** 20:8.1f} MiB per series")
+
+
+if __name__ == '__main__':
+    main()
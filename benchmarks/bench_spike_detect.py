@@ -0,0 +1,104 @@
+"""
+Benchmark Spike.detect.
+
+Compares the former list comprehension over search windows with the strided
+window view used by Spike.detect, on bundled recordings and on synthetic
+signal of given length.
+
+Usage: python -m benchmarks.bench_spike_detect [--hours 8]
+"""
+import argparse
+import glob
+import os
+import time
+from typing import Callable, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.spike import Spike
+
+ELECTRODES = ['TP9', 'AF7', 'AF8', 'TP10']
+SAMPLING = 256
+ASSETS = os.path.join(os.path.dirname(__file__), '..', 'assets')
+
+
+def legacy_detect(spike: Spike) -> np.array:
+    """
+    Detect spikes the way Spike.detect did before.
+    """
+    spike._estimate_noise_level()
+    return np.array([
+        index + np.argmin(spike.data[index:index + spike.search_samples])
+        for index in spike._find_potential_spikes()])
+
+
+def current_detect(spike: Spike) -> np.array:
+    """
+    Detect spikes the way Spike.detect does now.
+    """
+    spike.detect()
+    return spike.spikes
+
+
+def synthetic_series(hours: float) -> pd.Series:
+    """
+    Return noise with spikes, sampled as Muse EEG.
+
+    Parameters
+    ----------
+    hours: float
+
+    Returns
+    -------
+    pandas.Series
+    """
+    size = int(hours * 3600 * SAMPLING)
+    random = np.random.default_rng(0)
+    values = random.normal(0, 10, size).astype(np.float32)
+    values[random.integers(10, size - 10, size // 200)] -= 150
+    index = pd.to_datetime(1605290410.539 + np.arange(size) / SAMPLING,
+                           unit='s')
+    return pd.Series(values, index=index)
+
+
+def measure(detect: Callable, data: pd.Series) -> Tuple[float, np.array]:
+    """
+    Measure time of spike detection.
+
+    Returns
+    -------
+    Tuple[float, numpy.array]
+        Seconds and indexes of detected spikes.
+    """
+    spike = Spike(str(data.name))
+    spike.set_data(data)
+    start = time.perf_counter()
+    spikes = detect(spike)
+    return time.perf_counter() - start, spikes
+
+
+def report(name: str, data: pd.Series) -> None:
+    old_time, old_spikes = measure(legacy_detect, data)
+    new_time, new_spikes = measure(current_detect, data)
+    assert np.array_equal(old_spikes, new_spikes)
+    print(f"{name:>44}: {new_spikes.size:8d} spikes | "
+          f"list {old_time * 1000:10.1f} ms | "
+          f"strided {new_time * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hours', type=float, default=8)
+    args = parser.parse_args()
+
+    for path in sorted(glob.glob(os.path.join(ASSETS, '*.csv'))):
+        eeg = pd.read_csv(path, index_col=0)
+        eeg.index = pd.to_datetime(eeg.index, unit='s')
+        for electrode in ELECTRODES:
+            report(f"{os.path.basename(path)} {electrode}", eeg[electrode])
+    report(f"synthetic {args.hours:g}h", synthetic_series(args.hours))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark feature extraction and clustering of large spike sets.
+
+Compares PCA and KMeans fitted on the whole waveform matrix with
+incremental PCA and mini-batch k-means used by Spike above
+LARGE_SPIKE_SET spikes.
+
+Usage: python -m benchmarks.bench_spike_models [--spikes 20000 100000 500000]
+"""
+import argparse
+import time
+import tracemalloc
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.spike import Spike, WAVE_SIZE
+
+SPACING = 64  # samples between synthetic spikes
+
+
+def synthetic_readings(spikes: int) -> pd.Series:
+    """
+    Return noise with spikes of three shapes.
+
+    Parameters
+    ----------
+    spikes: int
+        Number of spikes, one every SPACING samples.
+
+    Returns
+    -------
+    pandas.Series
+    """
+    random = np.random.default_rng(0)
+    values = random.normal(0, 5, (spikes, SPACING))
+    values[:, 0] += 100  # artefact keeps threshold at 5 noise levels
+    time_axis = np.linspace(-1, 1, 2 * WAVE_SIZE)
+    shapes = np.stack([-100 * np.exp(-(time_axis / width) ** 2)
+                       for width in (0.1, 0.3, 0.6)])
+    values[:, SPACING // 2 - WAVE_SIZE:SPACING // 2 + WAVE_SIZE] += shapes[
+        random.integers(0, 3, spikes)]
+    return pd.Series(values.ravel().astype(np.float32))
+
+
+def measure(readings: pd.Series, batched: bool) -> Tuple[float, int, int]:
+    """
+    Measure time and peak of allocated memory of extract_features and cluster.
+
+    Returns
+    -------
+    Tuple[float, int, int]
+        Seconds, peak allocation in bytes and number of spikes.
+    """
+    spike = Spike('TP9')
+    spike.set_data(readings)
+    spike.large_spike_set = 0 if batched else len(readings)
+    spike.sort()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    spike.cluster()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, len(spike.sorted_spikes)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--spikes', type=int, nargs='+',
+                        default=[20000, 100000, 500000])
+    args = parser.parse_args()
+
+    for spikes in args.spikes:
+        readings = synthetic_readings(spikes)
+        full_time, full_peak, detected = measure(readings, batched=False)
+        batch_time, batch_peak, _ = measure(readings, batched=True)
+        print(f"{detected:>8} spikes: full {full_time * 1000:8.1f} ms "
+              f"{full_peak / 2 ** 20:7.1f} MiB | "
+              f"batches {batch_time * 1000:8.1f} ms "
+              f"{batch_peak / 2 ** 20:7.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark pushing of Muse callbacks into LSL outlet.
+
+Compares the former push_sample loop with push_chunk used by StreamWorker,
+on EEG chunks of 12 samples x 5 channels delivered by Muse callbacks.
+
+Usage: python -m benchmarks.bench_stream_push [--chunks 20000]
+"""
+import argparse
+import time
+from typing import Callable, Tuple
+
+import numpy as np
+from muselsl.constants import (LSL_EEG_CHUNK, MUSE_NB_EEG_CHANNELS,
+                               MUSE_SAMPLING_EEG_RATE)
+from pylsl import StreamInfo, StreamOutlet, local_clock
+
+from src.stream_worker import push_chunk
+
+
+def push_samples(data: np.array, timestamps: np.array,
+                 outlet: StreamOutlet) -> None:
+    """
+    Push chunk the way StreamWorker did before.
+    """
+    for ii in range(data.shape[1]):
+        outlet.push_sample(data[:, ii], timestamps[ii])
+
+
+def measure(push: Callable, outlet: StreamOutlet,
+            chunks: int) -> Tuple[float, np.array]:
+    """
+    Measure throughput and latency of callbacks.
+
+    Returns
+    -------
+    Tuple[float, numpy.array]
+        Samples per second and duration of every callback in seconds.
+    """
+    random = np.random.default_rng(0)
+    data = random.normal(0, 30, (MUSE_NB_EEG_CHANNELS, LSL_EEG_CHUNK))
+    latencies = np.empty(chunks)
+    start = time.perf_counter()
+    for chunk in range(chunks):
+        timestamps = local_clock() - np.arange(
+            LSL_EEG_CHUNK)[::-1] / MUSE_SAMPLING_EEG_RATE
+        called = time.perf_counter()
+        push(data, timestamps, outlet)
+        latencies[chunk] = time.perf_counter() - called
+    elapsed = time.perf_counter() - start
+    return chunks * LSL_EEG_CHUNK / elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--chunks', type=int, default=20000)
+    args = parser.parse_args()
+
+    info = StreamInfo('Benchmark', 'EEG', MUSE_NB_EEG_CHANNELS,
+                      MUSE_SAMPLING_EEG_RATE, 'float32', 'benchmark')
+    outlet = StreamOutlet(info, LSL_EEG_CHUNK)
+    for name, push in [('push_sample', push_samples),
+                       ('push_chunk', push_chunk)]:
+        rate, latencies = measure(push, outlet, args.chunks)
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1e6
+        print(f"{name:>12}: {rate:12,.0f} samples/s | callback "
+              f"p50 {p50:7.1f} us, p99 {p99:7.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Benchmark TemplateMatcher on long recordings.
+
+Correlates spike templates with 4 synthetic channels sampled at 256Hz.
+
+Usage: python -m benchmarks.bench_template_matching [--hours 4] [--templates 3]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.spike import WAVE_SIZE
+from src.template_matching import TemplateMatcher
+
+CHANNELS = 4
+SAMPLING = 256
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hours', type=float, default=4)
+    parser.add_argument('--templates', type=int, default=3)
+    args = parser.parse_args()
+
+    random = np.random.default_rng(0)
+    samples = int(args.hours * 3600 * SAMPLING)
+    readings = random.normal(0, 10, (CHANNELS, samples)).astype(np.float32)
+    time_axis = np.linspace(-1, 1, 2 * WAVE_SIZE)
+    templates = np.stack([-np.exp(-(time_axis / width) ** 2)
+                          for width in np.linspace(0.1, 0.6, args.templates)])
+
+    matcher = TemplateMatcher(templates)
+    start = time.perf_counter()
+    scores = matcher.correlate(readings)
+    correlated = time.perf_counter() - start
+    start = time.perf_counter()
+    matches = matcher.match(readings)
+    matched = time.perf_counter() - start
+    print(f"{args.hours:g}h x {CHANNELS} channels x {args.templates} "
+          f"templates: correlate {correlated:.2f} s "
+          f"({scores.nbytes / 2 ** 20:.0f} MiB of scores), "
+          f"match {matched:.2f} s, {matches.positions.size} matches")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+from typing import Optional, Tuple
+
+import pyqtgraph as pg
+
+from src.min_max_pyramid import MinMaxPyramid
+
+INITIAL_WIDTH = 2000
+
+
+class DecimatedCurveItem(pg.PlotCurveItem):
+
+    def __init__(self, pyramid: MinMaxPyramid, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pyramid = pyramid
+        self.selection: Optional[Tuple[int, int, int]] = None
+        self._select(pyramid.x[0], pyramid.x[-1], INITIAL_WIDTH)
+
+    def dataBounds(self, ax: int, frac: float = 1.0,
+                   orthoRange: Optional[Tuple[float, float]] = None
+                   ) -> Tuple[float, float]:
+        """
+        Return bounds of the whole series instead of currently drawn level.
+
+        Auto range and view limits have to see the whole recording, not only
+        the part selected for the current view.
+
+        Parameters
+        ----------
+        ax: int
+        frac: float
+        orthoRange: Tuple[float, float], optional
+
+        Returns
+        -------
+        Tuple[float, float]
+        """
+        return self.pyramid.bounds()[ax]
+
+    def viewRangeChanged(self, *args) -> None:
+        """
+        Redraw curve with level of detail matching new view range.
+
+        Returns
+        -------
+        None
+        """
+        view_box = self.getViewBox()
+        if not isinstance(view_box, pg.ViewBox):
+            return
+        (x_min, x_max), _ = view_box.viewRange()
+        self._select(x_min, x_max, view_box.width())
+
+    def _select(self, x_min: float, x_max: float, pixels: int) -> None:
+        """
+        Set data of curve to pyramid level for x range.
+
+        Data is replaced only if selection has changed, which also stops
+        auto range from bouncing between levels.
+
+        Parameters
+        ----------
+        x_min: float
+        x_max: float
+        pixels: int
+
+        Returns
+        -------
+        None
+        """
+        selection = self.pyramid.locate(x_min, x_max, pixels)
+        if selection != self.selection:
+            self.selection = selection
+            x, y = self.pyramid.render(*selection)
+            self.setData(x=x, y=y)
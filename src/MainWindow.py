@@ -2,15 +2,20 @@ from typing import Optional, List, Tuple, Any
 import matplotlib
 import pyqtgraph as pg
 import numpy as np
-import pandas as pd
 from PyQt5.QtWidgets import QCheckBox
 import ui.resources  # noqa: F401
 from src.UIMainWindow import UIMainWindow
+from src.block_filter import BlockFilter, LONG_SIGNAL
+from src.DecimatedCurveItem import DecimatedCurveItem
 from src.TimeAxisItem import TimeAxisItem
 from src.ViewBoxCustom import ViewBoxCustom
 from src.frequency import Frequency
 from src.helpers import extend_unique, difference
-from src.spike import Spike
+from src.live_view import LiveView
+from src.min_max_pyramid import MinMaxPyramid
+from src.recording import Recording
+from src.series_cache import SeriesCache
+from src.spike import MAX_CLUSTERS, Spike
 from src.transformer import Transformer
 import logging
 import sys
@@ -27,16 +32,18 @@ class MainWindow(UIMainWindow):
         self.active_bands: List[Frequency] = []
         self.active_series: List[str] = []
         self.axis_items: List[Tuple[str, Frequency, pg.AxisItem]] = []
-        self.data: pd.DataFrame = None
+        self.current: int = 50
+        self.series_cache: SeriesCache = SeriesCache()
+        self.data: Recording = None
         self.plotItem: pg.PlotItem = None
         self.viewBox1: pg.ViewBox = None
         self.view_boxes: List[pg.ViewBox] = []
 
         self.spikes = {
-            'TP9': Spike('TP9'),
-            'AF7': Spike('AF7'),
-            'AF8': Spike('AF8'),
-            'TP10': Spike('TP10')
+            'TP9': Spike('TP9', max_clusters=MAX_CLUSTERS),
+            'AF7': Spike('AF7', max_clusters=MAX_CLUSTERS),
+            'AF8': Spike('AF8', max_clusters=MAX_CLUSTERS),
+            'TP10': Spike('TP10', max_clusters=MAX_CLUSTERS)
         }
 
         self._prepare_frequency_bands()
@@ -289,26 +296,32 @@ class MainWindow(UIMainWindow):
         self._prepare_canvas()
         self._plot()
 
-    def _read_data(self) -> pd.DataFrame:
+    def _read_data(self) -> Recording:
         """
         Read csv file with recordings.
 
+        Readings are memory-mapped from sidecar cache, which is created on the
+        first load of the file.
+
         Returns
         -------
-        Pandas.DataFrame
+        Recording
         """
-        eeg = pd.read_csv(self.current_file, index_col=0)
-        eeg.index = pd.to_datetime((eeg.index * 1000000000).astype(np.int64))
-        return eeg
+        return Recording(self.current_file)
 
     def _draw_readings(self) -> None:
         """
         Draw readings from csv file.
 
+        Live view is stopped, as its plot is replaced.
+
         Returns
         -------
         None
         """
+        if self.live_view is not None:
+            self.live_view.stop()
+            self.live_view = None
         self.graphicsLayout = pg.GraphicsLayout()
         self.graphicsView.setCentralWidget(self.graphicsLayout)
         self._set_single_series()
@@ -343,6 +356,30 @@ class MainWindow(UIMainWindow):
         self.actionFeature_extraction.setDisabled(False)
         self.actionClustering.setDisabled(False)
 
+    def _live_view(self) -> None:
+        """
+        Draw scrolling view of EEG stream with active bands.
+
+        Returns
+        -------
+        None
+        """
+        if self.live_view is not None:
+            self.live_view.stop()
+        if self.graphicsLayout:
+            self._clean()
+        self.graphicsLayout = pg.GraphicsLayout()
+        self.graphicsView.setCentralWidget(self.graphicsLayout)
+        plot_item = self.graphicsLayout.addPlot()
+        plot_item.setMouseEnabled(x=False, y=True)
+        plot_item.setLabel('bottom', 's')
+        self.live_view = LiveView(plot_item,
+                                  ['TP9', 'AF7', 'AF8', 'TP10'],
+                                  self.colours, self.active_bands,
+                                  spikes=self.spikes)
+        self.live_view.start()
+        self.message.setText("Live view")
+
     def _toggle_frequency(self, disabled: Optional[bool] = True,
                           exclusive: Optional[bool] = False) -> None:
         """
@@ -396,12 +433,93 @@ class MainWindow(UIMainWindow):
         if self.current_file != '':
             self._draw_readings()
 
+    def _get_band_series(self, electrode: str,
+                         frequency: Frequency) -> np.array:
+        """
+        Return readings of electrode filtered to frequency band.
+
+        Filtered series are kept in LRU cache keyed by recording, electrode,
+        band and mains current, so switching modes does not filter again.
+        On miss spectrum of electrode is computed once and filtered into all
+        bands with filter bank, so next bands of the same electrode are ready.
+        Every contiguous block of recording is filtered separately, so
+        dropouts do not leak into spectrum. Long blocks are filtered with
+        overlap-add to bound memory of spectra.
+
+        Parameters
+        ----------
+        electrode: str
+        frequency: Frequency
+
+        Returns
+        -------
+        np.array
+        """
+        def _key(band: Frequency) -> tuple:
+            return self.data.identity, electrode, band, self.current
+
+        series = self.series_cache.get(_key(frequency))
+        if series is None:
+            bands = list(Frequency)
+            sampling = self.data.sampling.period
+            filtered = np.empty((len(bands), len(self.data)), np.float32)
+            block_filter = BlockFilter(bands, self.current, sampling) \
+                if len(self.data) > LONG_SIGNAL else None
+            for block in self.data.block_slices():
+                readings = self.data[electrode][block]
+                if readings.size > LONG_SIGNAL:
+                    # filtered in place, without float64 copy of all bands
+                    block_filter.apply(
+                        readings, out=filtered[np.newaxis, :, block])
+                else:
+                    filtered[:, block] = Transformer.filter_bank(
+                        readings, bands, self.current, sampling)[0]
+            for band, band_series in zip(bands, filtered):
+                self.series_cache.put(_key(band), band_series)
+            series = filtered[bands.index(frequency)]
+        logging.debug(f"Series cache: {self.series_cache.hits} hits, "
+                      f"{self.series_cache.misses} misses, "
+                      f"{self.series_cache.nbytes / 2 ** 20:.1f}MiB")
+        return series
+
+    def _get_band_pyramid(self, electrode: str,
+                          frequency: Frequency) -> MinMaxPyramid:
+        """
+        Return min/max pyramid of electrode filtered to frequency band.
+
+        Levels of pyramid are kept in the same LRU cache as filtered series,
+        under key of the series, and count against its memory limit. On hit
+        pyramid is assembled from cached levels, so no O(N) work is done.
+
+        Parameters
+        ----------
+        electrode: str
+        frequency: Frequency
+
+        Returns
+        -------
+        MinMaxPyramid
+        """
+        key = ('levels', self.data.identity, electrode, frequency,
+               self.current)
+        series = self._get_band_series(electrode, frequency)
+        levels = self.series_cache.get(key)
+        pyramid = self.data.derived_pyramid(series, levels)
+        if levels is None:
+            self.series_cache.put(key, pyramid.storage)
+        return pyramid
+
     def _get_plot_item(self, electrode: str,
                        frequency: Optional[Frequency] = None
-                       ) -> pg.PlotCurveItem:
+                       ) -> DecimatedCurveItem:
         """
         Return PlotCurveItem with reading.
 
+        Curve draws level of min/max pyramid matching visible range.
+        Pyramids of bands are cached with filtered series.
+        Readings are passed as arrays sharing memory with recording, no list
+        of samples is ever built.
+
         Parameters
         ----------
         electrode: str
@@ -411,15 +529,13 @@ class MainWindow(UIMainWindow):
         -------
         pg.PlotCurveItem
         """
-        x = list(self.data.index.astype(np.int64))
-        y = list(self.data[electrode])
         if frequency:
-            transformer = Transformer(np.array(x), np.array(y), frequency)
-            x = x
-            y = transformer.get_irfft()
+            pyramid = self._get_band_pyramid(electrode, frequency)
+        else:
+            pyramid = self.data.pyramid(electrode)
         # pen=QPen(QColor(*hex2rgb(self.colours[electrode], 100)))
         pen = self._get_colour(electrode, frequency)
-        return pg.PlotCurveItem(x=x, y=y, pen=pen, antialias=True)
+        return DecimatedCurveItem(pyramid, pen=pen, antialias=True)
 
     def _checkbox_state(self, checkbox: QCheckBox, label: List[str],
                         band: Optional[List[Frequency]] = None) -> None:
@@ -1,11 +1,14 @@
-from datetime import timedelta
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
+import matplotlib.pyplot as plt
 import pandas as pd
 from PyQt5 import uic, QtWidgets
 
 from src.MplCanvas import MplCanvas
-from src.spike import WAVE_SIZE
+from src.recording import Recording
+from src.spike_pool import SpikePool
+
+CLUSTER_COLOURS = ['r', 'g', 'y']
 
 
 class MplWindow(QtWidgets.QMainWindow):
@@ -14,20 +17,21 @@ class MplWindow(QtWidgets.QMainWindow):
         super().__init__(parent)
         uic.loadUi("ui/spike_detection.ui", self)
         self.colours = parent.colours
-        self.values: pd.DataFrame = None
+        self.spike_pool: SpikePool = parent.spike_pool
+        self.values: Recording = None
         self.canvas: MplCanvas = None
         self.coordinates = [(0, 0, 'TP9'), (0, 1, 'AF7'), (1, 0, 'AF8'),
                             (1, 1, 'TP10')]
         self.spikes = {}
 
-    def set_values(self, values: pd.DataFrame, spikes: Dict) -> None:
+    def set_values(self, values: Recording, spikes: Dict) -> None:
         """
         Set new values and reinitialise canvas.
 
         Parameters
         ----------
-        values: pandas.DataFrame
-            DataFrame with eeg readings
+        values: Recording
+            Recording with eeg readings
         spikes: Dict
             Dictionary with Spike objects for each electrode.
 
@@ -44,6 +48,8 @@ class MplWindow(QtWidgets.QMainWindow):
         """
         Get last x seconds of readings
 
+        Only requested span is read from memory-mapped recording.
+
         Parameters
         ----------
         last: int, optional
@@ -54,12 +60,53 @@ class MplWindow(QtWidgets.QMainWindow):
         pandas.DataFrame
             DataFrame with eeg recordings.
         """
-        data = self.values
-        if last:
-            end = data.index[-1].to_pydatetime()
-            data = data.loc[end - timedelta(seconds=last):end]
+        return self.values.last(last,
+                                [column for _, _, column in self.coordinates])
+
+    def _analyse(self, stage: str,
+                 last: Optional[int] = None) -> pd.DataFrame:
+        """
+        Run spike pipelines of all electrodes concurrently.
+
+        Parameters
+        ----------
+        stage: str
+            The last stage of Spike to run.
+        last: int, optional
+            Analyse last x seconds.
+
+        Returns
+        -------
+        pandas.DataFrame
+            DataFrame with analysed eeg recordings.
+        """
+        data = self._get_last_readings(last)
+        self.spike_pool.run(
+            self.spikes, data, stage, self.values.sampling.rate,
+            self.values.boundaries(self.values.last_range(last)))
         return data
 
+    @staticmethod
+    def _cluster_colours(n_clusters: int) -> List:
+        """
+        Return colour for each cluster.
+
+        The first clusters keep red, green and yellow, further ones take
+        colours of tab10 colormap.
+
+        Parameters
+        ----------
+        n_clusters: int
+
+        Returns
+        -------
+        List
+        """
+        palette = plt.get_cmap('tab10')
+        extra = [palette(i % palette.N)
+                 for i in range(max(n_clusters - len(CLUSTER_COLOURS), 0))]
+        return (CLUSTER_COLOURS + extra)[:n_clusters]
+
     def plot_spikes(self, last: Optional[int] = None) -> None:
         """
         Detect and plot spikes.
@@ -75,22 +122,25 @@ class MplWindow(QtWidgets.QMainWindow):
         """
         def _plot(axis_row: int, axis_col: int, column: str,
                   xy_data: pd.Series) -> None:
-            # spike detection
-            self.spikes[column].set_data(xy_data)
-            detected_spikes = self.spikes[column].detect()
+            # detected spikes
+            spikes = self.spikes[column].spikes
             self.canvas.axes[axis_row, axis_col].scatter(
-                detected_spikes.index.to_numpy(), detected_spikes.values,
-                s=0.5, c='white')
+                xy_data.index.to_numpy()[spikes],
+                self.spikes[column].thresholds[spikes], s=0.5, c='white')
             # eeg data plot
             self.canvas.axes[axis_row, axis_col].plot(
                 xy_data.index.to_numpy(), xy_data.to_numpy(),
                 color=self.colours[column], linewidth=0.1)
+            # adaptive threshold
+            self.canvas.axes[axis_row, axis_col].plot(
+                xy_data.index.to_numpy(), self.spikes[column].thresholds,
+                color='white', linewidth=0.3)
             self.canvas.axes[axis_row, axis_col].set_title(
                 f"{column} (thresh:{self.spikes[column].spike_threshold:.2f}, "
                 f"noise:{self.spikes[column].noise_level:.2f})",
                 color=self.colours[column])
 
-        data = self._get_last_readings(last)
+        data = self._analyse('detect', last)
 
         for row, col, col_name in self.coordinates:
             _plot(row, col, col_name, data.loc[:, col_name])
@@ -110,23 +160,23 @@ class MplWindow(QtWidgets.QMainWindow):
         -------
         None
         """
-        def _plot(axis_row: int, axis_col: int, column: str,
-                  xy_data: pd.Series) -> None:
-            self.spikes[column].set_data(xy_data)
-            sorted_spikes = self.spikes[column].sort()
-            for wave in sorted_spikes[0]:
+        def _plot(axis_row: int, axis_col: int, column: str) -> None:
+            sorted_spikes = self.spikes[column].sorted_spikes
+            wave_size = self.spikes[column].wave_size
+            if sorted_spikes is None:
+                return
+            for wave in sorted_spikes:
                 self.canvas.axes[axis_row, axis_col].plot(
-                    range(-WAVE_SIZE, WAVE_SIZE), wave,
+                    range(-wave_size, wave_size), wave,
                     color='white', linewidth=0.1)
-            if len(sorted_spikes[1]):
-                self.canvas.axes[axis_row, axis_col].plot(
-                    range(-WAVE_SIZE, WAVE_SIZE), sorted_spikes[1],
-                    color='red', linewidth=0.5)
+            self.canvas.axes[axis_row, axis_col].plot(
+                range(-wave_size, wave_size), sorted_spikes.mean(axis=0),
+                color='red', linewidth=0.5)
 
-        data = self._get_last_readings(last)
+        self._analyse('sort', last)
 
         for row, col, col_name in self.coordinates:
-            _plot(row, col, col_name, data.loc[:, col_name])
+            _plot(row, col, col_name)
 
         self.canvas.figure.subplots_adjust(wspace=0.2, hspace=0.2)
 
@@ -138,18 +188,18 @@ class MplWindow(QtWidgets.QMainWindow):
         -------
         None
         """
-        def _plot(axis_row: int, axis_col: int, column: str,
-                  xy_data: pd.Series) -> None:
-            self.spikes[column].set_data(xy_data)
-            features = self.spikes[column].extract_features()
+        def _plot(axis_row: int, axis_col: int, column: str) -> None:
+            features = self.spikes[column].features
             self.canvas.axes[axis_row, axis_col].scatter(
                 features[:, 0], features[:, 1],
                 s=1.0, c='white')
             self.canvas.axes[axis_row, axis_col].set_title(
                 "PC1 vs PC2", color=self.colours[column])
 
+        self._analyse('extract_features')
+
         for row, col, col_name in self.coordinates:
-            _plot(row, col, col_name, self.values.loc[:, col_name])
+            _plot(row, col, col_name)
 
         self.canvas.figure.subplots_adjust(wspace=0.2, hspace=0.2)
 
@@ -161,19 +211,22 @@ class MplWindow(QtWidgets.QMainWindow):
         -------
         None
         """
-        def _plot(axis_row: int, axis_col: int, column: str,
-                  xy_data: pd.Series) -> None:
-            self.spikes[column].set_data(xy_data)
-            clusters, features = self.spikes[column].cluster()
-            for i, c in zip(range(3), ['r', 'g', 'y']):
+        def _plot(axis_row: int, axis_col: int, column: str) -> None:
+            clusters = self.spikes[column].clusters
+            features = self.spikes[column].features
+            n_clusters = self.spikes[column].n_clusters
+            for i, c in enumerate(self._cluster_colours(n_clusters)):
                 cluster = clusters == i
                 self.canvas.axes[axis_row, axis_col].scatter(
-                    features[cluster, 0], features[cluster, 1], s=1.0, c=c)
+                    features[cluster, 0], features[cluster, 1], s=1.0,
+                    color=c)
             self.canvas.axes[axis_row, axis_col].set_title(
-                "Clusters", color=self.colours[column])
+                f"Clusters (k={n_clusters})", color=self.colours[column])
+
+        self._analyse('cluster')
 
         for row, col, col_name in self.coordinates:
-            _plot(row, col, col_name, self.values.loc[:, col_name])
+            _plot(row, col, col_name)
 
         self.canvas.figure.subplots_adjust(wspace=0.2, hspace=0.2)
 
@@ -188,11 +241,13 @@ class MplWindow(QtWidgets.QMainWindow):
         def _plot(axis_row: int, axis_col: int, column: str) -> None:
             clusters = self.spikes[column].clusters
             sorted_spikes = self.spikes[column].sorted_spikes
-            for i, c in zip(range(3), ['r', 'g', 'y']):
+            wave_size = self.spikes[column].wave_size
+            n_clusters = self.spikes[column].n_clusters
+            for i, c in enumerate(self._cluster_colours(n_clusters)):
                 cluster = clusters == i
                 for wave in sorted_spikes[cluster, :]:
                     self.canvas.axes[axis_row, axis_col].plot(
-                        range(-WAVE_SIZE, WAVE_SIZE), wave,
+                        range(-wave_size, wave_size), wave,
                         color=c, linewidth=0.1)
 
         for row, col, col_name in self.coordinates:
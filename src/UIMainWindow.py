@@ -1,10 +1,14 @@
 import abc
 import configparser
+import os
+import threading
+from time import strftime
 from typing import Optional, Dict
 import pyqtgraph as pg
 
 from PyQt5 import QtWidgets, uic
 from PyQt5.QtCore import QThread
+from PyQt5.QtGui import QCloseEvent
 from PyQt5.QtWidgets import QFileDialog, QCheckBox, QButtonGroup, QLabel
 
 import ui.resources  # noqa: F401
@@ -13,9 +17,15 @@ from src.MplWindow import MplWindow
 from src.about import AboutWindow
 from src.frequency import Frequency
 from src.help import HelpWindow
+from src.live_view import LiveView
 from src.settings import SettingsWindow
+from src.spike_pool import SpikePool
+from src.stream_recorder import export_pending
 from src.stream_worker import StreamWorker
 
+RECORDINGS_DIR = 'assets'
+STREAM_CLOSE_TIMEOUT = 5000  # ms, waiting for device to disconnect
+
 
 class UIMainWindow(QtWidgets.QMainWindow):
 
@@ -34,6 +44,7 @@ class UIMainWindow(QtWidgets.QMainWindow):
         self.main_band: Frequency = None
         self.message: QLabel = QLabel()
         self.single_frequency: bool = False
+        self.spike_pool: SpikePool = SpikePool()
         self.spike_detection_window = MplWindow(self)
         self.spike_sorting_window = MplWindow(self)
         self.feature_extraction_window = MplWindow(self)
@@ -41,12 +52,43 @@ class UIMainWindow(QtWidgets.QMainWindow):
         self.wave_clusters_window = MplWindow(self)
         self.stream_thread: QThread = QThread()
         self.stream_worker: StreamWorker = StreamWorker()
+        self.live_view: Optional[LiveView] = None
 
         self._connect_menu()
         self.graphicsView.setAntialiasing(True)
         self.graphicsView.setBackground('k')
         self.statusbar.addPermanentWidget(self.message)
         self.statusbar.showMessage("Ready")
+        # recordings left by closing window are exported in background
+        threading.Thread(target=export_pending, args=(RECORDINGS_DIR,),
+                         name='ExportPending', daemon=True).start()
+
+    def closeEvent(self, event: QCloseEvent) -> None:
+        """
+        Stop recording, stream and spike worker processes when window is
+        closed.
+
+        Queued chunks of recording are written and flushed to disk before
+        window closes, csv export is left for the next start. Device gets
+        STREAM_CLOSE_TIMEOUT to disconnect.
+
+        Parameters
+        ----------
+        event: QCloseEvent
+
+        Returns
+        -------
+        None
+        """
+        self.stream_worker.stop_recording(wait=True, export=False)
+        self.stream_worker.finish()
+        try:
+            self.stream_thread.wait(STREAM_CLOSE_TIMEOUT)
+        except RuntimeError:
+            # thread was deleted after stream closed
+            pass
+        self.spike_pool.shutdown()
+        super().closeEvent(event)
 
     @abc.abstractmethod
     def _load_file(self):
@@ -65,6 +107,10 @@ class UIMainWindow(QtWidgets.QMainWindow):
     def _spike_detection_window(self) -> None:
         pass
 
+    @abc.abstractmethod
+    def _live_view(self) -> None:
+        pass
+
     @abc.abstractmethod
     def _spike_sorting_window(self) -> None:
         pass
@@ -99,28 +145,108 @@ class UIMainWindow(QtWidgets.QMainWindow):
         """
         Close stream from device.
 
+        Worker disconnects device on its thread and quits it when done, GUI
+        thread does not wait for it.
+
         Returns
         -------
         None
         """
         self.stream_worker.finish()
-        self.stream_thread.quit()
-        self.stream_thread.wait()
+        self._report_progress('Disconnecting...')
+
+        self.actionDisconnect.setDisabled(True)
+        self.actionRecord.setDisabled(True)
+        self.actionStop.setDisabled(True)
+
+    def _stream_closed(self) -> None:
+        """
+        Slot called when stream thread finished.
+
+        Returns
+        -------
+        None
+        """
         self._report_progress('Disconnected')
+        if self.live_view is not None:
+            self.live_view.stop()
 
         self.actionStream.setDisabled(False)
+        self.actionReplay.setDisabled(False)
         self.actionDisconnect.setDisabled(True)
+        self.actionRecord.setDisabled(True)
+        self.actionStop.setDisabled(True)
+        self.actionView.setDisabled(True)
+
+    def _start_recording(self) -> None:
+        """
+        Start recording streams to assets directory.
+
+        Returns
+        -------
+        None
+        """
+        path = os.path.join(
+            RECORDINGS_DIR, f"recording_{strftime('%Y-%m-%d-%H.%M.%S')}.rec")
+        self.stream_worker.start_recording(path)
+
+        self.actionRecord.setDisabled(True)
+        self.actionStop.setDisabled(False)
+
+    def _stop_recording(self) -> None:
+        """
+        Stop recording, streams are exported to csv files in background.
+
+        Returns
+        -------
+        None
+        """
+        self.stream_worker.stop_recording()
+
+        self.actionRecord.setDisabled(False)
+        self.actionStop.setDisabled(True)
 
     def _stream_thread(self) -> None:
         """
         Create thread for streaming functionality.
 
+        Returns
+        -------
+        None
+        """
+        self._start_stream_worker(StreamWorker())
+
+    def _replay_dialog(self) -> None:
+        """
+        Select recording and replay it on LSL outlets instead of device.
+
+        Speed of replay is read from settings.
+
+        Returns
+        -------
+        None
+        """
+        file_name, _ = QFileDialog.getOpenFileName(
+            self, "Replay recording", "./assets",
+            "Recordings (*.rec *.csv);;All Files (*)")
+        if file_name:
+            speed = self.config.getfloat('replay', 'speed', fallback=1.0)
+            self._start_stream_worker(StreamWorker(file_name, speed))
+
+    def _start_stream_worker(self, worker: StreamWorker) -> None:
+        """
+        Run stream worker on new thread.
+
+        Parameters
+        ----------
+        worker: StreamWorker
+
         Returns
         -------
         None
         """
         self.stream_thread = QThread()
-        self.stream_worker = StreamWorker()
+        self.stream_worker = worker
         self.stream_worker.moveToThread(self.stream_thread)
         self.stream_thread.started.connect(self.stream_worker.run)
         self.stream_worker.finished.connect(self.stream_thread.quit)
@@ -130,11 +256,12 @@ class UIMainWindow(QtWidgets.QMainWindow):
         self.stream_thread.start()
 
         self.actionStream.setDisabled(True)
+        self.actionReplay.setDisabled(True)
         self.actionDisconnect.setDisabled(False)
+        self.actionRecord.setDisabled(False)
+        self.actionView.setDisabled(False)
 
-        self.stream_thread.finished.connect(
-            lambda: self._report_progress('Disconnected')
-        )
+        self.stream_thread.finished.connect(self._stream_closed)
 
     def _about_dialog(self) -> None:
         """
@@ -188,6 +315,9 @@ class UIMainWindow(QtWidgets.QMainWindow):
             'Theta': '#FF0000',
             'Delta': '#962A51'
         }
+        self.config['replay'] = {
+            'speed': '1',
+        }
         with open('settings.ini', 'w') as configfile:
             self.config.write(configfile)
 
@@ -228,6 +358,10 @@ class UIMainWindow(QtWidgets.QMainWindow):
         self.actionHelp.triggered.connect(self._help_dialog)
         self.actionStream.triggered.connect(self._stream_thread)
         self.actionDisconnect.triggered.connect(self._close_stream)
+        self.actionReplay.triggered.connect(self._replay_dialog)
+        self.actionRecord.triggered.connect(self._start_recording)
+        self.actionStop.triggered.connect(self._stop_recording)
+        self.actionView.triggered.connect(self._live_view)
 
     def _open_file_name_dialog(self) -> None:
         """
@@ -0,0 +1,136 @@
+from typing import List, Optional
+
+import numpy as np
+from scipy.fft import irfft, next_fast_len, rfft, rfftfreq
+
+from src.frequency import Frequency
+from src.frequency_filter import FilterFactory
+
+BLOCK_SIZE = 1 << 20  # ~68 minutes at 256Hz
+LONG_SIGNAL = 1 << 22  # ~4.5 hours at 256Hz
+KERNEL_CYCLES = 30  # periods of the narrowest band feature
+DESIGN_OVERSAMPLING = 8
+
+
+def band_kernel_size(frequencies: List[Frequency], current: int = 50,
+                     sampling: float = 0.004) -> int:
+    """
+    Return number of taps resolving the narrowest feature of bands.
+
+    Feature is either lower edge of band or its width, whichever is smaller.
+    Transition width of windowed kernel is inversely proportional to its
+    duration, so kernel spans KERNEL_CYCLES periods of that feature, e.g.
+    60 seconds for 0.5Hz edge of delta band.
+
+    Parameters
+    ----------
+    frequencies: List[Frequency]
+    current: int
+    sampling: float
+
+    Returns
+    -------
+    int
+        Number of taps, odd.
+    """
+    narrowest = min(
+        min(band_filter.low or band_filter.high,
+            band_filter.high - band_filter.low)
+        for band_filter in (FilterFactory(frequency).get_filter(current)
+                            for frequency in frequencies))
+    return int(KERNEL_CYCLES / (narrowest * sampling)) | 1
+
+
+def band_kernel(frequency: Frequency, size: int, current: int = 50,
+                sampling: float = 0.004) -> np.array:
+    """
+    Return FIR kernel approximating band mask of FrequencyFilter.
+
+    Kernel is impulse response of the band mask truncated to size samples
+    and tapered with Hamming window. Response is computed on frequency grid
+    DESIGN_OVERSAMPLING times denser than kernel, so truncated tails do not
+    alias back into it. Kernel is symmetric, so filtering with it does not
+    shift phase.
+
+    Parameters
+    ----------
+    frequency: Frequency
+    size: int
+        Number of taps, odd.
+    current: int
+    sampling: float
+
+    Returns
+    -------
+    np.array
+    """
+    band_filter = FilterFactory(frequency).get_filter(current)
+    design_size = DESIGN_OVERSAMPLING * size
+    mask = band_filter.band_mask(rfftfreq(design_size, sampling))
+    response = irfft(mask.astype(float), design_size)
+    kernel = np.roll(response, size // 2)[:size]
+    return kernel * np.hamming(size)
+
+
+class BlockFilter:
+    """
+    Band filter bank applying FIR kernels with overlap-add.
+
+    Signal is processed in blocks of fixed size, so memory used for spectra
+    does not depend on length of recording. Kernel is sized from the
+    narrowest band, blocks are much longer than kernel, so overlap adds
+    little work. FFT length is the fastest one that fits block and kernel.
+    """
+
+    def __init__(self, frequencies: List[Frequency], current: int = 50,
+                 sampling: float = 0.004, block_size: int = BLOCK_SIZE,
+                 kernel_size: Optional[int] = None):
+        if kernel_size is None:
+            kernel_size = band_kernel_size(frequencies, current, sampling)
+        kernel_size |= 1
+        self.frequencies = frequencies
+        self.block_size = block_size
+        self.kernel_size = kernel_size
+        self.kernels = np.stack([
+            band_kernel(frequency, kernel_size, current, sampling)
+            for frequency in frequencies])
+        self.fft_size = next_fast_len(block_size + kernel_size - 1, real=True)
+        self.kernel_spectra = rfft(self.kernels, self.fft_size, axis=-1)
+
+    def apply(self, y: np.array, out: Optional[np.array] = None) -> np.array:
+        """
+        Filter channels into all bands.
+
+        Parameters
+        ----------
+        y: np.array
+            Readings, channels x samples or single channel.
+        out: np.array, optional
+            Array for result, e.g. memory-mapped file, channels x bands x
+            samples.
+
+        Returns
+        -------
+        np.array
+            Filtered readings, channels x bands x samples.
+        """
+        y = np.atleast_2d(y)
+        channels, samples = y.shape
+        if out is None:
+            out = np.zeros((channels, len(self.frequencies), samples),
+                           dtype=np.result_type(y.dtype, np.float32))
+        else:
+            out[...] = 0
+
+        delay = self.kernel_size // 2
+        for start in range(0, samples, self.block_size):
+            block = y[:, start:start + self.block_size]
+            spectrum = rfft(block, self.fft_size, axis=-1)
+            filtered = irfft(spectrum[:, np.newaxis, :] * self.kernel_spectra,
+                             self.fft_size, axis=-1)
+            first = start - delay
+            length = block.shape[-1] + self.kernel_size - 1
+            skip = max(-first, 0)
+            end = min(first + length, samples)
+            out[..., first + skip:end] += filtered[..., skip:end - first]
+        return out
@@ -7,6 +7,23 @@ class FrequencyFilter:
     def __init__(self, current: int = 50):
         self.current = current
 
+    def band_mask(self, fft_sample: np.array) -> np.array:
+        """
+        Mask of frequencies passed by band-pass filter.
+
+        Parameters
+        ----------
+        fft_sample: np.array
+
+        Returns
+        -------
+        np.array
+            Boolean array, True for frequencies inside band.
+        """
+        return ~((fft_sample < self.low)
+                 | (fft_sample >= self.high)
+                 | (fft_sample == self.current))
+
     def band_pass(self, signal: np.array, fft_sample: np.array) -> np.array:
         """
         Band-pass filter.
@@ -21,11 +38,7 @@ class FrequencyFilter:
         np.array
         """
         signal = signal.copy()
-        signal[
-            (fft_sample < self.low)
-            | (fft_sample >= self.high)
-            | (fft_sample == self.current)
-        ] = 0
+        signal[~self.band_mask(fft_sample)] = 0
         return signal
 
     def low_pass(self, signal: np.array, fft_sample: np.array) -> np.array:
@@ -0,0 +1,295 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+import pyqtgraph as pg
+from PyQt5.QtCore import QTimer
+from pylsl import ContinuousResolver, StreamInlet
+
+from src.frequency import Frequency
+from src.ring_buffer import RingBuffer
+from src.spike import Spike
+from src.stream_filter import StreamFilterBank
+from src.stream_worker import STREAMS
+
+MAX_CHUNK = 1024  # samples pulled from inlet at once
+BUFFER_SECONDS = 60
+WINDOW_SECONDS = 10
+FRAME_RATE = 30
+SPACING = 100  # microvolts between electrodes
+
+
+class LiveStream:
+    """
+    Readings pulled from LSL inlet into ring buffers.
+
+    Samples are pulled into preallocated chunk, selected channels are kept
+    in ring buffer of readings and, when bands are given, filtered by
+    StreamFilterBank into ring buffer of bands with row for every band and
+    channel, band after band.
+    """
+
+    def __init__(self, inlet: StreamInlet, channels: int,
+                 selected: List[int], sampling_rate: float,
+                 bands: Optional[List[Frequency]] = None,
+                 seconds: int = BUFFER_SECONDS):
+        """
+        Parameters
+        ----------
+        inlet: StreamInlet
+        channels: int
+            Channels of stream.
+        selected: List[int]
+            Indexes of channels to keep.
+        sampling_rate: float
+        bands: List[Frequency], optional
+        seconds: int
+            Seconds of readings kept in buffers.
+        """
+        self.inlet = inlet
+        self.selected = selected
+        self.bands = bands or []
+        capacity = int(seconds * sampling_rate)
+        self.chunk = np.empty((MAX_CHUNK, channels), dtype=np.float32)
+        self.readings = RingBuffer(len(selected), capacity)
+        self.band_readings = RingBuffer(len(selected) * len(self.bands),
+                                        capacity)
+        self.filter_bank = StreamFilterBank(
+            self.bands, len(selected), sampling_rate) if self.bands else None
+
+    def pull(self) -> int:
+        """
+        Pull all samples waiting in inlet.
+
+        Returns
+        -------
+        int
+            Number of samples pulled.
+        """
+        pulled = 0
+        while True:
+            _, timestamps = self.inlet.pull_chunk(
+                timeout=0.0, max_samples=MAX_CHUNK, dest_obj=self.chunk)
+            size = len(timestamps)
+            if not size:
+                return pulled
+            readings = self.chunk[:size, self.selected].T
+            self.readings.extend(readings, timestamps)
+            if self.filter_bank is not None:
+                self.band_readings.extend(
+                    self.filter_bank.process(readings).transpose(1, 0, 2),
+                    timestamps)
+            pulled += size
+            if size < MAX_CHUNK:
+                return pulled
+
+
+class LiveView:
+    """
+    Scrolling plot of the latest EEG readings from LSL stream.
+
+    Electrodes are drawn one under another with bands overlaid on them.
+    Timer pulls new samples and copies the visible window from ring buffers
+    into preallocated arrays, which are shifted to baselines of electrodes
+    in place, so curves are updated without allocation on every frame.
+    Overlays of one band on all electrodes form a single disconnected
+    curve, as cost of frame grows with number of curves. Spikes detected
+    online in readings of electrodes are marked under their curves. Stream
+    is looked up in background, view starts drawing once it is found.
+    """
+
+    def __init__(self, plot_item: pg.PlotItem, electrodes: List[str],
+                 colours: Dict[str, str],
+                 bands: Optional[List[Frequency]] = None,
+                 seconds: int = WINDOW_SECONDS,
+                 spikes: Optional[Dict[str, Spike]] = None):
+        """
+        Parameters
+        ----------
+        plot_item: pg.PlotItem
+        electrodes: List[str]
+            Labels of EEG channels to plot.
+        colours: Dict[str, str]
+            Colour of every electrode and band.
+        bands: List[Frequency], optional
+            Bands overlaid on readings.
+        seconds: int
+            Visible window.
+        spikes: Dict[str, Spike], optional
+            Spike pipelines of electrodes detecting spikes online.
+        """
+        self.plot_item = plot_item
+        self.electrodes = electrodes
+        self.colours = colours
+        self.bands = bands or []
+        self.seconds = seconds
+        self.stream: Optional[LiveStream] = None
+        self.resolver = ContinuousResolver(prop='type', value='EEG')
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.update)
+
+        self.x: np.array = np.zeros(0)
+        self.band_x: np.array = np.zeros(0)
+        self.connect: np.array = np.zeros(0, dtype=bool)
+        self.readings: np.array = np.zeros((0, 0), dtype=np.float32)
+        self.band_readings: np.array = np.zeros((0, 0), dtype=np.float32)
+        self.means: np.array = np.zeros(0, dtype=np.float32)
+        self.baselines = -SPACING * np.arange(len(electrodes),
+                                              dtype=np.float32)
+        self.band_baselines = np.tile(self.baselines, len(self.bands))
+        self.curves: List[pg.PlotCurveItem] = []
+        self.band_curves: List[pg.PlotCurveItem] = []
+        # looked up on every frame, analysis replaces Spike objects
+        self.spikes = spikes if spikes is not None else {}
+        self.spike_times: np.array = np.zeros(0)
+        self.spike_rows: np.array = np.zeros(0, dtype=int)
+        self.spike_markers = pg.ScatterPlotItem(symbol='t', size=6,
+                                                pen=None, brush='w')
+
+    def start(self, frame_rate: int = FRAME_RATE) -> None:
+        """
+        Start updating plot.
+
+        Parameters
+        ----------
+        frame_rate: int
+            Frames per second.
+
+        Returns
+        -------
+        None
+        """
+        self.timer.start(int(1000 / frame_rate))
+
+    def stop(self) -> None:
+        """
+        Stop updating plot, the last frame stays visible.
+
+        Returns
+        -------
+        None
+        """
+        self.timer.stop()
+
+    def _connect(self) -> bool:
+        """
+        Open inlet of the first EEG stream found and prepare curves.
+
+        Returns
+        -------
+        bool
+            True when stream was found.
+        """
+        streams = self.resolver.results()
+        if not streams:
+            return False
+        info = streams[0]
+        sampling_rate = info.nominal_srate()
+        labels = STREAMS['EEG'][0]
+        self.stream = LiveStream(
+            StreamInlet(info, max_buflen=BUFFER_SECONDS, max_chunklen=0),
+            info.channel_count(),
+            [labels.index(electrode) for electrode in self.electrodes],
+            sampling_rate, self.bands, max(BUFFER_SECONDS, self.seconds))
+
+        size = int(self.seconds * sampling_rate)
+        self.x = (np.arange(size) - size + 1) / sampling_rate
+        self.readings = np.zeros((len(self.electrodes), size),
+                                 dtype=np.float32)
+        self.band_readings = np.zeros(
+            (len(self.bands) * len(self.electrodes), size), dtype=np.float32)
+        self.means = np.zeros(len(self.electrodes), dtype=np.float32)
+        self.band_x = np.tile(self.x, len(self.electrodes))
+        self.connect = np.ones(self.band_x.size, dtype=bool)
+        self.connect[size - 1::size] = False
+
+        for band in self.bands:
+            self.band_curves.append(pg.PlotCurveItem(
+                pen=pg.mkPen(self.colours[band.name.upper()], width=1)))
+        for electrode in self.electrodes:
+            self.curves.append(pg.PlotCurveItem(
+                pen=pg.mkPen(self.colours[electrode.upper()], width=1)))
+        for curve in self.band_curves + self.curves:
+            self.plot_item.addItem(curve)
+        self._start_spikes(sampling_rate)
+        if self.spikes:
+            self.plot_item.addItem(self.spike_markers)
+        # fixed range, autorange would scan all curves on every frame
+        self.plot_item.disableAutoRange()
+        self.plot_item.setXRange(self.x[0], 0, padding=0)
+        self.plot_item.setYRange(float(self.baselines[-1]) - SPACING / 2,
+                                 SPACING / 2, padding=0)
+        self.plot_item.getAxis('left').setTicks(
+            [list(zip(self.baselines, self.electrodes))])
+        return True
+
+    def _start_spikes(self, sampling_rate: float) -> None:
+        """
+        Start online spike detection on ring buffer of readings.
+
+        Parameters
+        ----------
+        sampling_rate: float
+
+        Returns
+        -------
+        None
+        """
+        for channel, electrode in enumerate(self.electrodes):
+            if electrode in self.spikes:
+                self.spikes[electrode].set_sampling_rate(sampling_rate)
+                self.spikes[electrode].start_online(self.stream.readings,
+                                                    channel)
+
+    def _mark_spikes(self) -> None:
+        """
+        Detect spikes in new readings and mark those in visible window.
+
+        Returns
+        -------
+        None
+        """
+        times, rows = [self.spike_times], [self.spike_rows]
+        for row, electrode in enumerate(self.electrodes):
+            if electrode in self.spikes:
+                timestamps, _, _ = self.spikes[electrode].detect_online()
+                times.append(timestamps)
+                rows.append(np.full(timestamps.size, row))
+        latest = self.stream.readings.last(1)[0][-1]
+        times, rows = np.concatenate(times), np.concatenate(rows)
+        visible = times > latest - self.seconds
+        self.spike_times, self.spike_rows = times[visible], rows[visible]
+        self.spike_markers.setData(
+            self.spike_times - latest,
+            self.baselines[self.spike_rows] - SPACING / 3)
+
+    def update(self) -> None:
+        """
+        Pull new samples and redraw visible window.
+
+        Returns
+        -------
+        None
+        """
+        if self.stream is None and not self._connect():
+            return
+        if not self.stream.pull():
+            return
+
+        copied = self.stream.readings.copy_last(self.readings)
+        # electrodes are centred on their baselines
+        np.mean(self.readings[:, -copied:], axis=1, out=self.means)
+        np.subtract(self.means, self.baselines, out=self.means)
+        np.subtract(self.readings, self.means[:, np.newaxis],
+                    out=self.readings)
+        for curve, y in zip(self.curves, self.readings):
+            curve.setData(self.x, y)
+        if self.spikes:
+            self._mark_spikes()
+
+        if self.bands:
+            self.stream.band_readings.copy_last(self.band_readings)
+            np.add(self.band_readings, self.band_baselines[:, np.newaxis],
+                   out=self.band_readings)
+            bands = self.band_readings.reshape(len(self.bands), -1)
+            for curve, y in zip(self.band_curves, bands):
+                curve.setData(self.band_x, y, connect=self.connect)
@@ -0,0 +1,174 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+FACTOR = 4
+MIN_BUCKETS = 512
+
+
+def level_sizes(size: int, factor: int = FACTOR,
+                min_buckets: int = MIN_BUCKETS) -> List[int]:
+    """
+    Return number of buckets of every level above raw series.
+
+    Parameters
+    ----------
+    size: int
+        Length of raw series.
+    factor: int
+    min_buckets: int
+
+    Returns
+    -------
+    List[int]
+    """
+    sizes = []
+    while size > min_buckets:
+        size = -(-size // factor)
+        sizes.append(size)
+    return sizes
+
+
+class MinMaxPyramid:
+    """
+    Multi-resolution min/max representation of single series.
+
+    Level 0 is raw series, every next level merges FACTOR buckets of previous
+    one keeping their minimum and maximum, so peaks survive decimation.
+    Bucket is placed at x of its first sample, so x of levels are strided
+    views of raw x and take no memory. Minimums and maximums of all levels
+    are kept in single storage, which can be memory-mapped file.
+    """
+
+    def __init__(self, x: np.array, y: np.array, factor: int = FACTOR,
+                 min_buckets: int = MIN_BUCKETS,
+                 storage: Optional[np.array] = None, built: bool = False):
+        """
+        Parameters
+        ----------
+        x: numpy.array
+        y: numpy.array
+        factor: int
+        min_buckets: int
+        storage: numpy.array, optional
+            Minimums and maximums of all levels one after another, 2 x sum
+            of level_sizes, allocated in memory when not given.
+        built: bool
+            Storage already holds levels, e.g. from previous build.
+        """
+        self.x = x
+        self.y = y
+        self.factor = factor
+        self.levels: List[Tuple[np.array, np.array, np.array]] = []
+
+        sizes = level_sizes(y.size, factor, min_buckets)
+        if storage is None:
+            storage = np.empty((2, sum(sizes)), dtype=y.dtype)
+        self.storage = storage
+        offset = 0
+        mins, maxs = y, y
+        for depth, size in enumerate(sizes, 1):
+            level_mins = storage[0, offset:offset + size]
+            level_maxs = storage[1, offset:offset + size]
+            if not built:
+                starts = np.arange(0, mins.size, factor)
+                np.minimum.reduceat(mins, starts, out=level_mins)
+                np.maximum.reduceat(maxs, starts, out=level_maxs)
+            self.levels.append((x[::self.bucket(depth)], level_mins,
+                                level_maxs))
+            mins, maxs = level_mins, level_maxs
+            offset += size
+
+    def bounds(self) -> Tuple[Tuple[float, float], Tuple[float, float]]:
+        """
+        Return x and y bounds of the whole series.
+
+        Returns
+        -------
+        Tuple[Tuple[float, float], Tuple[float, float]]
+        """
+        mins, maxs = self.levels[-1][1:] if self.levels else (self.y, self.y)
+        return ((self.x[0], self.x[-1]),
+                (float(np.min(mins)), float(np.max(maxs))))
+
+    def bucket(self, level: int) -> int:
+        """
+        Return number of raw samples merged into single bucket of level.
+
+        Parameters
+        ----------
+        level: int
+
+        Returns
+        -------
+        int
+        """
+        return self.factor ** level
+
+    def locate(self, x_min: float, x_max: float,
+               pixels: int) -> Tuple[int, int, int]:
+        """
+        Find level and range of buckets to draw x range on given width.
+
+        The coarsest level that still has at least one bucket per pixel is
+        chosen. Range is extended by one bucket on both sides, so line does
+        not end at the edges of view.
+
+        Parameters
+        ----------
+        x_min: float
+        x_max: float
+        pixels: int
+            Width of view in pixels.
+
+        Returns
+        -------
+        Tuple[int, int, int]
+            Level, first bucket and bucket after the last one.
+        """
+        first = int(np.searchsorted(self.x, x_min, side='left'))
+        last = int(np.searchsorted(self.x, x_max, side='right'))
+        samples = last - first
+        pixels = max(int(pixels), 1)
+
+        level = 0
+        while (level < len(self.levels)
+               and samples // self.bucket(level + 1) >= pixels):
+            level += 1
+
+        bucket = self.bucket(level)
+        size = self.x.size if level == 0 else self.levels[level - 1][0].size
+        return (level, max(first // bucket - 1, 0),
+                min(-(-last // bucket) + 1, size))
+
+    def render(self, level: int, start: int,
+               stop: int) -> Tuple[np.array, np.array]:
+        """
+        Return points of level ready to be drawn.
+
+        Each bucket is drawn as vertical segment from its minimum to maximum.
+        The last raw sample is always appended to the last bucket, so bounds
+        of decimated series are the same as of raw one.
+
+        Parameters
+        ----------
+        level: int
+        start: int
+        stop: int
+
+        Returns
+        -------
+        Tuple[numpy.array, numpy.array]
+        """
+        if level == 0:
+            return self.x[start:stop], self.y[start:stop]
+
+        x_level, mins, maxs = self.levels[level - 1]
+        x = np.repeat(x_level[start:stop], 2)
+        y = np.empty(x.size, dtype=mins.dtype)
+        y[0::2] = mins[start:stop]
+        y[1::2] = maxs[start:stop]
+        if stop == x_level.size:
+            x = np.append(x, self.x[-1])
+            y = np.append(y, self.y[-1])
+        return x, y
@@ -0,0 +1,49 @@
+from typing import Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+MAD_SCALE = 1.4826  # scale of median absolute deviation for normal noise
+WINDOWS_PER_STEP = 256  # windows evaluated at once, bounds temporary memory
+
+
+def windowed_mad(values: np.array, window: int, hop: int
+                 ) -> Tuple[np.array, np.array, np.array]:
+    """
+    Compute median absolute deviation and peak in windows starting every hop.
+
+    Every window is evaluated from scratch, groups of windows at once.
+    Readings shorter than window form a single window.
+
+    Parameters
+    ----------
+    values: numpy.array
+        Readings.
+    window: int
+        Samples in window.
+    hop: int
+        Samples between starts of windows.
+
+    Returns
+    -------
+    Tuple[numpy.array, numpy.array, numpy.array]
+        Centers of windows, scaled median absolute deviation and maximum of
+        readings in every window.
+    """
+    values = np.asarray(values)
+    window = max(min(window, values.size), 1)
+    starts = np.arange(0, values.size - window + 1, hop)
+    if starts[-1] + window < values.size:
+        # the last window is aligned with the end of readings
+        starts = np.append(starts, values.size - window)
+
+    windows = sliding_window_view(values, window)
+    mad = np.empty(starts.size)
+    peaks = np.empty(starts.size)
+    for first in range(0, starts.size, WINDOWS_PER_STEP):
+        group = windows[starts[first:first + WINDOWS_PER_STEP]]
+        median = np.median(group, axis=1, keepdims=True)
+        mad[first:first + WINDOWS_PER_STEP] = np.median(
+            np.abs(group - median), axis=1)
+        peaks[first:first + WINDOWS_PER_STEP] = group.max(axis=1)
+    return starts + (window - 1) / 2, mad * MAD_SCALE, peaks
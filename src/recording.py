@@ -0,0 +1,261 @@
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src import recording_cache
+from src.min_max_pyramid import MinMaxPyramid, level_sizes
+from src.sampling import Sampling
+
+TimePoint = Union[int, str, pd.Timestamp]
+
+
+class Recording:
+    """
+    EEG recording backed by memory-mapped sidecar cache.
+
+    Readings are never loaded as a whole. Time-range windows are located
+    with binary search over timestamps and only their pages are read.
+    Identity of recording is fingerprint of its file, not its path.
+    Sampling is estimated once, when the cache is written, and readings are
+    resampled onto uniform grid split into blocks at dropouts.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        fingerprint = recording_cache.fingerprint(path)
+        self.identity: Tuple = (fingerprint['size'], fingerprint['mtime'],
+                                fingerprint['hash'])
+        timestamps, channels, blocks, info = recording_cache.load(path)
+        self.timestamps: np.array = timestamps
+        self.channels: Dict[str, np.array] = channels
+        self.blocks: np.array = blocks
+        self.sampling: Sampling = Sampling(**info['sampling'])
+        self.pyramids: Dict[str, MinMaxPyramid] = {}
+
+    def __len__(self) -> int:
+        return self.timestamps.size
+
+    def __getitem__(self, column: str) -> np.array:
+        return self.channels[column]
+
+    @property
+    def columns(self) -> List[str]:
+        """
+        Return names of recorded channels.
+
+        Returns
+        -------
+        List[str]
+        """
+        return list(self.channels)
+
+    @property
+    def start(self) -> pd.Timestamp:
+        """
+        Return timestamp of the first reading.
+
+        Returns
+        -------
+        pandas.Timestamp
+        """
+        return pd.Timestamp(int(self.timestamps[0]))
+
+    @property
+    def end(self) -> pd.Timestamp:
+        """
+        Return timestamp of the last reading.
+
+        Returns
+        -------
+        pandas.Timestamp
+        """
+        return pd.Timestamp(int(self.timestamps[-1]))
+
+    def index_range(self, start: Optional[TimePoint] = None,
+                    end: Optional[TimePoint] = None) -> slice:
+        """
+        Return slice of readings between start and end (both inclusive).
+
+        Parameters
+        ----------
+        start: int, str or pandas.Timestamp, optional
+            Beginning of window, nanoseconds when int.
+        end: int, str or pandas.Timestamp, optional
+            End of window, nanoseconds when int.
+
+        Returns
+        -------
+        slice
+        """
+        first = 0 if start is None else int(np.searchsorted(
+            self.timestamps, pd.Timestamp(start).value, side='left'))
+        last = len(self) if end is None else int(np.searchsorted(
+            self.timestamps, pd.Timestamp(end).value, side='right'))
+        return slice(first, last)
+
+    def block_slices(self) -> List[slice]:
+        """
+        Return slices of contiguous, uniformly sampled blocks.
+
+        Returns
+        -------
+        List[slice]
+        """
+        return [slice(start, stop) for start, stop in self.blocks]
+
+    def boundaries(self, index: slice) -> np.array:
+        """
+        Return starts of blocks inside range of readings.
+
+        Parameters
+        ----------
+        index: slice
+            Range of readings, e.g. from index_range.
+
+        Returns
+        -------
+        numpy.array
+            Indexes relative to the beginning of range, without 0.
+        """
+        starts = self.blocks[:, 0]
+        starts = starts[(starts > index.start) & (starts < index.stop)]
+        return starts - index.start
+
+    def span(self, column: str, start: Optional[TimePoint] = None,
+             end: Optional[TimePoint] = None) -> Tuple[np.array, np.array]:
+        """
+        Return timestamps and readings of single channel in time range.
+
+        Returned arrays are views of memory-mapped file.
+
+        Parameters
+        ----------
+        column: str
+        start: int, str or pandas.Timestamp, optional
+        end: int, str or pandas.Timestamp, optional
+
+        Returns
+        -------
+        Tuple[numpy.array, numpy.array]
+        """
+        index = self.index_range(start, end)
+        return self.timestamps[index], self.channels[column][index]
+
+    def pyramid(self, column: str) -> MinMaxPyramid:
+        """
+        Return min/max level of detail pyramid of channel.
+
+        Pyramid is built once and its levels are stored in sidecar cache next
+        to readings, later requests and loads memory-map them, so they are
+        not held in memory.
+
+        Parameters
+        ----------
+        column: str
+
+        Returns
+        -------
+        MinMaxPyramid
+        """
+        if column not in self.pyramids:
+            values = self.channels[column]
+            if not isinstance(values, np.memmap):
+                # readings are not cached, neither are levels
+                self.pyramids[column] = self.derived_pyramid(values)
+                return self.pyramids[column]
+
+            index = self.columns.index(column)
+            storage, built = recording_cache.open_levels(
+                self.path, index, (2, sum(level_sizes(values.size))),
+                values.dtype)
+            self.pyramids[column] = MinMaxPyramid(
+                self.timestamps, values, storage=storage, built=built)
+            if storage is not None and not built:
+                recording_cache.commit_levels(self.path, index, storage)
+        return self.pyramids[column]
+
+    def derived_pyramid(self, values: np.array,
+                        storage: Optional[np.array] = None) -> MinMaxPyramid:
+        """
+        Return min/max pyramid of series computed from recording.
+
+        Series has to be aligned with timestamps, e.g. filtered channel.
+        Levels are kept in memory, x of every level is strided view of
+        timestamps, so it is shared by all pyramids of recording.
+
+        Parameters
+        ----------
+        values: numpy.array
+        storage: numpy.array, optional
+            Levels of previous pyramid of the same series, they are reused
+            instead of being built again.
+
+        Returns
+        -------
+        MinMaxPyramid
+        """
+        return MinMaxPyramid(self.timestamps, values, storage=storage,
+                             built=storage is not None)
+
+    def window(self, start: Optional[TimePoint] = None,
+               end: Optional[TimePoint] = None,
+               columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Return readings in time range as DataFrame.
+
+        Parameters
+        ----------
+        start: int, str or pandas.Timestamp, optional
+        end: int, str or pandas.Timestamp, optional
+        columns: List[str], optional
+            Channels to include, all by default.
+
+        Returns
+        -------
+        pandas.DataFrame
+            DataFrame with eeg readings indexed by datetime.
+        """
+        index = self.index_range(start, end)
+        return pd.DataFrame(
+            {column: self.channels[column][index]
+             for column in columns or self.columns},
+            index=pd.to_datetime(self.timestamps[index]))
+
+    def last(self, seconds: Optional[int] = None,
+             columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Return last x seconds of readings.
+
+        Parameters
+        ----------
+        seconds: int, optional
+            Number of seconds to return data for, whole recording if not set.
+        columns: List[str], optional
+
+        Returns
+        -------
+        pandas.DataFrame
+        """
+        index = self.last_range(seconds)
+        return self.window(self.timestamps[index.start],
+                           self.timestamps[index.stop - 1], columns)
+
+    def last_range(self, seconds: Optional[int] = None) -> slice:
+        """
+        Return slice of last x seconds of readings.
+
+        Parameters
+        ----------
+        seconds: int, optional
+            Number of seconds, whole recording if not set.
+
+        Returns
+        -------
+        slice
+        """
+        if not seconds:
+            return slice(0, len(self))
+        return self.index_range(self.end - timedelta(seconds=seconds),
+                                self.end)
@@ -0,0 +1,310 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.resampling import resample_uniform
+from src.sampling import estimate_sampling
+
+CACHE_VERSION = 3
+CACHE_SUFFIX = '.cache'
+HASH_BLOCK = 1 << 16  # 64KiB read from both ends of the file
+META_FILE = 'meta.json'
+TIMESTAMPS_FILE = 'timestamps.npy'
+BLOCKS_FILE = 'blocks.npy'
+
+Loaded = Tuple[np.array, Dict[str, np.array], np.array, Dict]
+
+
+def cache_dir(path: str) -> str:
+    """
+    Return sidecar cache directory for recording.
+
+    Parameters
+    ----------
+    path: str
+        Path to csv file with recordings.
+
+    Returns
+    -------
+    str
+    """
+    return f"{path}{CACHE_SUFFIX}"
+
+
+def _channel_file(index: int) -> str:
+    """
+    Return file name of cached channel.
+
+    Column names (e.g. 'Right AUX') are not safe file names, so channels are
+    stored under their position and names are kept in metadata.
+
+    Parameters
+    ----------
+    index: int
+
+    Returns
+    -------
+    str
+    """
+    return f"channel_{index}.npy"
+
+
+def _levels_file(index: int) -> str:
+    """
+    Return file name of cached min/max levels of channel.
+
+    Parameters
+    ----------
+    index: int
+
+    Returns
+    -------
+    str
+    """
+    return f"levels_{index}.npy"
+
+
+def fingerprint(path: str) -> Dict:
+    """
+    Compute fingerprint of recording used to validate cache.
+
+    Fingerprint consists of file size, modification time and hash of the first
+    and last block of the file, so it is cheap even for multi-hour recordings.
+
+    Parameters
+    ----------
+    path: str
+
+    Returns
+    -------
+    Dict
+    """
+    stat = os.stat(path)
+    digest = hashlib.sha1()
+    with open(path, 'rb') as file:
+        digest.update(file.read(HASH_BLOCK))
+        if stat.st_size > HASH_BLOCK:
+            file.seek(max(HASH_BLOCK, stat.st_size - HASH_BLOCK))
+            digest.update(file.read(HASH_BLOCK))
+    return {
+        'version': CACHE_VERSION,
+        'size': stat.st_size,
+        'mtime': stat.st_mtime_ns,
+        'hash': digest.hexdigest(),
+    }
+
+
+def _read_csv(path: str) -> Tuple[np.array, Dict[str, np.array]]:
+    """
+    Parse csv file with recordings.
+
+    Parameters
+    ----------
+    path: str
+
+    Returns
+    -------
+    Tuple[numpy.array, Dict[str, numpy.array]]
+        Timestamps in nanoseconds and float32 readings for each column.
+    """
+    eeg = pd.read_csv(path, index_col=0)
+    timestamps = (eeg.index * 1000000000).astype(np.int64).to_numpy()
+    channels = {column: eeg[column].to_numpy(dtype=np.float32)
+                for column in eeg.columns}
+    return timestamps, channels
+
+
+def write_cache(path: str, timestamps: np.array,
+                channels: Dict[str, np.array], blocks: np.array,
+                info: Dict) -> None:
+    """
+    Write sidecar cache for recording.
+
+    Metadata is written last, so interrupted write never produces a cache
+    that passes validation.
+
+    Parameters
+    ----------
+    path: str
+        Path to csv file with recordings.
+    timestamps: numpy.array
+        Timestamps in nanoseconds.
+    channels: Dict[str, numpy.array]
+        Readings for each column.
+    blocks: numpy.array
+        Contiguous blocks of readings, blocks x 2.
+    info: Dict
+        Properties of recording computed on the first load.
+
+    Returns
+    -------
+    None
+    """
+    directory = cache_dir(path)
+    if os.path.isdir(directory):
+        shutil.rmtree(directory)
+    os.makedirs(directory)
+
+    np.save(os.path.join(directory, TIMESTAMPS_FILE),
+            np.ascontiguousarray(timestamps, dtype=np.int64))
+    np.save(os.path.join(directory, BLOCKS_FILE),
+            np.ascontiguousarray(blocks, dtype=np.int64))
+    columns: List[str] = []
+    for index, (column, values) in enumerate(channels.items()):
+        np.save(os.path.join(directory, _channel_file(index)),
+                np.ascontiguousarray(values, dtype=np.float32))
+        columns.append(column)
+
+    meta = fingerprint(path)
+    meta['columns'] = columns
+    meta['info'] = info
+    with open(os.path.join(directory, META_FILE), 'w') as file:
+        json.dump(meta, file)
+
+
+def read_cache(path: str) -> Optional[Loaded]:
+    """
+    Memory-map sidecar cache if it is valid for recording.
+
+    Parameters
+    ----------
+    path: str
+        Path to csv file with recordings.
+
+    Returns
+    -------
+    Tuple[numpy.array, Dict[str, numpy.array], numpy.array, Dict], optional
+        Timestamps, readings, contiguous blocks and properties of recording,
+        or None when cache is missing or stale.
+    """
+    directory = cache_dir(path)
+    try:
+        with open(os.path.join(directory, META_FILE)) as file:
+            meta = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    columns = meta.pop('columns', None)
+    info = meta.pop('info', None)
+    if columns is None or info is None or meta != fingerprint(path):
+        return None
+
+    try:
+        timestamps = np.load(os.path.join(directory, TIMESTAMPS_FILE),
+                             mmap_mode='r')
+        blocks = np.load(os.path.join(directory, BLOCKS_FILE))
+        channels = {
+            column: np.load(os.path.join(directory, _channel_file(index)),
+                            mmap_mode='r')
+            for index, column in enumerate(columns)}
+    except (OSError, ValueError):
+        return None
+    return timestamps, channels, blocks, info
+
+
+def open_levels(path: str, index: int, shape: Tuple[int, int],
+                dtype: np.dtype) -> Tuple[Optional[np.array], bool]:
+    """
+    Memory-map cached min/max levels of channel or create file for them.
+
+    New levels are written to temporary file, which replaces cached one in
+    commit_levels, so interrupted build is never taken for complete.
+
+    Parameters
+    ----------
+    path: str
+        Path to csv file with recordings.
+    index: int
+        Position of channel.
+    shape: Tuple[int, int]
+        Shape of levels storage.
+    dtype: numpy.dtype
+
+    Returns
+    -------
+    Tuple[numpy.array, bool], optional
+        Storage of levels, or None when it cannot be cached, and whether it
+        already holds levels.
+    """
+    file = os.path.join(cache_dir(path), _levels_file(index))
+    try:
+        levels = np.load(file, mmap_mode='r')
+        if levels.shape == tuple(shape) and levels.dtype == dtype:
+            return levels, True
+    except (OSError, ValueError):
+        pass
+    if not np.prod(shape):
+        return None, False
+    try:
+        return np.lib.format.open_memmap(f"{file}.tmp", mode='w+',
+                                         dtype=dtype, shape=shape), False
+    except OSError as error:
+        logging.warning(f"Levels cache not written: {error}")
+        return None, False
+
+
+def commit_levels(path: str, index: int, levels: np.memmap) -> None:
+    """
+    Flush levels built by open_levels and make them valid cache.
+
+    Parameters
+    ----------
+    path: str
+        Path to csv file with recordings.
+    index: int
+        Position of channel.
+    levels: numpy.memmap
+        Storage returned by open_levels.
+
+    Returns
+    -------
+    None
+    """
+    levels.flush()
+    try:
+        os.replace(levels.filename,
+                   os.path.join(cache_dir(path), _levels_file(index)))
+    except OSError as error:
+        logging.warning(f"Levels cache not written: {error}")
+
+
+def load(path: str) -> Loaded:
+    """
+    Load recording, using sidecar cache whenever possible.
+
+    The first load parses csv file, estimates sampling, resamples readings
+    onto uniform grid and writes the cache, subsequent loads memory-map
+    cached arrays without any parsing.
+
+    Parameters
+    ----------
+    path: str
+        Path to csv file with recordings.
+
+    Returns
+    -------
+    Tuple[numpy.array, Dict[str, numpy.array], numpy.array, Dict]
+        Uniform timestamps in nanoseconds, float32 readings for each column,
+        contiguous blocks of readings and properties of recording.
+    """
+    cached = read_cache(path)
+    if cached is not None:
+        return cached
+
+    timestamps, channels = _read_csv(path)
+    sampling = estimate_sampling(timestamps)
+    timestamps, channels, blocks = resample_uniform(timestamps, channels,
+                                                    sampling.period)
+    info = {'sampling': sampling._asdict()}
+    try:
+        write_cache(path, timestamps, channels, blocks, info)
+    except OSError as error:
+        logging.warning(f"Recording cache not written: {error}")
+        return timestamps, channels, blocks, info
+    return read_cache(path) or (timestamps, channels, blocks, info)
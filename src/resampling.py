@@ -0,0 +1,72 @@
+from typing import Dict, Tuple
+
+import numpy as np
+
+from src.sampling import GAP_FACTOR
+
+
+def find_blocks(timestamps: np.array, period: float) -> np.array:
+    """
+    Find contiguous blocks of readings separated by dropouts.
+
+    Parameters
+    ----------
+    timestamps: numpy.array
+        Timestamps in nanoseconds.
+    period: float
+        Sampling period in seconds.
+
+    Returns
+    -------
+    numpy.array
+        Blocks x 2 array with first index and index after the last one.
+    """
+    gaps = np.flatnonzero(np.diff(timestamps) > GAP_FACTOR * period * 1e9)
+    starts = np.concatenate([[0], gaps + 1])
+    stops = np.concatenate([gaps + 1, [timestamps.size]])
+    return np.stack([starts, stops], axis=1)
+
+
+def resample_uniform(timestamps: np.array, channels: Dict[str, np.array],
+                     period: float
+                     ) -> Tuple[np.array, Dict[str, np.array], np.array]:
+    """
+    Map readings onto uniform grid.
+
+    Every contiguous block gets its own grid starting at its first timestamp,
+    readings are linearly interpolated onto it. Grid does not span dropouts,
+    so no readings are invented for them.
+
+    Parameters
+    ----------
+    timestamps: numpy.array
+        Timestamps in nanoseconds.
+    channels: Dict[str, numpy.array]
+        Readings for each column.
+    period: float
+        Sampling period in seconds.
+
+    Returns
+    -------
+    Tuple[numpy.array, Dict[str, numpy.array], numpy.array]
+        Uniform timestamps, resampled float32 readings and blocks of
+        resampled readings.
+    """
+    period_ns = period * 1e9
+    blocks = find_blocks(timestamps, period)
+    first = timestamps[blocks[:, 0]]
+    last = timestamps[blocks[:, 1] - 1]
+    counts = np.round((last - first) / period_ns).astype(np.int64) + 1
+
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    offsets = np.arange(counts.sum()) - np.repeat(starts, counts)
+    grid = np.repeat(first, counts) + np.round(
+        offsets * period_ns).astype(np.int64)
+
+    # relative time keeps interpolation precise in float64
+    origin = timestamps[0]
+    raw = (timestamps - origin).astype(np.float64)
+    uniform = (grid - origin).astype(np.float64)
+    resampled = {column: np.interp(uniform, raw, values).astype(np.float32)
+                 for column, values in channels.items()}
+    return grid, resampled, np.stack([starts, starts + counts], axis=1)
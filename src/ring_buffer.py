@@ -0,0 +1,146 @@
+from typing import Tuple
+
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Preallocated buffer keeping the latest samples of a stream.
+
+    Samples are addressed by their absolute position in the stream, i.e.
+    number of samples written before them, so readers can track what they
+    have already processed while the buffer wraps around.
+    """
+
+    def __init__(self, channels: int, capacity: int,
+                 dtype: np.dtype = np.float32):
+        self.channels = channels
+        self.capacity = capacity
+        self.data = np.zeros((channels, capacity), dtype=dtype)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.total = 0
+        self._offsets = np.arange(0)
+        self._positions = np.arange(0)
+
+    def __len__(self) -> int:
+        return min(self.total, self.capacity)
+
+    @property
+    def start(self) -> int:
+        """
+        Absolute position of the oldest sample kept in buffer.
+
+        Returns
+        -------
+        int
+        """
+        return self.total - len(self)
+
+    def clear(self) -> None:
+        """
+        Forget all samples.
+
+        Returns
+        -------
+        None
+        """
+        self.total = 0
+
+    def extend(self, chunk: np.array, timestamps: np.array) -> None:
+        """
+        Append chunk of samples, overwriting the oldest ones.
+
+        Parameters
+        ----------
+        chunk: numpy.array
+            Readings, channels x samples.
+        timestamps: numpy.array
+            Timestamp of every sample.
+
+        Returns
+        -------
+        None
+        """
+        chunk = np.asarray(chunk).reshape(self.channels, -1)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if chunk.shape[-1] > self.capacity:
+            self.total += chunk.shape[-1] - self.capacity
+            chunk = chunk[:, -self.capacity:]
+            timestamps = timestamps[-self.capacity:]
+
+        size = chunk.shape[-1]
+        first = self.total % self.capacity
+        split = min(size, self.capacity - first)
+        self.data[:, first:first + split] = chunk[:, :split]
+        self.data[:, :size - split] = chunk[:, split:]
+        self.timestamps[first:first + split] = timestamps[:split]
+        self.timestamps[:size - split] = timestamps[split:]
+        self.total += size
+
+    def read(self, start: int, stop: int) -> Tuple[np.array, np.array]:
+        """
+        Return samples between absolute positions.
+
+        Parameters
+        ----------
+        start: int
+            Absolute position of the first sample.
+        stop: int
+            Absolute position after the last sample.
+
+        Returns
+        -------
+        Tuple[numpy.array, numpy.array]
+            Timestamps and readings, channels x samples, in order of arrival.
+        """
+        if start < self.start or stop > self.total:
+            raise IndexError(f"Samples {start}:{stop} are not in buffer "
+                             f"{self.start}:{self.total}.")
+        positions = np.arange(start, stop)
+        return (self.timestamps.take(positions, mode='wrap'),
+                self.data.take(positions, axis=1, mode='wrap'))
+
+    def last(self, size: int) -> Tuple[np.array, np.array]:
+        """
+        Return the latest samples.
+
+        Parameters
+        ----------
+        size: int
+            Number of samples, at most all samples kept in buffer.
+
+        Returns
+        -------
+        Tuple[numpy.array, numpy.array]
+            Timestamps and readings, channels x samples, in order of arrival.
+        """
+        return self.read(self.total - min(size, len(self)), self.total)
+
+    def copy_last(self, out: np.array) -> int:
+        """
+        Copy the latest samples into preallocated array.
+
+        Index arrays are kept between calls, so nothing is allocated while
+        size of out stays the same, e.g. on every frame of live view.
+        Samples missing at the start of stream are set to zero.
+
+        Parameters
+        ----------
+        out: numpy.array
+            Destination, channels x samples.
+
+        Returns
+        -------
+        int
+            Number of samples copied, aligned to the end of out.
+        """
+        size = out.shape[-1]
+        if self._offsets.size != size:
+            self._offsets = np.arange(size)
+            self._positions = np.empty(size, dtype=np.intp)
+        np.add(self._offsets, self.total - size, out=self._positions)
+        np.mod(self._positions, self.capacity, out=self._positions)
+        np.take(self.data, self._positions, axis=1, out=out, mode='clip')
+        copied = min(size, len(self))
+        out[:, :size - copied] = 0
+        return copied
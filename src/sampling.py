@@ -0,0 +1,61 @@
+from typing import NamedTuple
+
+import numpy as np
+
+GAP_FACTOR = 3  # interval longer than 3 typical intervals is a dropout
+NOMINAL_RATE = 256  # Hz, sampling rate of Muse EEG
+
+
+class Sampling(NamedTuple):
+    """
+    Sampling of recording estimated from its timestamps.
+
+    rate: float
+        Sampling rate in Hz.
+    period: float
+        Sampling period in seconds.
+    jitter: float
+        Standard deviation of intervals between samples in seconds.
+    max_interval: float
+        The longest interval between samples in seconds.
+    gaps: int
+        Number of dropouts.
+    """
+    rate: float
+    period: float
+    jitter: float
+    max_interval: float
+    gaps: int
+
+
+def estimate_sampling(timestamps: np.array) -> Sampling:
+    """
+    Estimate sampling from timestamps.
+
+    Muse timestamps are stored with millisecond resolution, so intervals
+    alternate between 3 and 4ms and median interval gives 250Hz instead of
+    256Hz. Rate is therefore number of intervals divided by their total
+    duration, with dropouts excluded. Fewer than two timestamps give nominal
+    Muse rate.
+
+    Parameters
+    ----------
+    timestamps: numpy.array
+        Timestamps in nanoseconds.
+
+    Returns
+    -------
+    Sampling
+    """
+    intervals = np.diff(np.asarray(timestamps, dtype=np.int64)) / 1e9
+    if intervals.size == 0:
+        return Sampling(rate=float(NOMINAL_RATE), period=1 / NOMINAL_RATE,
+                        jitter=0., max_interval=0., gaps=0)
+    gaps = intervals > GAP_FACTOR * np.median(intervals)
+    regular = intervals[~gaps]
+    period = regular.sum() / regular.size
+    return Sampling(rate=float(1 / period),
+                    period=float(period),
+                    jitter=float(regular.std()),
+                    max_interval=float(intervals.max()),
+                    gaps=int(gaps.sum()))
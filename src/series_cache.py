@@ -0,0 +1,124 @@
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional
+
+import numpy as np
+
+MAX_BYTES = 512 * 2 ** 20  # 512MiB
+
+
+class SeriesCache:
+    """
+    Least recently used cache of computed series bounded by memory size.
+
+    Memory is counted by array owning the data, so rows of one array, e.g.
+    bands filtered at once, are counted once and their memory is released
+    only when the last of them is evicted.
+    """
+
+    def __init__(self, max_bytes: int = MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.series: OrderedDict = OrderedDict()
+        # owner of data and number of cached series sharing it
+        self.owners: Dict[int, List] = {}
+
+    @staticmethod
+    def _owner(series: np.array) -> np.array:
+        """
+        Return array owning memory of series.
+
+        Parameters
+        ----------
+        series: numpy.array
+
+        Returns
+        -------
+        numpy.array
+        """
+        base = series.base
+        return base if isinstance(base, np.ndarray) else series
+
+    def _add(self, series: np.array) -> None:
+        owner = self._owner(series)
+        if id(owner) not in self.owners:
+            self.owners[id(owner)] = [owner, 0]
+            self.nbytes += owner.nbytes
+        self.owners[id(owner)][1] += 1
+
+    def _remove(self, series: np.array) -> None:
+        owner = self._owner(series)
+        self.owners[id(owner)][1] -= 1
+        if not self.owners[id(owner)][1]:
+            del self.owners[id(owner)]
+            self.nbytes -= owner.nbytes
+
+    def __len__(self) -> int:
+        return len(self.series)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.series
+
+    def get(self, key: Hashable) -> Optional[np.array]:
+        """
+        Return cached series and mark it as recently used.
+
+        Parameters
+        ----------
+        key: Hashable
+
+        Returns
+        -------
+        numpy.array, optional
+            Series or None if it is not cached.
+        """
+        if key not in self.series:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.series.move_to_end(key)
+        return self.series[key]
+
+    def put(self, key: Hashable, series: np.array) -> None:
+        """
+        Cache series, evicting least recently used ones to fit memory limit.
+
+        Series whose owner is larger than the whole limit is not cached.
+
+        Parameters
+        ----------
+        key: Hashable
+        series: numpy.array
+
+        Returns
+        -------
+        None
+        """
+        if key in self.series:
+            self._remove(self.series.pop(key))
+        owner = self._owner(series)
+        if owner.nbytes > self.max_bytes:
+            return
+        added = 0 if id(owner) in self.owners else owner.nbytes
+        while self.series and self.nbytes + added > self.max_bytes:
+            _, evicted = self.series.popitem(last=False)
+            self._remove(evicted)
+            if id(owner) not in self.owners:
+                added = owner.nbytes
+        self.series[key] = series
+        self._add(series)
+
+    def clear(self) -> None:
+        """
+        Remove all series and reset counters.
+
+        Returns
+        -------
+        None
+        """
+        self.series.clear()
+        self.owners.clear()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
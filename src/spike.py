@@ -1,27 +1,66 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
 from scipy.stats import zscore
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
 
 import numpy as np
 import pandas as pd
-from scipy.stats import median_absolute_deviation
-from sklearn.cluster import KMeans
-from sklearn.decomposition import PCA
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.stats import median_abs_deviation
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.decomposition import PCA, IncrementalPCA
+from sklearn.base import clone
+from sklearn.exceptions import NotFittedError
+from sklearn.metrics import silhouette_score
 from sklearn.preprocessing import StandardScaler
 
+from src.noise_level import MAD_SCALE, windowed_mad
+from src.ring_buffer import RingBuffer
+
 MIN_TIME_BETWEEN_SPIKES = 0.03  # 30ms
 SEARCH_PERIOD = 0.02  # 20ms
 SAMPLING = 256  # 256Hz => 1 sample every ~4ms
 SEARCH_SAMPLES = int(SEARCH_PERIOD * SAMPLING)
 WAVE_SIZE = int(MIN_TIME_BETWEEN_SPIKES * SAMPLING)
+NOISE_PERIOD = 10  # 10s of readings for noise estimate
+NOISE_HOP = 5  # 5s between starts of noise windows
+STAGES = ('detect', 'sort', 'extract_features', 'cluster')
+LARGE_SPIKE_SET = 50000  # spikes fitted in batches above this count
+BATCH_SIZE = 4096  # spikes in batch of incremental fitting
+MAX_CLUSTERS = 6
+SCORE_SAMPLE = 2000  # spikes used for silhouette score of clustering
+CLUSTER_INITS = 3  # initialisations of every clustering, the best is kept
+RANDOM_STATE = 0  # seed of clustering, same spikes give the same clusters
 
 
 class Spike:
-    def __init__(self, name: str):
+    """
+    Spike pipeline of single electrode.
+
+    Stages detect, sort, extract_features and cluster form a chain, every
+    stage runs the previous one on demand. Result of stage is reused as long
+    as readings and parameters of the stage and all previous ones are the
+    same, so each stage runs at most once for given readings.
+    """
+
+    def __init__(self, name: str, sampling_rate: float = SAMPLING,
+                 max_clusters: Optional[int] = None):
         self.name = name
+        self.sampling_rate: float = sampling_rate
+        self.search_samples: int = SEARCH_SAMPLES
+        self.wave_size: int = WAVE_SIZE
+        self.set_sampling_rate(sampling_rate)
 
         self.spike_threshold: float = 0.
         self.noise_level: float = 0.
+        self.noise_hop: float = NOISE_HOP
+        self.noise_windows: Optional[Tuple[np.array, np.array]] = None
+        self.thresholds: Optional[np.array] = None
         self.data: pd.Series = None
+        self.data_key: Optional[str] = None
+        self.boundaries: np.array = np.array([], dtype=np.int64)
+        self.stage_keys: Dict[str, tuple] = {}
         self.spikes: np.array = None
         self.sorted_spikes: np.array = None
         self.features: np.array = None
@@ -29,50 +68,244 @@ class Spike:
 
         self.scaler = StandardScaler()
         self.pca = PCA(n_components=2)
-        self.kmeans = KMeans(n_clusters=3)
+        self.kmeans = KMeans(n_clusters=3, n_init=CLUSTER_INITS,
+                             random_state=RANDOM_STATE)
+        self.large_spike_set: int = LARGE_SPIKE_SET
+        self.batch_size: int = BATCH_SIZE
+        self.feature_model: Optional[PCA] = None
+        self.cluster_model: Optional[KMeans] = None
+        self.max_clusters: Optional[int] = max_clusters
+        self.cluster_scores: Dict[int, float] = {}
+
+        self.buffer: Optional[RingBuffer] = None
+        self.channel: int = 0
+        self.checked: int = 0
+        self.pending: np.array = np.array([], dtype=np.int64)
+        self.last_potential_spike: Optional[int] = None
+
+    def set_sampling_rate(self, sampling_rate: float) -> None:
+        """
+        Set sampling rate and sizes of windows derived from it.
+
+        Parameters
+        ----------
+        sampling_rate: float
+            Sampling rate in Hz.
+
+        Returns
+        -------
+        None
+        """
+        self.sampling_rate = sampling_rate
+        self.search_samples = int(SEARCH_PERIOD * sampling_rate)
+        self.wave_size = int(MIN_TIME_BETWEEN_SPIKES * sampling_rate)
 
-    def set_data(self, data: pd.Series) -> None:
+    def __getstate__(self) -> Dict:
+        """
+        Return state for pickling without readings and live buffer.
+
+        Spike objects are sent to worker processes, which map readings from
+        shared memory. Thresholds of readings are interpolated again from
+        noise windows when readings are set back.
+
+        Returns
+        -------
+        Dict
+        """
+        state = self.__dict__.copy()
+        state['data'] = None
+        state['buffer'] = None
+        state['thresholds'] = None
+        return state
+
+    def set_data(self, data: pd.Series,
+                 sampling_rate: Optional[float] = None,
+                 boundaries: Optional[np.array] = None,
+                 key: Optional[str] = None) -> None:
         """
         Set new data.
 
+        Results of stages are kept, they are recomputed on demand only when
+        readings differ from the previous ones.
+
         Parameters
         ----------
         data: pandas.Series
             Data series with readings from single electrode.
+        sampling_rate: float, optional
+            Sampling rate of data in Hz, previous one is kept if not set.
+        boundaries: numpy.array, optional
+            Indexes where new contiguous block of readings starts.
+        key: str, optional
+            Identity of readings, computed from them if not set.
 
         Returns
         -------
         None
         """
+        if sampling_rate:
+            self.set_sampling_rate(sampling_rate)
+        key = key if key is not None else self.fingerprint(data)
+        if key != self.data_key:
+            self.thresholds = None
         self.data = data
-        self.spike_threshold: float = 0.
-        self.noise_level: float = 0.
-        self.spikes: np.array = None
-        self.sorted_spikes: np.array = None
-        self.features: np.array = None
+        self.data_key = key
+        self.boundaries = np.asarray(
+            boundaries if boundaries is not None else [], dtype=np.int64)
+
+    @staticmethod
+    def fingerprint(data: Optional[pd.Series]) -> Optional[str]:
+        """
+        Return identity of readings.
+
+        Identity is hash of readings, independent of the object holding them,
+        so the same span of recording read again is recognised.
+
+        Parameters
+        ----------
+        data: pandas.Series, optional
+
+        Returns
+        -------
+        str, optional
+        """
+        if data is None:
+            return None
+        values = np.ascontiguousarray(data.to_numpy())
+        digest = hashlib.blake2b(values.view(np.uint8), digest_size=16)
+        return f"{values.dtype.str}:{values.size}:{digest.hexdigest()}"
+
+    def stage_key(self, stage: str) -> tuple:
+        """
+        Return key of readings and parameters stage depends on.
+
+        Key of stage contains key of the previous stage, so change of input
+        invalidates all following stages.
+
+        Parameters
+        ----------
+        stage: str
+            One of STAGES.
+
+        Returns
+        -------
+        tuple
+        """
+        if stage == 'detect':
+            return (self.data_key, self.sampling_rate, self.search_samples,
+                    self.wave_size, NOISE_PERIOD, self.noise_hop,
+                    self.boundaries.tobytes())
+        previous = self.stage_key(STAGES[STAGES.index(stage) - 1])
+        if stage == 'sort':
+            return previous
+        if stage == 'extract_features':
+            return previous + (repr(self.pca.get_params()),
+                               self.large_spike_set, self.batch_size)
+        return previous + (repr(self.kmeans.get_params()), self.max_clusters)
+
+    def is_current(self, stage: str) -> bool:
+        """
+        Check if result of stage is valid for readings and parameters.
+
+        Parameters
+        ----------
+        stage: str
+
+        Returns
+        -------
+        bool
+        """
+        return (self.data_key is not None
+                and self.stage_keys.get(stage) == self.stage_key(stage))
+
+    def interpolate_thresholds(self) -> None:
+        """
+        Interpolate spike threshold of every reading from noise windows.
+
+        Returns
+        -------
+        None
+        """
+        if self.noise_windows is None or self.data is None:
+            self.thresholds = None
+            return
+        self.thresholds = np.interp(np.arange(len(self.data)),
+                                    *self.noise_windows)
 
     def _estimate_noise_level(self) -> None:
         """
-        Estimate noise level and determine spike threshold.
+        Estimate noise level and determine spike threshold for every reading.
 
-        Noise level is obtained with usage of median absolute deviation.
-        Spike threshold equals noise level multiplied by threshold multiplier.
+        Noise level is obtained with usage of median absolute deviation in
+        windows of NOISE_PERIOD starting every noise_hop seconds, so
+        threshold follows drifting impedance of electrodes. Spike threshold
+        of window equals its noise level multiplied by threshold multiplier,
+        thresholds are linearly interpolated between centers of windows once
+        and stored. Readings shorter than window get a single threshold.
+        Windows are kept, median of noise levels and thresholds is kept as
+        summary.
 
         Returns
         -------
         None
         """
-        self.noise_level = median_absolute_deviation(self.data)
-        threshold_mul = -5 if self.noise_level <= (max(self.data) / 5) else -2
+        window = int(NOISE_PERIOD * self.sampling_rate)
+        hop = max(int(self.noise_hop * self.sampling_rate), 1)
+        centers, noise_levels, peaks = windowed_mad(
+            self.data.to_numpy(), window, hop)
+        thresholds = noise_levels * np.where(noise_levels <= (peaks / 5),
+                                             -5, -2)
+        self.noise_windows = (centers, thresholds)
+        self.interpolate_thresholds()
+        self.noise_level = float(np.median(noise_levels))
+        self.spike_threshold = float(np.median(thresholds))
+
+    def _estimate_threshold(self, values: np.array) -> None:
+        """
+        Estimate noise level and spike threshold from readings.
+
+        Parameters
+        ----------
+        values: numpy.array
+
+        Returns
+        -------
+        None
+        """
+        self.noise_level = median_abs_deviation(values) * MAD_SCALE
+        peak = np.max(values)
+        threshold_mul = -5 if self.noise_level <= (peak / 5) else -2
         self.spike_threshold = self.noise_level * threshold_mul
 
+    @staticmethod
+    def _crossings(values: np.array, threshold) -> np.array:
+        """
+        Return indexes where readings cross spike threshold.
+
+        Parameters
+        ----------
+        values: numpy.array
+        threshold: float or numpy.array
+            Single threshold or threshold of every reading.
+
+        Returns
+        -------
+        numpy.array
+        """
+        return np.diff(
+            ((values <= threshold) |
+             (values >= -threshold)).astype(int) > 0).nonzero()[0]
+
     def _find_potential_spikes(self) -> np.array:
         """
         Find potential spikes.
 
         The first step is to extract only recordings that exceed threshold.
-        The second step is to remove potential spikes that are too close
-        to each other.
+        The second step is to remove potential spikes which wave would span
+        boundary of contiguous blocks or end of readings. The third step is
+        to remove potential spikes that are too close to the preceding one.
+        Removing them can only increase distances between remaining spikes,
+        so a single pass is enough.
 
         Returns
         -------
@@ -84,62 +317,89 @@ class Spike:
         # q3 = data.quantile(0.99)
         # data = data[~((data < q1) | (data > q3))]
 
-        potential_spikes = np.diff(
-            ((data <= self.spike_threshold) |
-             (data >= -self.spike_threshold)).astype(int) > 0).nonzero()[0]
+        potential_spikes = self._crossings(data.to_numpy(), self.thresholds)
         potential_spikes = potential_spikes[
-            (potential_spikes > WAVE_SIZE) &
-            (potential_spikes < (len(self.data) - WAVE_SIZE))]
-
-        def _insert_potential_spike():
-            return np.insert(np.diff(potential_spikes) >= WAVE_SIZE, 0, True)
-
-        min_spacing = _insert_potential_spike()
-        while not np.all(min_spacing):
-            potential_spikes = potential_spikes[min_spacing]
-            min_spacing = _insert_potential_spike()
+            (potential_spikes > self.wave_size) &
+            (potential_spikes + self.search_samples + self.wave_size
+             <= len(self.data))]
+        potential_spikes = potential_spikes[
+            np.searchsorted(self.boundaries, potential_spikes - self.wave_size,
+                            side='right') ==
+            np.searchsorted(self.boundaries, potential_spikes
+                            + self.search_samples + self.wave_size,
+                            side='right')]
 
-        return potential_spikes
+        min_spacing = np.empty(potential_spikes.size, dtype=bool)
+        min_spacing[:1] = True
+        np.greater_equal(np.diff(potential_spikes), self.wave_size,
+                         out=min_spacing[1:])
+        return potential_spikes[min_spacing]
 
     def detect(self) -> pd.Series:
         """
         Detect spikes for data series.
 
-        Save spike indexes.
+        Spike is the minimum of search window following potential spike.
+        Minimums of all windows are found at once, with windows being strided
+        view of readings. Save spike indexes.
 
         Returns
         -------
         pandas.Series
             Pandas series with timestamps of spikes
         """
+        if not self.is_current('detect'):
+            self._detect()
+            self.stage_keys['detect'] = self.stage_key('detect')
+        if self.thresholds is None:
+            self.interpolate_thresholds()
+        return pd.Series(self.thresholds[self.spikes],
+                         index=self.data.index[self.spikes])
+
+    def _detect(self) -> None:
+        """
+        Find spikes and save their indexes.
+
+        Returns
+        -------
+        None
+        """
         self._estimate_noise_level()
-        self.spikes = np.array([
-            index + np.argmin(self.data[index:index + SEARCH_SAMPLES])
-            for index in self._find_potential_spikes()])
+        potential_spikes = self._find_potential_spikes()
 
-        data = self.data * np.nan
-        data.iloc[self.spikes] = self.spike_threshold
-        return data.dropna()
+        if potential_spikes.size:
+            # search window and wave of every potential spike end before the
+            # end of data, so all windows are complete
+            windows = sliding_window_view(self.data.to_numpy(),
+                                          self.search_samples)
+            self.spikes = potential_spikes + np.argmin(
+                windows[potential_spikes], axis=1)
+        else:
+            self.spikes = potential_spikes
 
     def sort(self) -> Tuple[np.array, np.array]:
         """
         Spike sorting.
 
+        Waves of all spikes are gathered at once from strided window view of
+        readings.
+
         Returns
         -------
         Tuple[numpy.array, numpy.array]
             The first element is array with data of all spikes
             The second element is array with mean values of spikes
         """
-        if self.spikes is None:
-            _ = self.detect()
-        waves = []
-        for index in self.spikes:
-            waves.append(self.data.iloc[
-                         (index - WAVE_SIZE):(index + WAVE_SIZE)])
+        self.detect()
+        if not self.is_current('sort'):
+            self.sorted_spikes = None
+            if len(self.spikes):
+                windows = sliding_window_view(self.data.to_numpy(),
+                                              2 * self.wave_size)
+                self.sorted_spikes = windows[self.spikes - self.wave_size]
+            self.stage_keys['sort'] = self.stage_key('sort')
 
-        if len(waves):
-            self.sorted_spikes = np.stack(waves)
+        if self.sorted_spikes is not None:
             return self.sorted_spikes, self.sorted_spikes.mean(axis=0)
         return np.array([]), np.array([])
 
@@ -147,27 +407,261 @@ class Spike:
         """
         Extract features using PCA.
 
+        Spike sets larger than large_spike_set are scaled and projected with
+        incremental PCA fitted batch by batch, so memory used for fitting
+        does not grow with number of spikes.
+
         Returns
         -------
         numpy.array
 
         """
-        if self.sorted_spikes is None:
-            _ = self.sort()
-        scaled_spikes = self.scaler.fit_transform(self.sorted_spikes)
-        self.features = self.pca.fit_transform(scaled_spikes)
+        self.sort()
+        if not self.is_current('extract_features'):
+            if len(self.sorted_spikes) > self.large_spike_set:
+                self.features = self._extract_features_in_batches()
+            else:
+                scaled_spikes = self.scaler.fit_transform(self.sorted_spikes)
+                self.features = self.pca.fit_transform(scaled_spikes)
+                self.feature_model = self.pca
+            self.stage_keys['extract_features'] = self.stage_key(
+                'extract_features')
         return self.features
 
+    def _batches(self, values: np.array) -> list:
+        """
+        Split values into batches of similar size.
+
+        Parameters
+        ----------
+        values: numpy.array
+
+        Returns
+        -------
+        list
+        """
+        return np.array_split(values, -(-len(values) // self.batch_size))
+
+    def _extract_features_in_batches(self) -> np.array:
+        """
+        Extract features with incremental PCA.
+
+        Returns
+        -------
+        numpy.array
+        """
+        pca = IncrementalPCA(n_components=self.pca.n_components,
+                             batch_size=self.batch_size)
+        self.scaler = clone(self.scaler)
+        for batch in self._batches(self.sorted_spikes):
+            self.scaler.partial_fit(batch)
+        for batch in self._batches(self.sorted_spikes):
+            pca.partial_fit(self.scaler.transform(batch))
+        self.feature_model = pca
+        return np.concatenate([
+            pca.transform(self.scaler.transform(batch))
+            for batch in self._batches(self.sorted_spikes)])
+
     def cluster(self) -> np.array:
         """
         Return clusters.
 
+        Spike sets larger than large_spike_set are clustered with mini-batch
+        k-means with the same number of clusters. When max_clusters is set,
+        number of clusters is selected by _select_clusters.
+
         Returns
         -------
         numpy.array
             Array with clusters.
         """
-        if self.features is None:
-            _ = self.extract_features()
-        self.clusters = self.kmeans.fit_predict(self.features)
+        self.extract_features()
+        if not self.is_current('cluster'):
+            if self.max_clusters:
+                self.cluster_model, self.clusters = self._select_clusters()
+            else:
+                self.cluster_model = self._cluster_model(
+                    self.kmeans.n_clusters)
+                self.clusters = self.cluster_model.fit_predict(self.features)
+            self.stage_keys['cluster'] = self.stage_key('cluster')
         return self.clusters, self.features
+
+    @property
+    def n_clusters(self) -> int:
+        """
+        Number of clusters of the last clustering.
+
+        Returns
+        -------
+        int
+        """
+        if self.cluster_model is None:
+            return self.kmeans.n_clusters
+        return self.cluster_model.n_clusters
+
+    def _cluster_model(self, n_clusters: int) -> KMeans:
+        """
+        Return unfitted clustering model for number of clusters.
+
+        Parameters
+        ----------
+        n_clusters: int
+
+        Returns
+        -------
+        sklearn.cluster.KMeans or sklearn.cluster.MiniBatchKMeans
+        """
+        if len(self.features) > self.large_spike_set:
+            return MiniBatchKMeans(n_clusters=n_clusters,
+                                   batch_size=self.batch_size,
+                                   n_init=self.kmeans.n_init,
+                                   random_state=self.kmeans.random_state)
+        if n_clusters == self.kmeans.n_clusters:
+            return self.kmeans
+        return clone(self.kmeans).set_params(n_clusters=n_clusters)
+
+    def _select_clusters(self) -> Tuple[KMeans, np.array]:
+        """
+        Cluster features into 2..max_clusters clusters and keep the best.
+
+        Models are fitted concurrently in threads, quality of clustering is
+        silhouette score on the same random subsample of SCORE_SAMPLE
+        spikes for every number of clusters.
+
+        Returns
+        -------
+        Tuple[KMeans, numpy.array]
+            The best fitted model and its clusters.
+        """
+        counts = range(2, min(self.max_clusters, len(self.features) - 1) + 1)
+        if not len(counts):
+            model = self._cluster_model(self.kmeans.n_clusters)
+            return model, model.fit_predict(self.features)
+
+        sample = np.random.default_rng(0).permutation(
+            len(self.features))[:SCORE_SAMPLE]
+
+        def _fit(n_clusters: int) -> Tuple[KMeans, np.array, float]:
+            model = self._cluster_model(n_clusters)
+            clusters = model.fit_predict(self.features)
+            if len(np.unique(clusters[sample])) < 2:
+                return model, clusters, -1.
+            return model, clusters, silhouette_score(self.features[sample],
+                                                     clusters[sample])
+
+        with ThreadPoolExecutor(min(len(counts), os.cpu_count() or 1)) \
+                as executor:
+            results = list(executor.map(_fit, counts))
+        self.cluster_scores = {n_clusters: score for n_clusters, (_, _, score)
+                               in zip(counts, results)}
+        model, clusters, _ = max(results, key=lambda result: result[2])
+        return model, clusters
+
+    def start_online(self, buffer: RingBuffer, channel: int = 0) -> None:
+        """
+        Start online detection of spikes streamed into ring buffer.
+
+        Models fitted by sort, extract_features and cluster are kept, so new
+        spikes are assigned to already known clusters.
+
+        Parameters
+        ----------
+        buffer: RingBuffer
+            Buffer filled with live readings.
+        channel: int
+            Channel of the buffer with readings of this electrode.
+
+        Returns
+        -------
+        None
+        """
+        self.buffer = buffer
+        self.channel = channel
+        self.checked = buffer.total
+        self.pending = np.array([], dtype=np.int64)
+        self.last_potential_spike = None
+
+    def detect_online(self) -> Tuple[np.array, np.array, np.array]:
+        """
+        Detect spikes in readings added to ring buffer since the last call.
+
+        Spike threshold follows noise level of the latest NOISE_PERIOD of
+        readings. Potential spike is resolved as soon as its search window
+        and wave are complete, so latency is bounded by search period and
+        half of wave. Clusters are predicted with fitted models, -1 is
+        assigned when models are not fitted yet.
+
+        Returns
+        -------
+        Tuple[numpy.array, numpy.array, numpy.array]
+            Timestamps, waves and clusters of new spikes.
+        """
+        buffer = self.buffer
+        noise_samples = int(NOISE_PERIOD * self.sampling_rate)
+        no_spikes = (np.array([]), np.empty((0, 2 * self.wave_size)),
+                     np.array([], dtype=int))
+        if len(buffer) < noise_samples:
+            return no_spikes
+
+        _, values = buffer.last(noise_samples)
+        self._estimate_threshold(values[self.channel])
+        # summary of offline detection is replaced with the live one
+        self.stage_keys.pop('detect', None)
+
+        start = max(self.checked, buffer.start)
+        _, values = buffer.read(start, buffer.total)
+        crossings = start + self._crossings(values[self.channel],
+                                            self.spike_threshold)
+        self.checked = max(buffer.total - 1, start)
+        potential_spikes = np.concatenate([self.pending, crossings])
+        potential_spikes = potential_spikes[
+            potential_spikes - self.wave_size >= buffer.start]
+
+        ready = (potential_spikes + self.search_samples + self.wave_size
+                 <= buffer.total + 1)
+        self.pending = potential_spikes[~ready]
+        potential_spikes = potential_spikes[ready]
+        if not potential_spikes.size:
+            return no_spikes
+
+        previous = np.insert(potential_spikes[:-1], 0,
+                             self.last_potential_spike
+                             if self.last_potential_spike is not None
+                             else potential_spikes[0] - self.wave_size)
+        self.last_potential_spike = potential_spikes[-1]
+        potential_spikes = potential_spikes[
+            potential_spikes - previous >= self.wave_size]
+        if not potential_spikes.size:
+            return no_spikes
+
+        first = potential_spikes[0] - self.wave_size
+        timestamps, values = buffer.read(first, buffer.total)
+        values = values[self.channel]
+        offsets = potential_spikes - first
+        spikes = offsets + np.argmin(sliding_window_view(
+            values, self.search_samples)[offsets], axis=1)
+        waves = sliding_window_view(values, 2 * self.wave_size)[
+            spikes - self.wave_size]
+        return timestamps[spikes], waves, self._predict_clusters(waves)
+
+    def _predict_clusters(self, waves: np.array) -> np.array:
+        """
+        Assign waves to clusters found by cluster.
+
+        Parameters
+        ----------
+        waves: numpy.array
+
+        Returns
+        -------
+        numpy.array
+            Clusters, -1 when models are not fitted.
+        """
+        if self.feature_model is None or self.cluster_model is None:
+            return np.full(len(waves), -1)
+        try:
+            features = self.feature_model.transform(
+                self.scaler.transform(waves))
+            return self.cluster_model.predict(features)
+        except NotFittedError:
+            return np.full(len(waves), -1)
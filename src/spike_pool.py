@@ -0,0 +1,144 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.spike import STAGES, Spike
+
+Layout = Tuple[str, Tuple[int, int], str]
+
+
+def _run_pipeline(spike: Spike, layout: Layout, row: int,
+                  stage: str) -> Spike:
+    """
+    Run spike pipeline of one electrode in worker process.
+
+    Readings are taken from shared memory, neither they nor per-sample
+    thresholds are pickled.
+
+    Parameters
+    ----------
+    spike: Spike
+        Spike without readings.
+    layout: Tuple[str, Tuple[int, int], str]
+        Name of shared memory, shape and dtype of readings.
+    row: int
+        Row of readings of electrode.
+    stage: str
+        The last stage to run, earlier ones are run on demand.
+
+    Returns
+    -------
+    Spike
+        Spike with results of all stages up to the requested one.
+    """
+    name, shape, dtype = layout
+    memory = SharedMemory(name=name)
+    try:
+        readings = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+        spike.set_data(pd.Series(readings[row], copy=False),
+                       boundaries=spike.boundaries, key=spike.data_key)
+        getattr(spike, stage)()
+    finally:
+        spike.data = None
+        memory.close()
+    return spike
+
+
+class SpikePool:
+    """
+    Process pool running spike pipelines of electrodes concurrently.
+
+    Readings of electrodes are copied once into shared memory, workers map
+    them without pickling and send back Spike objects with results, which
+    replace the objects passed in. Electrodes with current results of
+    requested stage are not sent at all. Workers are spawned on the first
+    use and reused, so importing of numerical libraries is paid once.
+    """
+
+    def __init__(self, processes: Optional[int] = None):
+        self.processes = processes or os.cpu_count() or 1
+        self.executor: Optional[ProcessPoolExecutor] = None
+
+    def shutdown(self) -> None:
+        """
+        Stop worker processes.
+
+        Returns
+        -------
+        None
+        """
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def run(self, spikes: Dict[str, Spike], data: pd.DataFrame,
+            stage: str = 'cluster', sampling_rate: Optional[float] = None,
+            boundaries: Optional[np.array] = None) -> None:
+        """
+        Run pipelines of all electrodes up to stage.
+
+        Parameters
+        ----------
+        spikes: Dict[str, Spike]
+            Spike objects of electrodes, results are stored in the dictionary.
+        data: pandas.DataFrame
+            Readings with column for each electrode.
+        stage: str
+            One of 'detect', 'sort', 'extract_features' or 'cluster'.
+        sampling_rate: float, optional
+        boundaries: numpy.array, optional
+            Indexes where new contiguous block of readings starts.
+
+        Returns
+        -------
+        None
+        """
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage {stage}, expected one of "
+                             f"{', '.join(STAGES)}.")
+        columns = []
+        for column in spikes:
+            # readings are analysed as float32 held in shared memory, so
+            # results and their key do not depend on number of processes
+            spikes[column].set_data(data[column].astype(np.float32),
+                                    sampling_rate, boundaries)
+            if not spikes[column].is_current(stage):
+                columns.append(column)
+
+        if self.processes == 1 or len(columns) <= 1:
+            for column in columns:
+                getattr(spikes[column], stage)()
+            return
+
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                min(self.processes, len(spikes)),
+                mp_context=get_context('spawn'))
+
+        shape = (len(columns), len(data))
+        dtype = np.dtype(np.float32)
+        memory = SharedMemory(create=True,
+                              size=max(shape[0] * shape[1] * dtype.itemsize,
+                                       1))
+        try:
+            readings = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+            for row, column in enumerate(columns):
+                readings[row] = spikes[column].data.to_numpy()
+            layout = (memory.name, shape, dtype.str)
+            futures = [self.executor.submit(_run_pipeline, spikes[column],
+                                            layout, row, stage)
+                       for row, column in enumerate(columns)]
+            for column, future in zip(columns, futures):
+                spike = future.result()
+                spike.data = spikes[column].data
+                spike.buffer = spikes[column].buffer
+                spike.interpolate_thresholds()
+                spikes[column] = spike
+        finally:
+            memory.close()
+            memory.unlink()
@@ -0,0 +1,112 @@
+from typing import List, Optional
+
+import numpy as np
+from scipy.signal import butter, iirnotch, sosfilt, sosfilt_zi, tf2sos
+
+from src.frequency import Frequency
+from src.frequency_filter import FilterFactory
+
+ORDER = 4
+NOTCH_QUALITY = 30
+SAMPLING_RATE = 256  # MuseS EEG
+
+
+class StreamFilter:
+    """
+    Band-pass IIR filter applied chunk by chunk to many channels.
+
+    Filter is built from second-order sections of Butterworth band-pass for
+    band definition from FilterFactory, with notch at mains current when it
+    falls inside band. State of every channel is carried between chunks, so
+    each chunk costs O(chunk) and result is the same as of filtering whole
+    signal at once.
+    """
+
+    def __init__(self, frequency: Frequency, channels: int,
+                 sampling_rate: float = SAMPLING_RATE, current: int = 50,
+                 order: int = ORDER):
+        self.frequency = frequency
+        self.channels = channels
+        band = FilterFactory(frequency).get_filter(current)
+        sos = butter(order, [band.low, band.high], btype='bandpass',
+                     fs=sampling_rate, output='sos')
+        if band.low < current < band.high:
+            sos = np.vstack([sos, tf2sos(*iirnotch(current, NOTCH_QUALITY,
+                                                   fs=sampling_rate))])
+        self.sos: np.array = sos
+        self.zi: Optional[np.array] = None
+
+    def reset(self) -> None:
+        """
+        Forget state, next chunk starts new signal.
+
+        Returns
+        -------
+        None
+        """
+        self.zi = None
+
+    def process(self, chunk: np.array) -> np.array:
+        """
+        Filter next chunk of signal.
+
+        State of the first chunk is set to steady state for its first
+        sample, which avoids transient caused by electrode offset.
+
+        Parameters
+        ----------
+        chunk: numpy.array
+            Readings, channels x samples.
+
+        Returns
+        -------
+        numpy.array
+            Filtered readings, channels x samples.
+        """
+        if self.zi is None:
+            self.zi = (sosfilt_zi(self.sos)[:, np.newaxis, :]
+                       * chunk[np.newaxis, :, :1])
+        filtered, self.zi = sosfilt(self.sos, chunk, axis=-1, zi=self.zi)
+        return filtered
+
+
+class StreamFilterBank:
+    """
+    Set of streaming band filters sharing the same channels.
+    """
+
+    def __init__(self, frequencies: List[Frequency], channels: int,
+                 sampling_rate: float = SAMPLING_RATE, current: int = 50,
+                 order: int = ORDER):
+        self.filters = [StreamFilter(frequency, channels, sampling_rate,
+                                     current, order)
+                        for frequency in frequencies]
+
+    def reset(self) -> None:
+        """
+        Forget state of all filters.
+
+        Returns
+        -------
+        None
+        """
+        for band_filter in self.filters:
+            band_filter.reset()
+
+    def process(self, chunk: np.array) -> np.array:
+        """
+        Filter next chunk of signal into all bands.
+
+        Parameters
+        ----------
+        chunk: numpy.array
+            Readings, channels x samples.
+
+        Returns
+        -------
+        numpy.array
+            Filtered readings, channels x bands x samples.
+        """
+        chunk = np.atleast_2d(chunk)
+        return np.stack([band_filter.process(chunk)
+                         for band_filter in self.filters], axis=1)
@@ -0,0 +1,426 @@
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+QUEUE_SIZE = 1024  # chunks, ~15s of all Muse streams
+FSYNC_INTERVAL = 5  # seconds
+RECORD_HEADER = struct.Struct('<cBI')  # kind, stream id, payload bytes
+STREAM_RECORD = b'S'
+CHUNK_RECORD = b'C'
+TIMESTAMP_DTYPE = np.dtype('<f8')
+SAMPLE_DTYPE = np.dtype('<f4')
+EXPORT_SAMPLES = 65536  # samples written to csv at once
+PENDING_SUFFIX = '.pending'  # marks recording waiting for csv export
+
+
+class RecordedStream(NamedTuple):
+    """
+    Stream read from recording.
+
+    name: str
+    labels: List[str]
+        Label of every channel.
+    sampling_rate: float
+    timestamps: numpy.array
+    data: numpy.array
+        Samples x channels.
+    chunk_sizes: numpy.array
+        Samples in every recorded chunk.
+    """
+    name: str
+    labels: List[str]
+    sampling_rate: float
+    timestamps: np.array
+    data: np.array
+    chunk_sizes: np.array
+
+
+class StreamRecorder:
+    """
+    Recorder of live streams writing on dedicated thread.
+
+    Chunks from stream callbacks are put into bounded queue without waiting,
+    so recording never blocks the caller; when the queue is full or
+    recording is stopping, chunk is dropped and counted. Writer thread
+    appends records to binary file and flushes it to disk every
+    FSYNC_INTERVAL. Stopping is signalled by event, writer drains the queue
+    before closing the file, so no queued chunk is lost. Writer is not a
+    daemon thread, interpreter waits for it to finish drain and export on
+    exit.
+
+    File is a sequence of records, each with header of kind, stream id and
+    payload size. Stream record holds json with name, labels and sampling
+    rate of stream, chunk record holds samples count, float64 timestamps and
+    float32 samples x channels. Records are only appended, so readable part
+    of interrupted recording is kept.
+    """
+
+    def __init__(self, path: str, streams: Dict[str, tuple],
+                 queue_size: int = QUEUE_SIZE,
+                 fsync_interval: float = FSYNC_INTERVAL):
+        """
+        Parameters
+        ----------
+        path: str
+            Path to recording file.
+        streams: Dict[str, tuple]
+            Labels of channels and sampling rate of every stream.
+        queue_size: int
+            Chunks waiting for writer.
+        fsync_interval: float
+            Seconds between flushes to disk.
+        """
+        self.path = path
+        self.streams = {name: index for index, name in enumerate(streams)}
+        self.descriptions = streams
+        self.fsync_interval = fsync_interval
+        self.queue: queue.Queue = queue.Queue(queue_size)
+        self.dropped = 0
+        self.written = 0
+        self.exported: List[str] = []
+        self.on_finished: Optional[Callable[['StreamRecorder'], None]] = None
+        self._export = False
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """
+        Open recording file and start writer thread.
+
+        Returns
+        -------
+        None
+        """
+        file = open(self.path, 'ab')
+        for name, index in self.streams.items():
+            labels, sampling_rate = self.descriptions[name]
+            payload = json.dumps({'name': name, 'labels': list(labels),
+                                  'sampling_rate': sampling_rate}).encode()
+            file.write(RECORD_HEADER.pack(STREAM_RECORD, index, len(payload)))
+            file.write(payload)
+        self._thread = threading.Thread(target=self._write, args=(file,),
+                                        name='StreamRecorder')
+        self._thread.start()
+
+    def push(self, name: str, data: np.array, timestamps: np.array) -> bool:
+        """
+        Queue chunk for writing without waiting.
+
+        Parameters
+        ----------
+        name: str
+            Name of stream.
+        data: numpy.array
+            Readings from Muse callback, channels x samples.
+        timestamps: numpy.array
+            Timestamp of every sample.
+
+        Returns
+        -------
+        bool
+            False when queue is full or recording is stopping and chunk was
+            dropped.
+        """
+        samples = np.ascontiguousarray(np.transpose(data), dtype=SAMPLE_DTYPE)
+        timestamps = np.ascontiguousarray(timestamps, dtype=TIMESTAMP_DTYPE)
+        # lock orders pushes with stop, so writer sees every queued chunk
+        with self._lock:
+            if self._stopping.is_set():
+                self.dropped += 1
+                return False
+            try:
+                self.queue.put_nowait(
+                    (self.streams[name], timestamps, samples))
+            except queue.Full:
+                self.dropped += 1
+                return False
+        return True
+
+    def stop(self, export: bool = False, wait: bool = True) -> None:
+        """
+        Write queued chunks and close recording.
+
+        Never blocks on full queue, chunks pushed afterwards are dropped.
+
+        Parameters
+        ----------
+        export: bool
+            Export streams to csv files after closing recording.
+        wait: bool
+            Wait for writer thread to finish.
+
+        Returns
+        -------
+        None
+        """
+        if self._thread is None:
+            return
+        self._export = export
+        with self._lock:
+            self._stopping.set()
+            try:
+                # wakes writer waiting for chunks, full queue is being drained
+                self.queue.put_nowait(None)
+            except queue.Full:
+                pass
+        if wait:
+            self._thread.join()
+
+    def _write(self, file) -> None:
+        """
+        Append queued chunks to recording file.
+
+        Parameters
+        ----------
+        file
+            Recording file opened for appending.
+
+        Returns
+        -------
+        None
+        """
+        synced = time.monotonic()
+        try:
+            while True:
+                try:
+                    if self._stopping.is_set():
+                        item = self.queue.get_nowait()
+                    else:
+                        item = self.queue.get(timeout=self.fsync_interval)
+                except queue.Empty:
+                    if self._stopping.is_set():
+                        break
+                    item = None
+                if item is not None:
+                    index, timestamps, samples = item
+                    file.write(RECORD_HEADER.pack(
+                        CHUNK_RECORD, index,
+                        4 + timestamps.nbytes + samples.nbytes))
+                    file.write(struct.pack('<I', timestamps.size))
+                    file.write(timestamps.tobytes())
+                    file.write(samples.tobytes())
+                    self.written += 1
+                if time.monotonic() - synced >= self.fsync_interval:
+                    file.flush()
+                    os.fsync(file.fileno())
+                    synced = time.monotonic()
+        finally:
+            file.flush()
+            os.fsync(file.fileno())
+            file.close()
+
+        if self._export:
+            try:
+                self.exported = export_csv(self.path)
+            except (OSError, ValueError) as error:
+                logging.warning(f"Recording not exported: {error}")
+        if self.on_finished is not None:
+            self.on_finished(self)
+
+
+def _records(path: str) -> Iterator[Tuple[bytes, int, memoryview]]:
+    """
+    Iterate over records of recording file.
+
+    File is memory-mapped, so payloads are read from disk only when used.
+    Incomplete record at the end of file, e.g. after power loss, is ignored.
+
+    Parameters
+    ----------
+    path: str
+
+    Returns
+    -------
+    Iterator[Tuple[bytes, int, memoryview]]
+        Kind, stream id and payload of every record.
+    """
+    if not os.path.getsize(path):
+        return
+    content = memoryview(np.memmap(path, dtype=np.uint8, mode='r'))
+    offset = 0
+    while offset + RECORD_HEADER.size <= len(content):
+        kind, index, size = RECORD_HEADER.unpack_from(content, offset)
+        offset += RECORD_HEADER.size
+        if offset + size > len(content):
+            break
+        yield kind, index, content[offset:offset + size]
+        offset += size
+
+
+def _chunk(payload: memoryview, channels: int) -> Tuple[np.array, np.array]:
+    """
+    Return timestamps and samples of chunk record without copying.
+
+    Parameters
+    ----------
+    payload: memoryview
+    channels: int
+
+    Returns
+    -------
+    Tuple[numpy.array, numpy.array]
+        Timestamps and samples x channels.
+    """
+    samples = struct.unpack_from('<I', payload)[0]
+    timestamps = np.frombuffer(payload, TIMESTAMP_DTYPE, samples, 4)
+    data = np.frombuffer(payload, SAMPLE_DTYPE, offset=4 + timestamps.nbytes)
+    return timestamps, data.reshape(samples, channels)
+
+
+def read_recording(path: str) -> Dict[str, RecordedStream]:
+    """
+    Read all streams from recording file.
+
+    Incomplete record at the end of file, e.g. after power loss, is ignored.
+
+    Parameters
+    ----------
+    path: str
+
+    Returns
+    -------
+    Dict[str, RecordedStream]
+    """
+    descriptions: Dict[int, dict] = {}
+    chunks: Dict[int, list] = {}
+    for kind, index, payload in _records(path):
+        if kind == STREAM_RECORD:
+            descriptions[index] = json.loads(bytes(payload))
+            chunks.setdefault(index, [])
+        elif kind == CHUNK_RECORD:
+            chunks[index].append(
+                _chunk(payload, len(descriptions[index]['labels'])))
+        else:
+            raise ValueError(f"Unknown record {kind!r} in {path}.")
+
+    streams = {}
+    for index, description in descriptions.items():
+        labels = description['labels']
+        timestamps = [chunk[0] for chunk in chunks[index]]
+        data = [chunk[1] for chunk in chunks[index]]
+        streams[description['name']] = RecordedStream(
+            description['name'], labels, description['sampling_rate'],
+            np.concatenate(timestamps) if timestamps else np.array([]),
+            np.concatenate(data) if data else np.empty((0, len(labels)),
+                                                       dtype=SAMPLE_DTYPE),
+            np.array([t.size for t in timestamps], dtype=int))
+    return streams
+
+
+def export_csv(path: str) -> List[str]:
+    """
+    Export streams of recording to csv files.
+
+    Files are written next to recording in format of Muse csv files, named
+    like '<stream>_recording_<date>.csv', where date is taken from name of
+    recording 'recording_<date>.<extension>'. Chunks are appended to files
+    in batches of EXPORT_SAMPLES, so memory does not grow with length of
+    recording.
+
+    Parameters
+    ----------
+    path: str
+        Path to recording file.
+
+    Returns
+    -------
+    List[str]
+        Paths to exported files.
+    """
+    directory, name = os.path.split(path)
+    name = os.path.splitext(name)[0]
+    descriptions: Dict[int, dict] = {}
+    pending: Dict[int, list] = {}
+    sizes: Dict[int, int] = {}
+    files: Dict[int, str] = {}
+
+    def _flush(index: int) -> None:
+        labels = descriptions[index]['labels']
+        frame = pd.DataFrame(np.concatenate([c[1] for c in pending[index]]),
+                             columns=labels)
+        frame.insert(0, 'timestamps',
+                     np.concatenate([c[0] for c in pending[index]]))
+        header = index not in files
+        if header:
+            files[index] = os.path.join(
+                directory, f"{descriptions[index]['name']}_{name}.csv")
+        frame.to_csv(files[index], mode='w' if header else 'a', index=False,
+                     header=header, float_format='%.3f')
+        pending[index] = []
+        sizes[index] = 0
+
+    for kind, index, payload in _records(path):
+        if kind == STREAM_RECORD:
+            descriptions[index] = json.loads(bytes(payload))
+            pending.setdefault(index, [])
+            sizes.setdefault(index, 0)
+        elif kind == CHUNK_RECORD:
+            timestamps, data = _chunk(payload,
+                                      len(descriptions[index]['labels']))
+            if not timestamps.size:
+                continue
+            pending[index].append((timestamps, data))
+            sizes[index] += timestamps.size
+            if sizes[index] >= EXPORT_SAMPLES:
+                _flush(index)
+        else:
+            raise ValueError(f"Unknown record {kind!r} in {path}.")
+    for index in descriptions:
+        if pending[index]:
+            _flush(index)
+    return [files[index] for index in descriptions if index in files]
+
+
+def defer_export(path: str) -> None:
+    """
+    Mark recording for csv export by export_pending.
+
+    Parameters
+    ----------
+    path: str
+        Path to recording file.
+
+    Returns
+    -------
+    None
+    """
+    open(path + PENDING_SUFFIX, 'w').close()
+
+
+def export_pending(directory: str) -> List[str]:
+    """
+    Export recordings in directory marked by defer_export.
+
+    Mark is removed only after export succeeds, so interrupted export is
+    repeated next time.
+
+    Parameters
+    ----------
+    directory: str
+
+    Returns
+    -------
+    List[str]
+        Paths to exported files.
+    """
+    exported = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(PENDING_SUFFIX):
+            continue
+        path = os.path.join(directory, name[:-len(PENDING_SUFFIX)])
+        try:
+            exported += export_csv(path)
+        except (OSError, ValueError) as error:
+            logging.warning(f"Recording not exported: {error}")
+            continue
+        os.remove(path + PENDING_SUFFIX)
+    return exported
@@ -1,28 +1,250 @@
+import os
 from functools import partial
-from time import time, sleep
+from threading import Event
+from time import time
+from typing import Callable, Dict, Optional
+import numpy as np
+import pandas as pd
 from PyQt5.QtCore import QObject, pyqtSignal
 import pygatt
-from muselsl.constants import (AUTO_DISCONNECT_DELAY, MUSE_NB_EEG_CHANNELS,
+from muselsl.constants import (AUTO_DISCONNECT_DELAY,
                                MUSE_SAMPLING_EEG_RATE, LSL_EEG_CHUNK,
-                               MUSE_NB_PPG_CHANNELS, MUSE_SAMPLING_PPG_RATE,
-                               LSL_PPG_CHUNK, MUSE_NB_ACC_CHANNELS,
+                               MUSE_SAMPLING_PPG_RATE, LSL_PPG_CHUNK,
                                MUSE_SAMPLING_ACC_RATE, LSL_ACC_CHUNK,
-                               MUSE_NB_GYRO_CHANNELS, MUSE_SAMPLING_GYRO_RATE,
-                               LSL_GYRO_CHUNK)
+                               MUSE_SAMPLING_GYRO_RATE, LSL_GYRO_CHUNK)
 from muselsl.muse import Muse
 from muselsl.stream import find_muse
 from pylsl import StreamInfo, StreamOutlet
 
+from src.stream_recorder import (RecordedStream, StreamRecorder,
+                                 defer_export, read_recording)
+
+STREAMS = {'EEG': (['TP9', 'AF7', 'AF8', 'TP10', 'Right AUX'],
+                   MUSE_SAMPLING_EEG_RATE),
+           'PPG': (['PPG1', 'PPG2', 'PPG3'], MUSE_SAMPLING_PPG_RATE),
+           'ACC': (['X', 'Y', 'Z'], MUSE_SAMPLING_ACC_RATE),
+           'GYRO': (['X', 'Y', 'Z'], MUSE_SAMPLING_GYRO_RATE)}
+# unit, type of channels and chunk size of LSL outlet
+OUTLETS = {'EEG': ('microvolts', 'EEG', LSL_EEG_CHUNK),
+           'PPG': ('mmHg', 'PPG', LSL_PPG_CHUNK),
+           'ACC': ('g', 'accelerometer', LSL_ACC_CHUNK),
+           'GYRO': ('dps', 'gyroscope', LSL_GYRO_CHUNK)}
+# samples passed to callback of Muse at once
+MUSE_CHUNKS = {'EEG': 12, 'PPG': 6, 'ACC': 3, 'GYRO': 3}
+MAX_REPLAY_SPEED = 100
+
+
+def create_outlet(stream: str, source_id: str) -> StreamOutlet:
+    """
+    Create LSL outlet of Muse stream.
+
+    Parameters
+    ----------
+    stream: str
+        One of 'EEG', 'PPG', 'ACC' or 'GYRO'.
+    source_id: str
+        Unique identifier of source, e.g. address of device.
+
+    Returns
+    -------
+    StreamOutlet
+    """
+    labels, sampling_rate = STREAMS[stream]
+    unit, channel_type, chunk_size = OUTLETS[stream]
+    info = StreamInfo('Muse', stream, len(labels), sampling_rate, 'float32',
+                      source_id)
+    info.desc().append_child_value("manufacturer", "Muse")
+    channels = info.desc().append_child("channels")
+    for label in labels:
+        channels.append_child("channel") \
+            .append_child_value("label", label) \
+            .append_child_value("unit", unit) \
+            .append_child_value("type", channel_type)
+    return StreamOutlet(info, chunk_size)
+
+
+def read_replay(path: str) -> Dict[str, RecordedStream]:
+    """
+    Read streams to replay from recording or Muse csv file.
+
+    Csv file holds one stream, which is recognised by prefix of file name,
+    e.g. 'EEG_recording_<date>.csv', or by its columns. Streams of csv file
+    are replayed in chunks of Muse callbacks, streams of recording in chunks
+    they were recorded in.
+
+    Parameters
+    ----------
+    path: str
+
+    Returns
+    -------
+    Dict[str, RecordedStream]
+    """
+    if os.path.splitext(path)[1].lower() != '.csv':
+        return read_recording(path)
+
+    frame = pd.read_csv(path)
+    prefix = os.path.basename(path).split('_')[0].upper()
+    if prefix not in STREAMS:
+        prefix = next((stream for stream, (labels, _) in STREAMS.items()
+                       if set(labels) <= set(frame.columns)), None)
+    if prefix is None or 'timestamps' not in frame.columns:
+        raise ValueError(f"{path} is not a csv file of Muse stream.")
+
+    labels, sampling_rate = STREAMS[prefix]
+    samples = len(frame)
+    chunk = MUSE_CHUNKS[prefix]
+    chunk_sizes = np.full(samples // chunk, chunk)
+    if samples % chunk:
+        chunk_sizes = np.append(chunk_sizes, samples % chunk)
+    return {prefix: RecordedStream(
+        prefix, labels, sampling_rate,
+        frame['timestamps'].to_numpy(dtype=np.float64),
+        frame[labels].to_numpy(dtype=np.float32), chunk_sizes)}
+
+
+def push_chunk(data: np.array, timestamps: np.array,
+               outlet: StreamOutlet) -> None:
+    """
+    Push chunk of samples to outlet in one call.
+
+    Pylsl with per-sample timestamps (1.14+) gets timestamp of every sample,
+    older versions get timestamp of the last sample and liblsl derives the
+    others from nominal sampling rate.
+
+    Parameters
+    ----------
+    data: numpy.array
+        Readings from Muse callback, channels x samples.
+    timestamps: numpy.array
+        Timestamp of every sample.
+    outlet: StreamOutlet
+
+    Returns
+    -------
+    None
+    """
+    samples = np.ascontiguousarray(np.transpose(data), dtype=np.float32)
+    if hasattr(outlet, 'do_push_chunk_n'):
+        outlet.push_chunk(samples, timestamps)
+    else:
+        outlet.push_chunk(samples, float(timestamps[-1]))
+
 
 class StreamWorker(QObject):
     finished = pyqtSignal()
     progress = pyqtSignal(str)
 
-    def __init__(self):
+    def __init__(self, replay: Optional[str] = None, speed: float = 1.0):
+        """
+        Parameters
+        ----------
+        replay: str, optional
+            Recording or csv file to replay instead of streaming from device.
+        speed: float
+            Speed of replay relative to real time, 1 to MAX_REPLAY_SPEED.
+        """
         super().__init__()
-        self.running = True
+        self.replay_path = replay
+        self.speed = speed
+        self.stopped = Event()
+        self.recorder: Optional[StreamRecorder] = None
+
+    def start_recording(self, path: str) -> None:
+        """
+        Start recording all streams to file.
+
+        Parameters
+        ----------
+        path: str
+            Path to recording file.
+
+        Returns
+        -------
+        None
+        """
+        self.stop_recording()
+        recorder = StreamRecorder(path, STREAMS)
+        recorder.on_finished = self._recording_finished
+        recorder.start()
+        self.recorder = recorder
+        self.progress.emit(f"Recording to {path}")
+
+    def stop_recording(self, wait: bool = False, export: bool = True) -> None:
+        """
+        Stop recording and export it to csv files on writer thread.
+
+        Parameters
+        ----------
+        wait: bool
+            Wait until queued chunks are written and recording is exported.
+        export: bool
+            Export on writer thread, otherwise recording is marked for
+            export_pending.
+
+        Returns
+        -------
+        None
+        """
+        recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            if not export:
+                defer_export(recorder.path)
+            recorder.stop(export=export, wait=wait)
+
+    def _recording_finished(self, recorder: StreamRecorder) -> None:
+        """
+        Report saved recording, called from writer thread.
+
+        Parameters
+        ----------
+        recorder: StreamRecorder
+
+        Returns
+        -------
+        None
+        """
+        dropped = f", {recorder.dropped} chunks dropped" \
+            if recorder.dropped else ""
+        try:
+            self.progress.emit(f"Recording saved to {recorder.path}{dropped}")
+        except RuntimeError:
+            # worker was deleted after stream closed
+            pass
+
+    def _push(self, data: np.array, timestamps: np.array,
+              outlet: StreamOutlet, stream: str) -> None:
+        """
+        Push chunk to outlet and queue it for recording.
+
+        Parameters
+        ----------
+        data: numpy.array
+            Readings from Muse callback, channels x samples.
+        timestamps: numpy.array
+            Timestamp of every sample.
+        outlet: StreamOutlet
+        stream: str
+            Name of stream in recording.
+
+        Returns
+        -------
+        None
+        """
+        push_chunk(data, timestamps, outlet)
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.push(stream, data, timestamps)
 
     def run(self):
+        if self.replay_path is not None:
+            try:
+                self.replay(self.replay_path, self.speed)
+            except (OSError, ValueError, KeyError) as error:
+                self.progress.emit(f"Replay failed: {error}")
+            self.finished.emit()
+            return
+
         self.progress.emit("Connecting...")
         adapter = pygatt.GATTToolBackend()
         adapter.reset()
@@ -33,7 +255,9 @@ class StreamWorker(QObject):
             self.finished.emit()
         else:
             self.progress.emit(f"Device {devices[0]['name']} found")
-            sleep(1)
+            if self.stopped.wait(1):
+                self.finished.emit()
+                return
             self.stream(address=devices[0]['address'],
                         ppg_enabled=True,
                         acc_enabled=True,
@@ -41,8 +265,105 @@ class StreamWorker(QObject):
                         backend='gatt')
         self.finished.emit()
 
-    def finish(self):
-        self.running = False
+    def finish(self) -> None:
+        """
+        Stop streaming, safe to call from any thread.
+
+        Stream loop wakes up immediately, disconnects device and emits
+        finished, so caller does not need to wait for it.
+
+        Returns
+        -------
+        None
+        """
+        self.stopped.set()
+
+    def wait_for_stop(self, last_timestamp: Callable[[], float],
+                      timeout: float) -> bool:
+        """
+        Wait until stream is stopped or no data came for timeout.
+
+        Parameters
+        ----------
+        last_timestamp: Callable[[], float]
+            Returns time of the last data from device.
+        timeout: float
+            Seconds without data after which stream is considered lost.
+
+        Returns
+        -------
+        bool
+            True when stopped by finish, False on timeout.
+        """
+        while True:
+            remaining = timeout - (time() - last_timestamp())
+            if remaining <= 0:
+                return self.stopped.is_set()
+            if self.stopped.wait(remaining):
+                return True
+
+    def replay(self, path: str, speed: float = 1.0) -> None:
+        """
+        Publish recorded streams on LSL outlets like Muse device.
+
+        Chunks of all streams are pushed in order of their last timestamp at
+        time they were recorded, divided by speed. Timestamps are shifted to
+        current time and scaled by speed as well, so they match the time of
+        push. Chunks are recorded if recording is started.
+
+        Parameters
+        ----------
+        path: str
+            Recording or Muse csv file.
+        speed: float
+            Speed relative to real time, 1 to MAX_REPLAY_SPEED.
+
+        Returns
+        -------
+        None
+        """
+        if not 1 <= speed <= MAX_REPLAY_SPEED:
+            raise ValueError(f"Replay speed must be between 1 and "
+                             f"{MAX_REPLAY_SPEED}.")
+        streams = {name: stream for name, stream in read_replay(path).items()
+                   if len(stream.timestamps)}
+        if not streams:
+            raise ValueError(f"{path} holds no readings.")
+
+        names, firsts, lasts, dues = [], [], [], []
+        for index, stream in enumerate(streams.values()):
+            ends = np.cumsum(stream.chunk_sizes)
+            names.append(np.full(ends.size, index))
+            firsts.append(ends - stream.chunk_sizes)
+            lasts.append(ends)
+            dues.append(stream.timestamps[ends - 1])
+        dues = np.concatenate(dues)
+        order = np.argsort(dues, kind='stable')
+        names = np.concatenate(names)[order]
+        firsts = np.concatenate(firsts)[order]
+        lasts = np.concatenate(lasts)[order]
+        origin = min(stream.timestamps[0] for stream in streams.values())
+        dues = (dues[order] - origin) / speed
+
+        outlets = [create_outlet(name, 'MuseReplay') for name in streams]
+        recorded = list(streams.values())
+        self.progress.emit(f"Replaying {', '.join(streams)} at {speed:g}x")
+
+        start = time()
+        for index, first, last, due in zip(names, firsts, lasts, dues):
+            delay = start + due - time()
+            stopped = self.stopped.wait(delay) if delay > 0 \
+                else self.stopped.is_set()
+            if stopped:
+                break
+            stream = recorded[index]
+            timestamps = start + (stream.timestamps[first:last] - origin) \
+                / speed
+            self._push(stream.data[first:last].T, timestamps,
+                       outlets[index], stream.name)
+
+        self.stop_recording()
+        self.progress.emit("Replay finished")
 
     def stream(
             self,
@@ -98,90 +419,24 @@ class StreamWorker(QObject):
                     address = found_muse['address']
                     name = found_muse['name']
 
+            source_id = 'Muse%s' % address
             if not eeg_disabled:
-                eeg_info = StreamInfo('Muse',
-                                      'EEG',
-                                      MUSE_NB_EEG_CHANNELS,
-                                      MUSE_SAMPLING_EEG_RATE,
-                                      'float32',
-                                      'Muse%s' % address)
-                eeg_info.desc().append_child_value("manufacturer", "Muse")
-                eeg_channels = eeg_info.desc().append_child("channels")
-
-                for c in ['TP9', 'AF7', 'AF8', 'TP10', 'Right AUX']:
-                    eeg_channels.append_child("channel") \
-                        .append_child_value("label", c) \
-                        .append_child_value("unit", "microvolts") \
-                        .append_child_value("type", "EEG")
-
-                eeg_outlet = StreamOutlet(eeg_info, LSL_EEG_CHUNK)
-
+                eeg_outlet = create_outlet('EEG', source_id)
             if ppg_enabled:
-                ppg_info = StreamInfo('Muse',
-                                      'PPG',
-                                      MUSE_NB_PPG_CHANNELS,
-                                      MUSE_SAMPLING_PPG_RATE,
-                                      'float32',
-                                      'Muse%s' % address)
-                ppg_info.desc().append_child_value("manufacturer", "Muse")
-                ppg_channels = ppg_info.desc().append_child("channels")
-
-                for c in ['PPG1', 'PPG2', 'PPG3']:
-                    ppg_channels.append_child("channel") \
-                        .append_child_value("label", c) \
-                        .append_child_value("unit", "mmHg") \
-                        .append_child_value("type", "PPG")
-
-                ppg_outlet = StreamOutlet(ppg_info, LSL_PPG_CHUNK)
-
+                ppg_outlet = create_outlet('PPG', source_id)
             if acc_enabled:
-                acc_info = StreamInfo('Muse',
-                                      'ACC',
-                                      MUSE_NB_ACC_CHANNELS,
-                                      MUSE_SAMPLING_ACC_RATE,
-                                      'float32',
-                                      'Muse%s' % address)
-                acc_info.desc().append_child_value("manufacturer", "Muse")
-                acc_channels = acc_info.desc().append_child("channels")
-
-                for c in ['X', 'Y', 'Z']:
-                    acc_channels.append_child("channel") \
-                        .append_child_value("label", c) \
-                        .append_child_value("unit", "g") \
-                        .append_child_value("type", "accelerometer")
-
-                acc_outlet = StreamOutlet(acc_info, LSL_ACC_CHUNK)
-
+                acc_outlet = create_outlet('ACC', source_id)
             if gyro_enabled:
-                gyro_info = StreamInfo('Muse',
-                                       'GYRO',
-                                       MUSE_NB_GYRO_CHANNELS,
-                                       MUSE_SAMPLING_GYRO_RATE,
-                                       'float32',
-                                       'Muse%s' % address)
-                gyro_info.desc().append_child_value("manufacturer", "Muse")
-                gyro_channels = gyro_info.desc().append_child("channels")
-
-                for c in ['X', 'Y', 'Z']:
-                    gyro_channels.append_child("channel") \
-                        .append_child_value("label", c) \
-                        .append_child_value("unit", "dps") \
-                        .append_child_value("type", "gyroscope")
-
-                gyro_outlet = StreamOutlet(gyro_info, LSL_GYRO_CHUNK)
-
-            def push(data, timestamps, outlet):
-                for ii in range(data.shape[1]):
-                    outlet.push_sample(data[:, ii], timestamps[ii])
-
-            push_eeg = partial(push,
-                               outlet=eeg_outlet) if not eeg_disabled else None
-            push_ppg = partial(push,
-                               outlet=ppg_outlet) if ppg_enabled else None
-            push_acc = partial(push,
-                               outlet=acc_outlet) if acc_enabled else None
-            push_gyro = partial(push,
-                                outlet=gyro_outlet) if gyro_enabled else None
+                gyro_outlet = create_outlet('GYRO', source_id)
+
+            push_eeg = partial(self._push, outlet=eeg_outlet,
+                               stream='EEG') if not eeg_disabled else None
+            push_ppg = partial(self._push, outlet=ppg_outlet,
+                               stream='PPG') if ppg_enabled else None
+            push_acc = partial(self._push, outlet=acc_outlet,
+                               stream='ACC') if acc_enabled else None
+            push_gyro = partial(self._push, outlet=gyro_outlet,
+                                stream='GYRO') if gyro_enabled else None
 
             muse = Muse(address=address,
                         callback_eeg=push_eeg,
@@ -207,14 +462,9 @@ class StreamWorker(QObject):
                 self.progress.emit(f"Streaming {eeg_string}, {ppg_string}, "
                                    f"{acc_string}, {gyro_string}...")
 
-                while time() - muse.last_timestamp < timeout:
-                    try:
-                        sleep(1)
-                        if not self.running:
-                            raise KeyboardInterrupt
-                    except KeyboardInterrupt:
-                        muse.stop()
-                        muse.disconnect()
-                        break
+                if self.wait_for_stop(lambda: muse.last_timestamp, timeout):
+                    muse.stop()
+                    muse.disconnect()
 
+                self.stop_recording()
                 self.progress.emit("Disconnected")
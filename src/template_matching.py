@@ -0,0 +1,135 @@
+from typing import NamedTuple, Optional
+
+import numpy as np
+from scipy.fft import irfft, next_fast_len, rfft
+from scipy.signal import find_peaks
+
+BLOCK_SIZE = 1 << 16
+MATCH_THRESHOLD = 0.9
+
+
+class Matches(NamedTuple):
+    """
+    Positions where templates match readings.
+
+    channels: numpy.array
+        Channel of every match.
+    templates: numpy.array
+        Template of every match.
+    positions: numpy.array
+        Index of the first reading matched by template.
+    scores: numpy.array
+        Normalized cross-correlation of template and readings.
+    """
+    channels: np.array
+    templates: np.array
+    positions: np.array
+    scores: np.array
+
+
+class TemplateMatcher:
+    """
+    Normalized cross-correlation of spike templates with readings.
+
+    Templates, e.g. mean wave from Spike.sort, are correlated with readings
+    in blocks of fixed size with FFT, so memory used for spectra does not
+    depend on length of recording and cost grows linearly with it. Norm of
+    every window of readings is obtained from cumulative sums, score is
+    Pearson correlation of template and window, insensitive to offset and
+    amplitude of readings.
+    """
+
+    def __init__(self, templates: np.array, block_size: int = BLOCK_SIZE):
+        templates = np.atleast_2d(np.asarray(templates, dtype=np.float64))
+        centred = templates - templates.mean(axis=1, keepdims=True)
+        norms = np.linalg.norm(centred, axis=1, keepdims=True)
+        if templates.shape[1] < 2 or np.any(norms == 0):
+            raise ValueError("Templates must have at least two samples and "
+                             "must not be constant.")
+        self.templates = centred / norms
+        self.size = templates.shape[1]
+        self.block_size = block_size
+        self.fft_size = next_fast_len(block_size + self.size - 1, real=True)
+        # correlation is convolution with reversed template
+        self.spectra = rfft(self.templates[:, ::-1], self.fft_size, axis=-1)
+
+    def correlate(self, y: np.array) -> np.array:
+        """
+        Compute normalized cross-correlation for every position.
+
+        Parameters
+        ----------
+        y: numpy.array
+            Readings, channels x samples or single channel.
+
+        Returns
+        -------
+        numpy.array
+            Scores in range <-1, 1>, channels x templates x positions, where
+            position is index of the first reading of window. Windows of
+            constant readings score 0.
+        """
+        y = np.atleast_2d(y)
+        channels, samples = y.shape
+        positions = max(samples - self.size + 1, 0)
+        scores = np.zeros((channels, len(self.templates), positions),
+                          dtype=np.float32)
+
+        for start in range(0, positions, self.block_size):
+            stop = min(start + self.block_size, positions)
+            segment = y[:, start:stop + self.size - 1].astype(np.float64)
+            products = irfft(
+                rfft(segment, self.fft_size, axis=-1)[:, np.newaxis, :]
+                * self.spectra, self.fft_size, axis=-1)[
+                ..., self.size - 1:self.size - 1 + stop - start]
+
+            sums = np.cumsum(np.pad(segment, ((0, 0), (1, 0))), axis=-1)
+            squares = np.cumsum(np.pad(segment ** 2, ((0, 0), (1, 0))),
+                                axis=-1)
+            window_sums = sums[:, self.size:] - sums[:, :-self.size]
+            energy = squares[:, self.size:] - squares[:, :-self.size]
+            norms = np.sqrt(np.maximum(
+                energy - window_sums ** 2 / self.size, 0))
+            # rounding leaves tiny norm in windows of constant readings
+            valid = norms > np.sqrt(energy) * np.finfo(np.float32).eps
+            np.divide(products, norms[:, np.newaxis, :],
+                      out=products, where=valid[:, np.newaxis, :])
+            products[~np.broadcast_to(valid[:, np.newaxis, :],
+                                      products.shape)] = 0
+            scores[..., start:stop] = np.clip(products, -1, 1)
+        return scores
+
+    def match(self, y: np.array, threshold: float = MATCH_THRESHOLD,
+              distance: Optional[int] = None) -> Matches:
+        """
+        Find positions where templates match readings.
+
+        Match is local maximum of score above threshold, matches of the same
+        template in the same channel are at least distance apart.
+
+        Parameters
+        ----------
+        y: numpy.array
+            Readings, channels x samples or single channel.
+        threshold: float
+            Minimal score of match.
+        distance: int, optional
+            Minimal distance between matches, length of template by default.
+
+        Returns
+        -------
+        Matches
+        """
+        scores = self.correlate(y)
+        found = []
+        for channel, template in np.ndindex(scores.shape[:2]):
+            peaks, properties = find_peaks(scores[channel, template],
+                                           height=threshold,
+                                           distance=distance or self.size)
+            found.append((np.full(peaks.size, channel),
+                          np.full(peaks.size, template), peaks,
+                          properties['peak_heights']))
+        if not found:
+            return Matches(*(np.array([], dtype=dtype) for dtype in
+                             (int, int, int, np.float32)))
+        return Matches(*(np.concatenate(column) for column in zip(*found)))
@@ -1,4 +1,4 @@
-from typing import Tuple
+from typing import List, Optional, Tuple
 
 from scipy.fftpack import fft, rfft, irfft, fftfreq
 import numpy as np
@@ -11,20 +11,22 @@ class Transformer:
     def __init__(self,
                  x: np.array,
                  y: np.array,
-                 frequency: Frequency) -> None:
+                 frequency: Frequency,
+                 sampling: float = 0.004) -> None:
         self.x = x
         self.y = y
         self.freq = frequency
+        self.sampling = sampling
 
-    def get_fft_freq(self, sampling: int = 0.004) -> np.array:
+    def get_fft_freq(self, sampling: Optional[float] = None) -> np.array:
         """
         Get Discrete Fourier Transform sample frequencies.
 
-        MuseS sampling is 250Hz
+        Sampling period of recording is used unless other is given.
 
         Parameters
         ----------
-        sampling: int
+        sampling: float, optional
 
         Returns
         -------
@@ -32,7 +34,7 @@ class Transformer:
             frequencies spectrum
             # TODO: check if spectrum is the correct word
         """
-        return fftfreq(self.x.size, sampling)
+        return fftfreq(self.x.size, sampling or self.sampling)
 
     def get_fft(self) -> Tuple[np.array, np.array]:
         """
@@ -72,3 +74,53 @@ class Transformer:
         """
         freq_filter = FilterFactory(self.freq).get_filter(current)
         return irfft(freq_filter.band_pass(self.y, self.get_fft_freq()))
+
+    @staticmethod
+    def get_rfft_freq(size: int, sampling: float = 0.004) -> np.array:
+        """
+        Get sample frequencies of one-dimensional real Fourier Transform.
+
+        Real Fourier Transform packs real and imaginary parts of each
+        frequency next to each other, so every frequency but the first one
+        (and the last one for even size) occurs twice.
+
+        Parameters
+        ----------
+        size: int
+        sampling: float
+
+        Returns
+        -------
+        np.array
+        """
+        return (np.arange(size) + 1) // 2 / (size * sampling)
+
+    @staticmethod
+    def filter_bank(y: np.array, frequencies: List[Frequency],
+                    current: int = 50, sampling: float = 0.004) -> np.array:
+        """
+        Filter many channels into many frequency bands at once.
+
+        Spectrum of every channel is computed once and band masks of all
+        frequencies are applied to it in single broadcast operation.
+
+        Parameters
+        ----------
+        y: np.array
+            Readings, channels x samples or single channel.
+        frequencies: List[Frequency]
+        current: int
+        sampling: float
+
+        Returns
+        -------
+        np.array
+            Filtered readings, channels x bands x samples.
+        """
+        y = np.atleast_2d(y)
+        spectrum = rfft(y, axis=-1)
+        fft_freq = Transformer.get_rfft_freq(y.shape[-1], sampling)
+        masks = np.stack([
+            FilterFactory(frequency).get_filter(current).band_mask(fft_freq)
+            for frequency in frequencies]).astype(spectrum.dtype)
+        return irfft(spectrum[:, np.newaxis, :] * masks, axis=-1)
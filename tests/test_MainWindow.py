@@ -1,5 +1,19 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.frequency import Frequency
+from src.recording import Recording
+from src.series_cache import SeriesCache
+from src.transformer import Transformer
 from src.UIMainWindow import UIMainWindow
 
+try:
+    from src.MainWindow import MainWindow
+except ImportError as error:
+    pytest.skip(f"GUI stack is not available: {error}",
+                allow_module_level=True)
+
 
 class TestMainWindow:
 
@@ -15,3 +29,41 @@ class TestMainWindow:
         pass
 
 
+class TestBandCache:
+
+    @staticmethod
+    def _window(tmp_path):
+        path = str(tmp_path / 'recording.csv')
+        random = np.random.default_rng(0)
+        pd.DataFrame({
+            'timestamps': 1605290410.0 + np.arange(4096) / 256,
+            'TP9': random.normal(0, 30, 4096),
+        }).to_csv(path, index=False)
+        # only cache state is needed, widgets are not created
+        window = MainWindow.__new__(MainWindow)
+        window.data = Recording(path)
+        window.current = 50
+        window.series_cache = SeriesCache()
+        return window
+
+    def test_hit_does_not_filter_nor_build_pyramid(self, tmp_path,
+                                                   monkeypatch):
+        window = self._window(tmp_path)
+        calls = []
+        filter_bank = Transformer.filter_bank
+
+        def _filter_bank(*args, **kwargs):
+            calls.append(args)
+            return filter_bank(*args, **kwargs)
+
+        monkeypatch.setattr(Transformer, 'filter_bank', _filter_bank)
+        first = window._get_band_pyramid('TP9', Frequency.ALPHA)
+        second = window._get_band_pyramid('TP9', Frequency.ALPHA)
+        assert len(calls) == 1
+        assert second.storage is first.storage
+        assert np.shares_memory(second.y, first.y)
+
+        # levels count against memory limit of cache
+        series = window._get_band_series('TP9', Frequency.ALPHA)
+        assert window.series_cache.nbytes == (series.base.nbytes
+                                              + first.storage.nbytes)
@@ -0,0 +1,70 @@
+import numpy as np
+from scipy.fft import irfft, rfftfreq
+
+from src.block_filter import BlockFilter, band_kernel, band_kernel_size
+from src.frequency import Frequency
+from src.transformer import Transformer
+
+
+class TestBlockFilter:
+
+    @classmethod
+    def setup_class(cls):
+        t = np.arange(20000) * 0.004
+        cls.alpha = np.sin(2 * np.pi * 10 * t)
+        cls.beta = np.sin(2 * np.pi * 20 * t)
+        cls.signal = np.stack([cls.alpha + cls.beta, cls.alpha - cls.beta])
+
+    def setup_method(self):
+        self.block_filter = BlockFilter([Frequency.ALPHA, Frequency.BETA],
+                                        block_size=4096, kernel_size=1001)
+
+    def test_kernel_is_symmetric(self):
+        kernel = band_kernel(Frequency.BETA, 1001)
+        assert np.allclose(kernel, kernel[::-1])
+
+    def test_equals_direct_convolution(self):
+        result = self.block_filter.apply(self.signal)
+        assert result.shape == (2, 2, 20000)
+        for channel in range(2):
+            for band in range(2):
+                expected = np.convolve(self.signal[channel],
+                                       self.block_filter.kernels[band],
+                                       mode='same')
+                assert np.allclose(result[channel, band], expected)
+
+    def test_kernel_size_from_narrowest_band(self):
+        # 30 periods of 0.5Hz lower edge of delta
+        assert band_kernel_size(list(Frequency)) == 15001
+        # 30 periods of 4Hz width of alpha
+        assert band_kernel_size([Frequency.ALPHA, Frequency.BETA]) == 1875
+
+    def test_equals_whole_signal_filter_bank(self):
+        # pink noise, broadband with 1/f spectrum like EEG
+        rng = np.random.default_rng(0)
+        samples = 1 << 18
+        freq = rfftfreq(samples, 0.004)
+        freq[0] = freq[1]
+        spectrum = rng.standard_normal(freq.size) \
+            + 1j * rng.standard_normal(freq.size)
+        signal = irfft(spectrum / np.sqrt(freq), samples)
+        bands = list(Frequency)
+        block_filter = BlockFilter(bands, block_size=1 << 16)
+
+        result = block_filter.apply(signal)[0]
+        expected = Transformer.filter_bank(signal, bands)[0]
+        edge = block_filter.kernel_size
+        error = result[:, edge:-edge] - expected[:, edge:-edge]
+        relative = np.sqrt(np.mean(error ** 2, axis=-1)
+                           / np.mean(expected[:, edge:-edge] ** 2, axis=-1))
+        bounds = {Frequency.GAMMA: 0.02, Frequency.BETA: 0.02,
+                  Frequency.ALPHA: 0.05, Frequency.THETA: 0.05,
+                  Frequency.DELTA: 0.07}
+        for band, error in zip(bands, relative):
+            assert error < bounds[band], band
+
+    def test_out(self):
+        out = np.full((2, 2, 20000), np.nan, dtype=np.float32)
+        result = self.block_filter.apply(self.signal, out)
+        assert result is out
+        assert not np.isnan(out).any()
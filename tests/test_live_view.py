@@ -0,0 +1,117 @@
+import os
+import time
+
+import numpy as np
+import pyqtgraph as pg
+
+from src.frequency import Frequency
+from src.live_view import MAX_CHUNK, SPACING, LiveStream, LiveView
+from src.spike import Spike
+from src.stream_filter import StreamFilterBank
+from src.stream_worker import STREAMS, create_outlet
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+
+class FakeInlet:
+    """
+    Inlet of pylsl returning prepared samples in chunks.
+    """
+
+    def __init__(self, samples: np.array, rate: float = 256):
+        self.samples = samples
+        self.timestamps = np.arange(len(samples)) / rate
+        self.position = 0
+
+    def pull_chunk(self, timeout=0.0, max_samples=1024, dest_obj=None):
+        stop = min(self.position + max_samples, len(self.samples))
+        size = stop - self.position
+        dest_obj[:size] = self.samples[self.position:stop]
+        timestamps = self.timestamps[self.position:stop].tolist()
+        self.position = stop
+        return None, timestamps
+
+
+class TestLiveStream:
+    def setup_method(self):
+        random = np.random.default_rng(0)
+        self.samples = random.normal(0, 30, (3000, 5)).astype(np.float32)
+        self.bands = [Frequency.ALPHA, Frequency.BETA]
+
+    def test_pull_keeps_selected_channels(self):
+        stream = LiveStream(FakeInlet(self.samples), 5, [0, 1, 2, 3], 256,
+                            seconds=10)
+        assert stream.pull() == 3000
+        assert stream.pull() == 0
+        timestamps, readings = stream.readings.last(MAX_CHUNK + 10)
+        assert np.array_equal(readings, self.samples[-MAX_CHUNK - 10:, :4].T)
+        assert np.array_equal(timestamps, np.arange(1966, 3000) / 256)
+
+    def test_pull_filters_bands(self):
+        stream = LiveStream(FakeInlet(self.samples), 5, [1, 3], 256,
+                            self.bands, seconds=20)
+        stream.pull()
+        expected = StreamFilterBank(self.bands, 2, 256).process(
+            self.samples[:, [1, 3]].T)
+        _, bands = stream.band_readings.last(3000)
+        # rows are band after band
+        assert bands.shape == (4, 3000)
+        assert np.allclose(bands[1], expected[1, 0], atol=1e-3)
+        assert np.allclose(bands[2], expected[0, 1], atol=1e-3)
+
+
+def test_update_draws_readings_from_outlet():
+    app = pg.mkQApp()  # noqa: F841
+    electrodes = ['AF7', 'TP10']
+    colours = {'AF7': '#ff0000', 'TP10': '#0000ff'}
+    labels, sampling_rate = STREAMS['EEG']
+    outlet = create_outlet('EEG', 'test_live_view')
+    view = LiveView(pg.PlotItem(), electrodes, colours, seconds=1)
+    deadline = time.monotonic() + 10
+    while view.stream is None and time.monotonic() < deadline:
+        view.update()
+        time.sleep(0.05)
+    assert view.stream is not None
+    view.stream.inlet.open_stream(timeout=5)
+
+    size = int(sampling_rate)
+    random = np.random.default_rng(0)
+    samples = random.normal(0, 30, (size, len(labels))).astype(np.float32)
+    outlet.push_chunk(samples)
+    pulled = 0
+    while pulled < size and time.monotonic() < deadline:
+        view.update()
+        pulled = len(view.stream.readings)
+        time.sleep(0.05)
+
+    for index, (electrode, curve) in enumerate(zip(electrodes, view.curves)):
+        readings = samples[:, labels.index(electrode)]
+        expected = readings - readings.mean() - SPACING * index
+        x, y = curve.getData()
+        assert np.allclose(x, (np.arange(size) - size + 1) / sampling_rate)
+        assert np.allclose(y, expected, atol=1e-3)
+
+
+def test_spikes_are_marked_in_visible_window():
+    app = pg.mkQApp()  # noqa: F841
+    random = np.random.default_rng(1)
+    samples = random.normal(0, 5, (256 * 20, 5)).astype(np.float32)
+    peaks = np.arange(256 * 12, 256 * 20 - 64, 256)
+    # positive peak before each spike keeps threshold at 5 noise levels
+    samples[peaks - 1, 1] += 300
+    samples[peaks, 1] -= 300
+    spike = Spike('AF7')
+    view = LiveView(pg.PlotItem(), ['AF7'], {'AF7': '#ff0000'}, seconds=5,
+                    spikes={'AF7': spike})
+    view.stream = LiveStream(FakeInlet(samples), 5, [1], 256, seconds=60)
+    view._start_spikes(256)
+    view.stream.pull()
+    view._mark_spikes()
+
+    latest = (len(samples) - 1) / 256
+    visible = peaks[peaks / 256 > latest - 5]
+    assert np.allclose(view.spike_times, visible / 256)
+    assert np.array_equal(view.spike_rows, np.zeros(visible.size))
+    x, y = view.spike_markers.getData()
+    assert np.allclose(x, visible / 256 - latest)
+    assert np.allclose(y, -SPACING / 3)
@@ -0,0 +1,42 @@
+import numpy as np
+
+from src.min_max_pyramid import MinMaxPyramid
+
+
+class TestMinMaxPyramid:
+
+    @classmethod
+    def setup_class(cls):
+        cls.x = np.arange(10000, dtype=np.int64) * 4
+        cls.y = np.sin(np.arange(10000) / 50).astype(np.float32)
+        cls.y[7777] = 10.
+
+    def setup_method(self):
+        self.pyramid = MinMaxPyramid(self.x, self.y, factor=4, min_buckets=64)
+
+    def test_levels(self):
+        assert [level[0].size for level in self.pyramid.levels] == \
+               [2500, 625, 157, 40]
+        assert self.pyramid.levels[0][1][0] == self.y[:4].min()
+        assert self.pyramid.levels[0][2][0] == self.y[:4].max()
+
+    def test_peak_survives_all_levels(self):
+        for _, _, maxs in self.pyramid.levels:
+            assert maxs.max() == 10.
+
+    def test_locate_raw_when_zoomed_in(self):
+        level, start, stop = self.pyramid.locate(400, 800, 1000)
+        assert level == 0
+        assert (start, stop) == (99, 202)
+
+    def test_locate_coarse_when_zoomed_out(self):
+        level, start, stop = self.pyramid.locate(0, 40000, 100)
+        assert level == 3
+        assert (start, stop) == (0, 157)
+
+    def test_render_keeps_bounds(self):
+        x, y = self.pyramid.render(*self.pyramid.locate(0, 40000, 100))
+        assert x[0] == self.x[0]
+        assert x[-1] == self.x[-1]
+        assert y.max() == 10.
+        assert y.min() == self.y.min()
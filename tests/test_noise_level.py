@@ -0,0 +1,29 @@
+import numpy as np
+from scipy.stats import median_abs_deviation
+
+from src.noise_level import windowed_mad
+
+
+def test_windowed_mad_same_as_mad_of_windows():
+    values = np.random.default_rng(0).normal(0, 3, 10000)
+    centers, mad, peaks = windowed_mad(values, 1000, 500)
+    starts = np.arange(0, 9001, 500)
+    assert np.array_equal(centers, starts + 499.5)
+    for start, deviation, peak in zip(starts, mad, peaks):
+        window = values[start:start + 1000]
+        assert np.isclose(deviation, median_abs_deviation(window) * 1.4826)
+        assert peak == window.max()
+
+
+def test_windowed_mad_last_window_aligned_with_end():
+    centers, mad, _ = windowed_mad(np.arange(1050.), 1000, 500)
+    assert np.array_equal(centers, [499.5, 549.5])
+    assert mad.size == 2
+
+
+def test_windowed_mad_of_short_readings():
+    values = np.arange(10.)
+    centers, mad, peaks = windowed_mad(values, 1000, 500)
+    assert np.array_equal(centers, [4.5])
+    assert np.isclose(mad[0], median_abs_deviation(values) * 1.4826)
+    assert peaks[0] == 9
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+from src.recording import Recording
+
+
+class TestRecording:
+
+    @classmethod
+    def setup_class(cls):
+        cls.timestamps = 1605290410.0 + np.arange(1024) / 256
+
+    def _recording(self, tmp_path):
+        path = str(tmp_path / 'recording.csv')
+        pd.DataFrame({
+            'timestamps': self.timestamps,
+            'TP9': np.arange(1024, dtype=float),
+            'AF7': -np.arange(1024, dtype=float),
+        }).to_csv(path, index=False)
+        return Recording(path)
+
+    def test_columns(self, tmp_path):
+        recording = self._recording(tmp_path)
+        assert recording.columns == ['TP9', 'AF7']
+        assert len(recording) == 1024
+
+    def test_span_is_view_of_memory_map(self, tmp_path):
+        recording = self._recording(tmp_path)
+        recording = Recording(recording.path)
+        x, y = recording.span('TP9', recording.timestamps[10],
+                              recording.timestamps[19])
+        assert isinstance(y, np.memmap)
+        assert np.allclose(y, np.arange(10, 20), atol=1e-3)
+        assert np.array_equal(x, recording.timestamps[10:20])
+
+    def test_window(self, tmp_path):
+        recording = self._recording(tmp_path)
+        data = recording.window(recording.timestamps[100], columns=['AF7'])
+        assert list(data.columns) == ['AF7']
+        assert len(data) == 924
+        assert data.index[0] == recording.start + pd.Timedelta(
+            int(recording.timestamps[100] - recording.timestamps[0]))
+
+    def test_last(self, tmp_path):
+        recording = self._recording(tmp_path)
+        data = recording.last(1)
+        assert data.index[-1] == recording.end
+        assert len(data) == 257
+        assert len(recording.last()) == 1024
+
+    def test_blocks_split_at_dropout(self, tmp_path):
+        path = str(tmp_path / 'dropout.csv')
+        timestamps = self.timestamps.copy()
+        timestamps[600:] += 1
+        pd.DataFrame({'timestamps': timestamps,
+                      'TP9': np.zeros(1024)}).to_csv(path, index=False)
+        recording = Recording(path)
+        assert recording.sampling.gaps == 1
+        assert [(block.start, block.stop)
+                for block in recording.block_slices()] == [(0, 600),
+                                                           (600, 1024)]
+        assert recording.boundaries(slice(500, 1024)).tolist() == [100]
+        assert recording.boundaries(slice(0, 500)).tolist() == []
+
+    def test_single_reading(self, tmp_path):
+        path = str(tmp_path / 'single.csv')
+        pd.DataFrame({'timestamps': self.timestamps[:1],
+                      'TP9': [1.]}).to_csv(path, index=False)
+        recording = Recording(path)
+        assert len(recording) == 1
+        assert recording.sampling.rate == 256
+        assert np.allclose(recording['TP9'], [1.])
+        assert recording.pyramid('TP9').bounds()[1] == (1., 1.)
+
+    def test_pyramid_levels_are_cached(self, tmp_path):
+        recording = self._recording(tmp_path)
+        x, mins, maxs = recording.pyramid('AF7').levels[0]
+        assert np.shares_memory(x, recording.timestamps)
+        assert np.allclose(mins, -np.arange(3, 1024, 4), atol=1e-3)
+
+        reloaded = Recording(recording.path)
+        x, mins, maxs = reloaded.pyramid('AF7').levels[0]
+        assert isinstance(mins, np.memmap)
+        assert np.allclose(maxs, -np.arange(0, 1024, 4), atol=1e-3)
@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+
+from src import recording_cache
+
+CSV = """timestamps,TP9,AF7,AF8,TP10,Right AUX
+1605290410.539,-28.809,-32.715,-39.551,-38.086,0.000
+1605290410.543,-41.992,-35.156,-37.598,-41.992,0.000
+1605290410.547,-44.922,-25.879,-29.785,-37.109,0.000
+1605290410.551,-35.156,-27.344,-26.367,-30.273,0.000
+"""
+
+
+class TestRecordingCache:
+
+    def _write_csv(self, tmp_path, content=CSV):
+        path = str(tmp_path / 'recording.csv')
+        with open(path, 'w') as file:
+            file.write(content)
+        return path
+
+    def test_first_load_creates_cache(self, tmp_path):
+        path = self._write_csv(tmp_path)
+        timestamps, channels, _, _ = recording_cache.load(path)
+        assert os.path.isdir(recording_cache.cache_dir(path))
+        assert list(channels) == ['TP9', 'AF7', 'AF8', 'TP10', 'Right AUX']
+        assert timestamps.dtype == np.int64
+        assert timestamps[0] == 1605290410539000064
+        assert channels['TP9'].dtype == np.float32
+        assert np.allclose(channels['AF7'],
+                           [-32.715, -35.156, -25.879, -27.344])
+
+    def test_second_load_is_memory_mapped(self, tmp_path):
+        path = self._write_csv(tmp_path)
+        recording_cache.load(path)
+        timestamps, channels, _, _ = recording_cache.load(path)
+        assert isinstance(timestamps, np.memmap)
+        assert isinstance(channels['TP10'], np.memmap)
+
+    def test_stale_cache_is_ignored(self, tmp_path):
+        path = self._write_csv(tmp_path)
+        recording_cache.load(path)
+        self._write_csv(tmp_path, CSV.replace('-28.809', '-99.000'))
+        assert recording_cache.read_cache(path) is None
+        _, channels, _, _ = recording_cache.load(path)
+        assert channels['TP9'][0] == np.float32(-99.0)
+
+    def test_sampling_is_stored(self, tmp_path):
+        path = self._write_csv(tmp_path)
+        recording_cache.load(path)
+        _, _, blocks, info = recording_cache.read_cache(path)
+        assert np.isclose(info['sampling']['rate'], 250)
+        assert info['sampling']['gaps'] == 0
+        assert blocks.tolist() == [[0, 4]]
@@ -0,0 +1,32 @@
+import numpy as np
+
+from src.resampling import find_blocks, resample_uniform
+
+
+class TestResampling:
+
+    @classmethod
+    def setup_class(cls):
+        seconds = np.round(np.arange(2560) / 256, 3)
+        seconds[1280:] += 2
+        cls.timestamps = (seconds * 1e9).astype(np.int64) + 10 ** 18
+        cls.channels = {'TP9': seconds * 10, 'AF7': -seconds}
+
+    def test_find_blocks(self):
+        blocks = find_blocks(self.timestamps, 1 / 256)
+        assert np.array_equal(blocks, [[0, 1280], [1280, 2560]])
+
+    def test_grid_is_uniform(self):
+        grid, _, blocks = resample_uniform(self.timestamps, self.channels,
+                                           1 / 256)
+        for start, stop in blocks:
+            assert np.allclose(np.diff(grid[start:stop]), 1e9 / 256, atol=1)
+        assert grid[blocks[1, 0]] - grid[blocks[0, 1] - 1] > 2e9
+
+    def test_readings_are_interpolated(self):
+        grid, channels, _ = resample_uniform(self.timestamps, self.channels,
+                                             1 / 256)
+        seconds = (grid - 10 ** 18) / 1e9
+        assert channels['TP9'].dtype == np.float32
+        assert np.allclose(channels['TP9'], seconds * 10, atol=1e-3)
+        assert np.allclose(channels['AF7'], -seconds, atol=1e-4)
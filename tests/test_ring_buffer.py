@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from src.ring_buffer import RingBuffer
+
+
+class TestRingBuffer:
+    def setup_method(self):
+        self.buffer = RingBuffer(2, 10)
+
+    def _extend(self, start: int, stop: int) -> None:
+        samples = np.arange(start, stop)
+        self.buffer.extend(np.stack([samples, -samples]), samples / 256)
+
+    def test_extend_before_wrap(self):
+        self._extend(0, 4)
+        timestamps, values = self.buffer.last(10)
+        assert len(self.buffer) == 4
+        assert self.buffer.start == 0
+        assert np.array_equal(values[0], np.arange(4))
+        assert np.array_equal(timestamps, np.arange(4) / 256)
+
+    def test_extend_wraps_around(self):
+        for start in range(0, 23, 3):
+            self._extend(start, start + 3)
+        timestamps, values = self.buffer.last(10)
+        assert self.buffer.total == 24
+        assert self.buffer.start == 14
+        assert np.array_equal(values, np.stack([np.arange(14, 24),
+                                                -np.arange(14, 24)]))
+        assert np.array_equal(timestamps, np.arange(14, 24) / 256)
+
+    def test_extend_longer_than_capacity(self):
+        self._extend(0, 25)
+        _, values = self.buffer.last(10)
+        assert self.buffer.total == 25
+        assert np.array_equal(values[0], np.arange(15, 25))
+
+    def test_read_by_absolute_position(self):
+        self._extend(0, 17)
+        _, values = self.buffer.read(9, 12)
+        assert np.array_equal(values[1], -np.arange(9, 12))
+
+    def test_read_overwritten_samples(self):
+        self._extend(0, 17)
+        with pytest.raises(IndexError):
+            self.buffer.read(5, 10)
+        with pytest.raises(IndexError):
+            self.buffer.read(10, 18)
+
+    def test_copy_last_into_preallocated_array(self):
+        out = np.full((2, 6), np.nan, dtype=np.float32)
+        self._extend(0, 4)
+        assert self.buffer.copy_last(out) == 4
+        assert np.array_equal(out[0], [0, 0, 0, 1, 2, 3])
+        for start in range(4, 23, 3):
+            self._extend(start, start + 3)
+        assert self.buffer.copy_last(out) == 6
+        assert np.array_equal(out, self.buffer.last(6)[1])
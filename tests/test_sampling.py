@@ -0,0 +1,29 @@
+import numpy as np
+
+from src.sampling import estimate_sampling
+
+
+def test_estimate_sampling_millisecond_resolution():
+    # Muse csv keeps milliseconds, so intervals alternate between 3 and 4ms
+    seconds = np.round(1605290410.539 + np.arange(25600) / 256, 3)
+    sampling = estimate_sampling((seconds * 1e9).astype(np.int64))
+    assert np.isclose(sampling.rate, 256, atol=0.01)
+    assert np.isclose(sampling.period, 1 / 256, rtol=1e-4)
+    assert 0 < sampling.jitter < 0.001
+    assert sampling.gaps == 0
+
+
+def test_estimate_sampling_ignores_dropouts():
+    timestamps = np.arange(10000) * 3906250
+    timestamps[5000:] += 10 ** 9
+    sampling = estimate_sampling(timestamps)
+    assert np.isclose(sampling.rate, 256)
+    assert sampling.gaps == 1
+    assert np.isclose(sampling.max_interval, 1.00390625)
+
+
+def test_estimate_sampling_of_single_timestamp_is_nominal():
+    sampling = estimate_sampling(np.array([1]))
+    assert sampling.rate == 256
+    assert sampling.period == 1 / 256
+    assert sampling.gaps == 0
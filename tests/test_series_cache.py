@@ -0,0 +1,46 @@
+import numpy as np
+
+from src.series_cache import SeriesCache
+
+
+class TestSeriesCache:
+
+    def setup_method(self):
+        self.cache = SeriesCache(max_bytes=3 * 400)
+
+    def test_hit_and_miss(self):
+        assert self.cache.get('a') is None
+        self.cache.put('a', np.zeros(100, dtype=np.float32))
+        assert self.cache.get('a') is not None
+        assert (self.cache.hits, self.cache.misses) == (1, 1)
+
+    def test_least_recently_used_is_evicted(self):
+        for key in 'abc':
+            self.cache.put(key, np.zeros(100, dtype=np.float32))
+        self.cache.get('a')
+        self.cache.put('d', np.zeros(100, dtype=np.float32))
+        assert 'b' not in self.cache
+        assert all(key in self.cache for key in 'acd')
+        assert self.cache.nbytes == 1200
+
+    def test_replace_updates_size(self):
+        self.cache.put('a', np.zeros(100, dtype=np.float32))
+        self.cache.put('a', np.zeros(50, dtype=np.float32))
+        assert len(self.cache) == 1
+        assert self.cache.nbytes == 200
+
+    def test_series_over_limit_is_not_cached(self):
+        self.cache.put('a', np.zeros(100, dtype=np.float32))
+        self.cache.put('b', np.zeros(1000, dtype=np.float32))
+        assert 'b' not in self.cache
+        assert 'a' in self.cache
+
+    def test_rows_of_one_array_are_counted_once(self):
+        bands = np.zeros((3, 100), dtype=np.float32)
+        for key, row in zip('abc', bands):
+            self.cache.put(key, row)
+        assert self.cache.nbytes == 1200
+        self.cache.put('d', np.zeros(100, dtype=np.float32))
+        # memory of rows is released only with the last of them
+        assert len(self.cache) == 1 and 'd' in self.cache
+        assert self.cache.nbytes == 400
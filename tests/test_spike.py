@@ -0,0 +1,297 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.ring_buffer import RingBuffer
+from src.spike import Spike
+
+ASSETS = os.path.join(os.path.dirname(__file__), '..', 'assets')
+RECORDING = os.path.join(ASSETS, 'EEG_recording_2020-11-13-18.00.04.csv')
+
+
+def legacy_detect(spike: Spike) -> np.array:
+    """
+    Detect spikes with former list comprehension over search windows.
+    """
+    spike._estimate_noise_level()
+    return np.array([
+        index + np.argmin(spike.data.iloc[index:index + spike.search_samples])
+        for index in spike._find_potential_spikes()])
+
+
+def legacy_spacing(potential_spikes: np.array, wave_size: int) -> np.array:
+    """
+    Remove close potential spikes with former loop over the whole array.
+    """
+    def _min_spacing():
+        return np.insert(np.diff(potential_spikes) >= wave_size, 0, True)
+
+    min_spacing = _min_spacing()
+    while not np.all(min_spacing):
+        potential_spikes = potential_spikes[min_spacing]
+        min_spacing = _min_spacing()
+    return potential_spikes
+
+
+def synthetic_series(size: int, seed: int = 0) -> pd.Series:
+    random = np.random.default_rng(seed)
+    values = random.normal(0, 10, size)
+    values[random.integers(10, size - 10, size // 200)] -= 150
+    index = pd.to_datetime(1605290410.539 + np.arange(size) / 256, unit='s')
+    return pd.Series(values, index=index)
+
+
+class TestSpike:
+    def setup_class(self):
+        eeg = pd.read_csv(RECORDING, index_col=0)
+        eeg.index = pd.to_datetime(eeg.index, unit='s')
+        self.recording = eeg
+
+    def setup_method(self):
+        self.spike = Spike('TP9')
+
+    def test_detect_same_as_legacy_on_recording(self):
+        for column in ['TP9', 'AF7', 'AF8', 'TP10']:
+            self.spike.set_data(self.recording[column])
+            expected = legacy_detect(self.spike)
+            detected = self.spike.detect()
+            assert np.array_equal(self.spike.spikes, expected)
+            assert detected.index.equals(self.recording.index[expected])
+            assert np.array_equal(detected.to_numpy(),
+                                  self.spike.thresholds[expected])
+
+    def test_detect_same_as_legacy_on_synthetic(self):
+        self.spike.set_data(synthetic_series(100000))
+        expected = legacy_detect(self.spike)
+        self.spike.detect()
+        assert expected.size > 0
+        assert np.array_equal(self.spike.spikes, expected)
+
+    def test_detect_without_potential_spikes(self):
+        self.spike.set_data(pd.Series(np.zeros(1000)))
+        detected = self.spike.detect()
+        assert self.spike.spikes.size == 0
+        assert detected.empty
+
+    def test_find_potential_spikes_same_as_legacy_for_bursts(self):
+        random = np.random.default_rng(1)
+        values = random.normal(0, 10, 200000)
+        # bursts of artefacts crossing threshold every few samples
+        for start in random.integers(0, values.size - 500, 50):
+            values[start:start + 500:random.integers(1, 4)] = -200
+        self.spike.set_data(pd.Series(values))
+        self.spike._estimate_noise_level()
+        found = self.spike._find_potential_spikes()
+
+        self.spike.wave_size = 0
+        candidates = self.spike._find_potential_spikes()
+        expected = legacy_spacing(candidates[
+            (candidates > 7) & (candidates + 5 + 7 <= values.size)], 7)
+        assert np.array_equal(found, expected)
+        assert np.all(np.diff(found) >= 7)
+
+    def test_sort_same_as_legacy(self):
+        self.spike.set_data(self.recording['AF8'])
+        waves, mean = self.spike.sort()
+        expected = np.stack([
+            self.spike.data.iloc[index - 7:index + 7]
+            for index in self.spike.spikes])
+        assert waves.shape == (self.spike.spikes.size, 14)
+        assert np.array_equal(waves, expected)
+        assert np.allclose(mean, expected.mean(axis=0))
+
+    def test_sort_drops_spike_near_the_end(self):
+        data = synthetic_series(1000)
+        # crosses threshold before the last wave, minimum is within it
+        data.iloc[-self.spike.wave_size - 1] -= 150
+        data.iloc[-self.spike.wave_size + 2] -= 300
+        self.spike.set_data(data)
+        waves, _ = self.spike.sort()
+        assert waves.shape == (self.spike.spikes.size, 14)
+        assert self.spike.spikes.max() + self.spike.wave_size <= len(data)
+
+    def test_sort_without_spikes(self):
+        self.spike.set_data(pd.Series(np.zeros(1000)))
+        waves, mean = self.spike.sort()
+        assert waves.size == 0 and mean.size == 0
+
+    def test_detect_online_finds_spikes_with_bounded_latency(self):
+        random = np.random.default_rng(2)
+        values = random.normal(0, 1, 256 * 60).astype(np.float32)
+        values[::256] += 60  # artefacts keep threshold at 5 noise levels
+        values[100::300] -= 100
+        timestamps = np.arange(values.size) / 256
+        buffer = RingBuffer(1, 256 * 20)
+        self.spike.start_online(buffer)
+
+        detected, latencies = [], []
+        for start in range(0, values.size, 12):
+            buffer.extend(values[start:start + 12],
+                          timestamps[start:start + 12])
+            spikes, waves, clusters = self.spike.detect_online()
+            assert waves.shape == (spikes.size, 14)
+            assert np.all(clusters == -1)
+            detected.extend(spikes)
+            # spikes found during noise estimation warm-up are delayed
+            latencies.extend(timestamps[buffer.total - 1] - spikes[
+                spikes > 10])
+
+        injected = timestamps[np.flatnonzero(values < -100)]
+        assert np.isin(injected, detected).all()
+        assert np.all(np.diff(detected) > 0)
+        assert max(latencies) * 256 <= 5 + 7 + 12
+
+    def test_detect_online_predicts_fitted_clusters(self):
+        self.spike.set_data(self.recording['TP9'])
+        self.spike.cluster()
+        values = self.recording['TP9'].to_numpy(dtype=np.float32)
+        buffer = RingBuffer(1, values.size)
+        self.spike.start_online(buffer)
+        buffer.extend(values, np.arange(values.size) / 256)
+
+        _, waves, clusters = self.spike.detect_online()
+        features = self.spike.pca.transform(self.spike.scaler.transform(waves))
+        assert clusters.size > 0
+        assert np.array_equal(clusters, self.spike.kmeans.predict(features))
+
+    def test_threshold_follows_drifting_noise(self):
+        random = np.random.default_rng(3)
+        noise = np.repeat([5., 20.], 256 * 60)
+        values = random.normal(0, noise)
+        values[::256] += 200  # artefacts keep threshold at 5 noise levels
+        self.spike.set_data(pd.Series(values))
+        self.spike._estimate_noise_level()
+        thresholds = self.spike.thresholds
+        assert thresholds.shape == (noise.size,)
+        assert np.allclose(thresholds[:256 * 50], -25, rtol=0.1)
+        assert np.allclose(thresholds[-256 * 50:], -100, rtol=0.1)
+
+    def test_noise_hop_is_configurable(self):
+        values = self.recording['AF7']
+        self.spike.set_data(values)
+        self.spike.detect()
+        self.spike.noise_hop = 1
+        assert not self.spike.is_current('detect')
+        self.spike.detect()
+        centers, _ = self.spike.noise_windows
+        assert np.allclose(np.diff(centers)[:-1], 256)
+        # thresholds are interpolated once, not on every access
+        assert self.spike.thresholds is self.spike.thresholds
+
+    def test_noise_level_of_short_readings_is_global(self):
+        values = self.recording['AF7'].iloc[:1000]
+        self.spike.set_data(values)
+        self.spike._estimate_noise_level()
+        deviation = np.median(np.abs(values - np.median(values)))
+        assert np.isclose(self.spike.noise_level, 1.4826 * deviation)
+        assert np.allclose(self.spike.thresholds, self.spike.spike_threshold)
+
+    def test_stages_run_once_for_same_readings(self, monkeypatch):
+        calls = {'detect': 0, 'fit': 0}
+        detect, fit = Spike._detect, self.spike.kmeans.fit_predict
+
+        def _detect(spike):
+            calls['detect'] += 1
+            detect(spike)
+
+        def _fit_predict(features):
+            calls['fit'] += 1
+            return fit(features)
+
+        monkeypatch.setattr(Spike, '_detect', _detect)
+        monkeypatch.setattr(self.spike.kmeans, 'fit_predict', _fit_predict)
+        for _ in range(2):
+            self.spike.set_data(self.recording['TP9'].copy())
+            self.spike.detect()
+            self.spike.sort()
+            self.spike.extract_features()
+            self.spike.cluster()
+        assert calls == {'detect': 1, 'fit': 1}
+
+        self.spike.kmeans.set_params(n_clusters=2)
+        clusters, _ = self.spike.cluster()
+        assert calls == {'detect': 1, 'fit': 2}
+        assert set(clusters) == {0, 1}
+
+        self.spike.set_data(self.recording['AF7'])
+        assert not self.spike.is_current('detect')
+        self.spike.sort()
+        assert calls['detect'] == 2
+        assert not self.spike.is_current('extract_features')
+
+    def test_stages_depend_on_parameters(self):
+        self.spike.set_data(self.recording['TP9'])
+        self.spike.detect()
+        assert self.spike.is_current('detect')
+        self.spike.set_data(self.recording['TP9'], sampling_rate=512)
+        assert not self.spike.is_current('detect')
+        self.spike.set_data(self.recording['TP9'], sampling_rate=256,
+                            boundaries=np.array([1000]))
+        assert not self.spike.is_current('detect')
+
+    def test_large_spike_set_fitted_in_batches(self):
+        self.spike.set_data(self.recording['TP9'])
+        features = self.spike.extract_features().copy()
+        full_pca = self.spike.pca
+
+        self.spike.large_spike_set = 100
+        self.spike.batch_size = 64
+        clusters, batched = self.spike.cluster()
+        assert self.spike.feature_model is not full_pca
+        assert batched.shape == features.shape
+        for component in range(2):
+            correlation = np.corrcoef(features[:, component],
+                                      batched[:, component])[0, 1]
+            assert abs(correlation) > 0.99
+        assert type(self.spike.cluster_model).__name__ == 'MiniBatchKMeans'
+        assert np.array_equal(
+            clusters, self.spike.cluster_model.predict(batched))
+        assert set(clusters) <= {0, 1, 2}
+
+    def test_select_clusters_finds_number_of_blobs(self):
+        random = np.random.default_rng(4)
+        centers = np.array([[0, 0], [10, 0], [0, 10], [10, 10]])
+        self.spike.features = (centers[random.integers(0, 4, 3000)]
+                               + random.normal(0, 1, (3000, 2)))
+        self.spike.max_clusters = 6
+        model, clusters = self.spike._select_clusters()
+        assert model.n_clusters == 4
+        assert sorted(self.spike.cluster_scores) == [2, 3, 4, 5, 6]
+        assert max(self.spike.cluster_scores,
+                   key=self.spike.cluster_scores.get) == 4
+        assert set(clusters) == {0, 1, 2, 3}
+
+    def test_cluster_selects_number_of_clusters(self):
+        spike = Spike('TP9', max_clusters=5)
+        spike.set_data(self.recording['TP9'])
+        clusters, _ = spike.cluster()
+        assert 2 <= spike.n_clusters <= 5
+        assert set(clusters) == set(range(spike.n_clusters))
+        assert spike.is_current('cluster')
+        spike.max_clusters = 4
+        assert not spike.is_current('cluster')
+
+    def test_cluster_is_reproducible(self):
+        results = []
+        for _ in range(2):
+            spike = Spike('AF8', max_clusters=6)
+            spike.set_data(self.recording['AF8'])
+            clusters, _ = spike.cluster()
+            results.append((spike.n_clusters, clusters,
+                            spike.cluster_scores))
+        (first_count, first, first_scores), (count, clusters, scores) = \
+            results
+        assert count == first_count
+        assert np.array_equal(clusters, first)
+        assert scores == first_scores
+
+    def test_large_spike_set_clustering_is_reproducible(self):
+        results = []
+        for _ in range(2):
+            spike = Spike('TP9', max_clusters=4)
+            spike.large_spike_set = 100
+            spike.batch_size = 64
+            spike.set_data(self.recording['TP9'])
+            results.append(spike.cluster()[0])
+        assert np.array_equal(*results)
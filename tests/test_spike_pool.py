@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.spike import Spike
+from src.spike_pool import SpikePool
+
+ASSETS = os.path.join(os.path.dirname(__file__), '..', 'assets')
+RECORDING = os.path.join(ASSETS, 'EEG_recording_2020-11-13-18.00.04.csv')
+ELECTRODES = ['TP9', 'AF7', 'AF8', 'TP10']
+
+
+class TestSpikePool:
+    def setup_class(self):
+        eeg = pd.read_csv(RECORDING, index_col=0)
+        eeg.index = pd.to_datetime(eeg.index, unit='s')
+        self.data = eeg[ELECTRODES].astype(np.float32)
+        self.pool = SpikePool(processes=2)
+
+    def teardown_class(self):
+        self.pool.shutdown()
+
+    def _serial(self, stage: str) -> dict:
+        spikes = {column: Spike(column) for column in ELECTRODES}
+        SpikePool(processes=1).run(spikes, self.data, stage)
+        return spikes
+
+    def test_run_same_as_serial(self):
+        spikes = {column: Spike(column) for column in ELECTRODES}
+        self.pool.run(spikes, self.data, 'extract_features')
+        expected = self._serial('extract_features')
+        for column in ELECTRODES:
+            assert spikes[column].data.equals(self.data[column])
+            assert np.array_equal(spikes[column].spikes,
+                                  expected[column].spikes)
+            assert np.array_equal(spikes[column].thresholds,
+                                  expected[column].thresholds)
+            assert np.array_equal(spikes[column].sorted_spikes,
+                                  expected[column].sorted_spikes)
+            assert np.allclose(spikes[column].features,
+                               expected[column].features, atol=1e-4)
+
+    def test_run_keys_readings_as_analysed(self):
+        data = self.data.astype(np.float64) + 1e-4
+        spikes = {column: Spike(column) for column in ELECTRODES}
+        self.pool.run(spikes, data, 'detect')
+        for column in ELECTRODES:
+            analysed = data[column].astype(np.float32)
+            assert spikes[column].data.dtype == np.float32
+            assert spikes[column].data_key == Spike.fingerprint(analysed)
+
+    def test_run_fits_models(self):
+        spikes = {column: Spike(column) for column in ELECTRODES}
+        self.pool.run(spikes, self.data, 'cluster', sampling_rate=256)
+        for column in ELECTRODES:
+            spike = spikes[column]
+            assert spike.clusters.shape == (spike.spikes.size,)
+            assert np.array_equal(
+                spike.clusters, spike.kmeans.predict(spike.features))
+
+    def test_run_unknown_stage(self):
+        with pytest.raises(ValueError):
+            self.pool.run({}, self.data, 'plot')
+
+    def test_run_reuses_current_results(self):
+        spikes = {column: Spike(column) for column in ELECTRODES}
+        self.pool.run(spikes, self.data, 'sort')
+        fitted = dict(spikes)
+        self.pool.run(spikes, self.data.copy(), 'sort')
+        for column in ELECTRODES:
+            assert spikes[column] is fitted[column]
+        self.pool.run(spikes, self.data, 'extract_features')
+        for column in ELECTRODES:
+            assert spikes[column].is_current('extract_features')
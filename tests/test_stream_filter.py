@@ -0,0 +1,51 @@
+import numpy as np
+
+from src.frequency import Frequency
+from src.stream_filter import StreamFilter, StreamFilterBank
+
+
+class TestStreamFilter:
+
+    @classmethod
+    def setup_class(cls):
+        t = np.arange(2560) / 256
+        cls.alpha = np.sin(2 * np.pi * 10 * t)
+        cls.beta = np.sin(2 * np.pi * 20 * t)
+        cls.signal = np.stack([cls.alpha + cls.beta + 100,
+                               cls.alpha - cls.beta - 50])
+
+    def test_chunks_equal_whole_signal(self):
+        whole = StreamFilter(Frequency.ALPHA, 2).process(self.signal)
+        band_filter = StreamFilter(Frequency.ALPHA, 2)
+        chunks = np.concatenate([band_filter.process(chunk) for chunk in
+                                 np.array_split(self.signal, 213, axis=1)],
+                                axis=1)
+        assert np.allclose(chunks, whole)
+
+    def test_band_is_passed(self):
+        alpha = StreamFilter(Frequency.ALPHA, 1).process(self.alpha[None])
+        beta = StreamFilter(Frequency.ALPHA, 1).process(self.beta[None])
+        # causal filter shifts phase, so compare power after transient
+        assert np.isclose(alpha[0, 512:].std(), self.alpha.std(), rtol=0.05)
+        assert beta[0, 512:].std() < 0.05 * self.beta.std()
+
+    def test_notch_inside_gamma(self):
+        gamma = StreamFilter(Frequency.GAMMA, 1)
+        beta = StreamFilter(Frequency.BETA, 1)
+        assert gamma.sos.shape[0] == beta.sos.shape[0] + 1
+
+    def test_reset(self):
+        band_filter = StreamFilter(Frequency.BETA, 2)
+        first = band_filter.process(self.signal)
+        band_filter.reset()
+        assert np.array_equal(band_filter.process(self.signal), first)
+
+    def test_bank(self):
+        bank = StreamFilterBank([Frequency.ALPHA, Frequency.BETA], 2)
+        result = np.concatenate([bank.process(chunk) for chunk in
+                                 np.array_split(self.signal, 10, axis=1)],
+                                axis=-1)
+        assert result.shape == (2, 2, 2560)
+        for index, frequency in enumerate([Frequency.ALPHA, Frequency.BETA]):
+            expected = StreamFilter(frequency, 2).process(self.signal)
+            assert np.allclose(result[:, index], expected)
@@ -0,0 +1,136 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import src.stream_recorder
+from src.stream_recorder import (RECORD_HEADER, StreamRecorder,
+                                 defer_export, export_csv, export_pending,
+                                 read_recording)
+
+STREAMS = {'EEG': (['TP9', 'AF7', 'AF8', 'TP10', 'Right AUX'], 256),
+           'ACC': (['X', 'Y', 'Z'], 52)}
+
+
+def _chunks(stream: str, count: int, channels: int, samples: int):
+    for i in range(count):
+        timestamps = 1000 + (i * samples + np.arange(samples)) / 256
+        data = np.arange(channels * samples, dtype=np.float64).reshape(
+            channels, samples) + i
+        yield stream, data, timestamps
+
+
+def test_recording_round_trip(tmp_path):
+    path = str(tmp_path / 'recording_test.rec')
+    recorder = StreamRecorder(path, STREAMS)
+    recorder.start()
+    pushed = list(_chunks('EEG', 20, 5, 12)) + list(_chunks('ACC', 5, 3, 1))
+    for chunk in pushed:
+        assert recorder.push(*chunk)
+    recorder.stop()
+
+    streams = read_recording(path)
+    assert recorder.written == 25 and recorder.dropped == 0
+    assert streams['EEG'].labels == STREAMS['EEG'][0]
+    assert streams['EEG'].sampling_rate == 256
+    assert streams['EEG'].data.shape == (240, 5)
+    assert np.array_equal(
+        streams['EEG'].data,
+        np.concatenate([data.T for name, data, _ in pushed
+                        if name == 'EEG']))
+    assert np.array_equal(
+        streams['ACC'].timestamps,
+        np.concatenate([t for name, _, t in pushed if name == 'ACC']))
+
+
+def test_full_queue_drops_chunks_without_blocking(tmp_path):
+    recorder = StreamRecorder(str(tmp_path / 'recording_test.rec'), STREAMS,
+                              queue_size=3)
+    results = [recorder.push(*chunk) for chunk in _chunks('EEG', 5, 5, 12)]
+    assert results == [True] * 3 + [False] * 2
+    assert recorder.dropped == 2
+
+
+def test_stop_writes_full_queue_and_drops_later_chunks(tmp_path):
+    path = str(tmp_path / 'recording_test.rec')
+    recorder = StreamRecorder(path, STREAMS, queue_size=3)
+    chunks = list(_chunks('EEG', 4, 5, 12))
+    for chunk in chunks[:3]:
+        assert recorder.push(*chunk)
+    recorder.start()
+    recorder.stop(wait=False)
+    assert not recorder.push(*chunks[3])
+    recorder._thread.join(5)
+
+    assert recorder.written == 3 and recorder.dropped == 1
+    assert read_recording(path)['EEG'].data.shape == (36, 5)
+
+
+def test_truncated_recording_is_readable(tmp_path):
+    path = str(tmp_path / 'recording_test.rec')
+    recorder = StreamRecorder(path, STREAMS)
+    recorder.start()
+    for chunk in _chunks('EEG', 3, 5, 12):
+        recorder.push(*chunk)
+    recorder.stop()
+    size = os.path.getsize(path)
+    with open(path, 'r+b') as file:
+        file.truncate(size - RECORD_HEADER.size)
+
+    streams = read_recording(path)
+    assert streams['EEG'].data.shape == (24, 5)
+    assert len(streams['ACC'].timestamps) == 0
+
+
+def test_export_csv(tmp_path):
+    path = str(tmp_path / 'recording_test.rec')
+    recorder = StreamRecorder(path, STREAMS)
+    recorder.start()
+    for chunk in _chunks('EEG', 2, 5, 12):
+        recorder.push(*chunk)
+    recorder.stop(export=True)
+
+    assert recorder.exported == [str(tmp_path / 'EEG_recording_test.csv')]
+    assert recorder.exported == export_csv(path)
+    frame = pd.read_csv(recorder.exported[0])
+    assert list(frame.columns) == ['timestamps'] + STREAMS['EEG'][0]
+    assert len(frame) == 24
+    assert frame['TP9'].iloc[13] == 2
+
+
+def test_export_csv_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(src.stream_recorder, 'EXPORT_SAMPLES', 30)
+    path = str(tmp_path / 'recording_test.rec')
+    recorder = StreamRecorder(path, STREAMS)
+    recorder.start()
+    for chunk in list(_chunks('EEG', 10, 5, 12)) + list(
+            _chunks('ACC', 4, 3, 1)):
+        recorder.push(*chunk)
+    recorder.stop()
+
+    exported = export_csv(path)
+    assert exported == [str(tmp_path / 'EEG_recording_test.csv'),
+                        str(tmp_path / 'ACC_recording_test.csv')]
+    streams = read_recording(path)
+    for csv_path, stream in zip(exported, streams.values()):
+        frame = pd.read_csv(csv_path)
+        assert list(frame.columns) == ['timestamps'] + stream.labels
+        assert np.allclose(frame['timestamps'], stream.timestamps,
+                           atol=1e-3)
+        assert np.allclose(frame[stream.labels], stream.data)
+
+
+def test_export_pending(tmp_path):
+    path = str(tmp_path / 'recording_test.rec')
+    recorder = StreamRecorder(path, STREAMS)
+    recorder.start()
+    for chunk in _chunks('EEG', 2, 5, 12):
+        recorder.push(*chunk)
+    recorder.stop()
+    defer_export(path)
+
+    assert export_pending(str(tmp_path)) == [
+        str(tmp_path / 'EEG_recording_test.csv')]
+    assert len(pd.read_csv(tmp_path / 'EEG_recording_test.csv')) == 24
+    assert not os.path.exists(path + '.pending')
+    assert export_pending(str(tmp_path)) == []
@@ -0,0 +1,155 @@
+import os
+from threading import Timer
+from time import time
+
+import numpy as np
+import pytest
+
+import src.stream_worker
+from src.stream_recorder import StreamRecorder
+from src.stream_worker import (MUSE_CHUNKS, STREAMS, StreamWorker, push_chunk,
+                               read_replay)
+
+
+class RecordingOutlet:
+    """
+    Outlet of pylsl without per-sample timestamps, keeps pushed chunks.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def push_chunk(self, x, timestamp=0.0, pushthrough=True):
+        self.chunks.append((x, timestamp))
+
+
+class RecordingOutletN(RecordingOutlet):
+    """
+    Outlet of pylsl with per-sample timestamps.
+    """
+    do_push_chunk_n = None
+
+
+def test_push_chunk_with_sample_timestamps():
+    outlet = RecordingOutletN()
+    data = np.arange(60, dtype=np.float64).reshape(5, 12)
+    timestamps = 100 + np.arange(12) / 256
+    push_chunk(data, timestamps, outlet)
+    samples, pushed_timestamps = outlet.chunks[0]
+    assert len(outlet.chunks) == 1
+    assert samples.shape == (12, 5) and samples.dtype == np.float32
+    assert samples.flags['C_CONTIGUOUS']
+    assert np.array_equal(samples, data.T)
+    assert np.array_equal(pushed_timestamps, timestamps)
+
+
+def test_push_chunk_with_last_timestamp():
+    outlet = RecordingOutlet()
+    timestamps = 100 + np.arange(12) / 256
+    push_chunk(np.zeros((3, 12)), timestamps, outlet)
+    samples, pushed_timestamp = outlet.chunks[0]
+    assert samples.shape == (12, 3)
+    assert pushed_timestamp == timestamps[-1]
+
+
+def test_finish_wakes_stream_loop():
+    worker = StreamWorker()
+    start = time()
+    Timer(0.05, worker.finish).start()
+    assert worker.wait_for_stop(time, 10)
+    assert time() - start < 1
+
+
+def test_stop_recording_waits_for_writer(tmp_path):
+    path = str(tmp_path / 'recording_test.rec')
+    worker = StreamWorker()
+    worker.start_recording(path)
+    recorder = worker.recorder
+    for _ in range(10):
+        worker._push(np.zeros((5, 12)), 100 + np.arange(12) / 256,
+                     RecordingOutlet(), 'EEG')
+    worker.stop_recording(wait=True)
+    assert not recorder._thread.is_alive()
+    assert not recorder._thread.daemon
+    assert recorder.written == 10
+    assert recorder.exported
+
+
+def test_stop_recording_defers_export(tmp_path):
+    path = str(tmp_path / 'recording_test.rec')
+    worker = StreamWorker()
+    worker.start_recording(path)
+    recorder = worker.recorder
+    worker._push(np.zeros((5, 12)), 100 + np.arange(12) / 256,
+                 RecordingOutlet(), 'EEG')
+    worker.stop_recording(wait=True, export=False)
+    assert recorder.written == 1
+    assert not recorder.exported
+    assert os.path.exists(path + '.pending')
+
+
+def test_stream_loop_times_out_without_data():
+    worker = StreamWorker()
+    last = time()
+    assert not worker.wait_for_stop(lambda: last, 0.05)
+    assert time() - last >= 0.05
+
+
+def _record(path: str) -> None:
+    recorder = StreamRecorder(path, STREAMS)
+    recorder.start()
+    for i in range(64):
+        timestamps = 100 + (i * 12 + np.arange(12)) / 256
+        recorder.push('EEG', np.full((5, 12), i), timestamps)
+        if i % 16 == 0:
+            timestamps = 100 + (i // 16 * 3 + np.arange(3)) / 52
+            recorder.push('ACC', np.full((3, 3), i), timestamps)
+    recorder.stop()
+
+
+def test_replay_pushes_recorded_chunks(tmp_path, monkeypatch):
+    path = str(tmp_path / 'recording_test.rec')
+    _record(path)
+    outlets = {}
+
+    def create_outlet(stream, source_id):
+        outlets[stream] = RecordingOutletN()
+        return outlets[stream]
+
+    monkeypatch.setattr(src.stream_worker, 'create_outlet', create_outlet)
+    start = time()
+    StreamWorker().replay(path, speed=10)
+
+    # 3 s of readings replayed 10 times faster
+    assert 0.25 < time() - start < 1
+    assert len(outlets['EEG'].chunks) == 64
+    assert len(outlets['ACC'].chunks) == 4
+    samples, timestamps = outlets['EEG'].chunks[-1]
+    assert samples.shape == (12, 5) and np.all(samples == 63)
+    assert np.allclose(np.diff(timestamps), 1 / 256 / 10, atol=1e-6)
+    assert abs(timestamps[-1] - time()) < 0.1
+
+
+def test_replay_stops_on_finish(tmp_path, monkeypatch):
+    path = str(tmp_path / 'recording_test.rec')
+    _record(path)
+    monkeypatch.setattr(src.stream_worker, 'create_outlet',
+                        lambda stream, source_id: RecordingOutletN())
+    worker = StreamWorker()
+    start = time()
+    Timer(0.05, worker.finish).start()
+    worker.replay(path)
+    assert time() - start < 0.5
+
+
+def test_replay_speed_is_limited(tmp_path):
+    with pytest.raises(ValueError):
+        StreamWorker().replay(str(tmp_path / 'recording_test.rec'), 1000)
+
+
+def test_read_replay_from_csv():
+    streams = read_replay('assets/EEG_recording_2020-11-13-18.00.04.csv')
+    eeg = streams['EEG']
+    assert eeg.data.shape == (len(eeg.timestamps), 5)
+    assert eeg.chunk_sizes.sum() == len(eeg.timestamps)
+    assert np.all(eeg.chunk_sizes[:-1] == MUSE_CHUNKS['EEG'])
@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.spike import Spike
+from src.template_matching import TemplateMatcher
+
+ASSETS = os.path.join(os.path.dirname(__file__), '..', 'assets')
+RECORDING = os.path.join(ASSETS, 'EEG_recording_2020-11-13-18.00.04.csv')
+
+
+def brute_force(y: np.array, template: np.array) -> np.array:
+    size = template.size
+    return np.array([np.corrcoef(y[i:i + size], template)[0, 1]
+                     for i in range(y.size - size + 1)])
+
+
+class TestTemplateMatcher:
+    def setup_method(self):
+        random = np.random.default_rng(0)
+        self.templates = random.normal(0, 1, (2, 14))
+        self.y = random.normal(0, 1, (3, 1000))
+
+    def test_correlate_same_as_pearson_correlation(self):
+        matcher = TemplateMatcher(self.templates, block_size=64)
+        scores = matcher.correlate(self.y)
+        assert scores.shape == (3, 2, 987)
+        for channel in range(3):
+            for template in range(2):
+                assert np.allclose(
+                    scores[channel, template],
+                    brute_force(self.y[channel], self.templates[template]),
+                    atol=1e-5)
+
+    def test_correlate_constant_readings(self):
+        y = np.full(100, 5.)
+        assert np.all(TemplateMatcher(self.templates[0]).correlate(y) == 0)
+
+    def test_correlate_short_readings(self):
+        scores = TemplateMatcher(self.templates).correlate(np.zeros(10))
+        assert scores.shape == (1, 2, 0)
+
+    def test_constant_template(self):
+        with pytest.raises(ValueError):
+            TemplateMatcher(np.ones(14))
+
+    def test_match_finds_scaled_copies(self):
+        y = self.y[0] * 0.1
+        for position, scale in [(100, 3.), (500, -0.5), (900, 10.)]:
+            y[position:position + 14] += scale * self.templates[1] + 20
+        matches = TemplateMatcher(self.templates, block_size=128).match(y)
+        assert np.array_equal(matches.positions, [100, 900])
+        assert np.all(matches.templates == 1)
+        assert np.all(matches.channels == 0)
+        assert np.all(matches.scores > 0.99)
+
+    def test_match_mean_wave_of_spikes(self):
+        eeg = pd.read_csv(RECORDING, index_col=0)
+        spike = Spike('TP9')
+        spike.set_data(eeg['TP9'])
+        _, mean_wave = spike.sort()
+        matches = TemplateMatcher(mean_wave).match(
+            eeg[['TP9', 'AF7']].to_numpy().T, threshold=0.8)
+        assert matches.positions.size > 0
+        tp9 = matches.positions[matches.channels == 0] + spike.wave_size
+        # most matches are close to detected spikes
+        distance = np.abs(tp9[:, np.newaxis] - spike.spikes).min(axis=1)
+        assert np.mean(distance <= spike.search_samples) > 0.5
@@ -16,6 +16,7 @@ class TestTransformer:
             [0.00000000e+00, -9.84807753e-01, -3.42020143e-01, 8.66025404e-01,
              6.42787610e-01, -6.42787610e-01, -8.66025404e-01, 3.42020143e-01,
              9.84807753e-01, -1.60708323e-13])
+        cls.y = y
         cls.transformer = Transformer(x, y, Frequency.BETA)
 
     def test_get_fft_freq(self):
@@ -23,6 +24,12 @@ class TestTransformer:
         assert np.array_equal(result, np.array(
             [0., 25., 50., 75., 100., -125., -100., -75., -50., -25.]))
 
+    def test_get_fft_freq_of_recording_sampling(self):
+        transformer = Transformer(np.arange(8), np.zeros(8), Frequency.BETA,
+                                  sampling=1 / 256)
+        assert np.array_equal(transformer.get_fft_freq(), np.array(
+            [0., 32., 64., 96., -128., -96., -64., -32.]))
+
     def test_get_fft(self):
         result = self.transformer.get_fft()
         assert np.allclose(result[0], np.array(
@@ -51,3 +58,25 @@ class TestTransformer:
         assert np.allclose(result, np.array(
             [-0.19696155, -0.15934524, -0.06086447, 0.06086447, 0.15934524,
              0.19696155, 0.15934524, 0.06086447, -0.06086447, -0.15934524]))
+
+    def test_get_rfft_freq(self):
+        result = Transformer.get_rfft_freq(10)
+        assert np.array_equal(result, np.array(
+            [0., 25., 25., 50., 50., 75., 75., 100., 100., 125.]))
+
+    def test_filter_bank(self):
+        t = np.arange(1000) * 0.004
+        alpha = np.sin(2 * np.pi * 10 * t)
+        beta = np.sin(2 * np.pi * 20 * t)
+        y = np.stack([alpha + beta, alpha - beta])
+        result = Transformer.filter_bank(
+            y, [Frequency.ALPHA, Frequency.BETA, Frequency.GAMMA])
+        assert result.shape == (2, 3, 1000)
+        assert np.allclose(result[0, 0], alpha, atol=1e-2)
+        assert np.allclose(result[0, 1], beta, atol=1e-2)
+        assert np.allclose(result[1, 1], -beta, atol=1e-2)
+        assert np.allclose(result[:, 2], 0, atol=1e-2)
+
+    def test_filter_bank_single_channel(self):
+        result = Transformer.filter_bank(self.y[:8], [Frequency.BETA])
+        assert result.shape == (1, 1, 8)